@@ -0,0 +1,3 @@
+from .engine import IncrementalCompiler, common_prefix_len
+
+__all__ = ["IncrementalCompiler", "common_prefix_len"]
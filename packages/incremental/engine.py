@@ -0,0 +1,168 @@
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from packages.ksl_rules import tokenize_ko, ko_to_gloss_aligned, current_lexicon
+from packages.sign_timeline import compile_glosses_arrays
+
+# tokenize_ko는 공백 단위 어절에 대해 합성적이다: tokenize(a + " " + b) == tokenize(a) + tokenize(b)
+# 따라서 어절 단위로 토큰/글로스/이벤트를 캐시하고, 바뀐 꼬리 어절만 다시 처리한다.
+# 다어절 사전 매칭은 어절을 넘나들 수 있으므로, 최장 표제어 길이만큼 앞에서부터 다시 매칭한다.
+_WORD_RE = re.compile(r"\S+")
+
+
+def common_prefix_len(a: str, b: str) -> int:
+    """Length of the shared prefix of a and b (binary search over C-level slice compares)."""
+    n = min(len(a), len(b))
+    if a[:n] == b[:n]:
+        return n
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class IncrementalCompiler:
+    """
+    Per-session text → gloss → SignTimeline compiler for growing ASR partials.
+    Output events are identical to compile_glosses(ko_to_gloss(tokenize_ko(text))).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._text = ""
+        self._key: Optional[Tuple[int, int, bool, int]] = None
+        # per-word caches (parallel lists, index = word index)
+        self._word_ends: List[int] = []   # char end offset (exclusive)
+        self._tok_end: List[int] = []     # cumulative token count after word
+        self._boundary: List[bool] = []   # no gloss match spans into this word from the previous one
+        self._gloss_end: List[int] = []   # cumulative gloss count after word
+        self._event_end: List[int] = []   # cumulative event count after word
+        self._t_end: List[int] = []       # timeline cursor after word
+        self._glosses: List[Tuple[str, float]] = []
+        self._events: List[Dict[str, Any]] = []
+        # number of leading events reused unchanged by the last update(),
+        # and the previous events after that point (what the update replaced)
+        self.stable_events = 0
+        self.last_replaced: List[Dict[str, Any]] = []
+
+    @property
+    def glosses(self) -> List[Tuple[str, float]]:
+        return self._glosses
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        return self._events
+
+    def update(self, text: str, start_ms: int = 0, gap_ms: int = 60, include_aux_channels: bool = True,
+               timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Recompile for the full accumulated text, reusing cached state for the unchanged prefix.
+        returns SignTimeline v0 JSON (events list is a fresh list; callers may keep the previous one)
+        timings: if given, filled with per-stage ms (tokenize, gloss, compile)
+        """
+        text = text or ""
+        # one lexicon snapshot per update: a concurrent hot swap can't mix versions
+        lex = current_lexicon()
+        key = (int(start_ms), int(gap_ms), bool(include_aux_channels), lex.version)
+        prev_events = self._events
+        if key != self._key:
+            self.reset()
+            self._key = key
+        # words fully inside the common prefix (their trailing separator is shared too) are stable
+        keep = bisect_left(self._word_ends, common_prefix_len(self._text, text))
+        # back off to a clean match boundary at least (max phrase len - 1) tokens before the change,
+        # so every lexicon match starting before it only saw unchanged tokens
+        lookback = max(0, lex.index.max_len - 1)
+        tok_keep = self._tok_end[keep - 1] if keep else 0
+        while keep > 0 and (
+            tok_keep - self._tok_end[keep - 1] < lookback
+            or (keep < len(self._boundary) and not self._boundary[keep])
+        ):
+            keep -= 1
+        tail_pos = self._word_ends[keep - 1] if keep else 0
+        tok0 = self._tok_end[keep - 1] if keep else 0
+        g_keep = self._gloss_end[keep - 1] if keep else 0
+        e_keep = self._event_end[keep - 1] if keep else 0
+        t0 = self._t_end[keep - 1] if keep else int(start_ms)
+
+        for lst in (self._word_ends, self._tok_end, self._boundary, self._gloss_end, self._event_end, self._t_end):
+            del lst[keep:]
+        del self._glosses[g_keep:]
+        replaced = prev_events[e_keep:]
+        del self._events[e_keep:]
+
+        # tokenize the changed tail word by word, gloss it in one aligned pass
+        if timings is not None:
+            t_mark = time.perf_counter()
+        tail_tokens: List[str] = []
+        word_first_tok: List[int] = []
+        for m in _WORD_RE.finditer(text, tail_pos):
+            word_first_tok.append(len(tail_tokens))
+            tail_tokens.extend(tokenize_ko(m.group()))
+            self._word_ends.append(m.end())
+            self._tok_end.append(tok0 + len(tail_tokens))
+        if timings is not None:
+            t_now = time.perf_counter()
+            timings["tokenize"] = (t_now - t_mark) * 1000.0
+            t_mark = t_now
+        aligned = ko_to_gloss_aligned(tail_tokens, lex)
+        tail_glosses = [(g, c) for g, c, _, _ in aligned]
+        # glosses are attributed to the word holding their first token
+        crossing = set()
+        for _, _, ts, te in aligned:
+            if te - ts > 1:
+                crossing.update(range(ts + 1, te))
+        word_gloss_counts: List[int] = []
+        gi = 0
+        for w, ft in enumerate(word_first_tok):
+            nxt = word_first_tok[w + 1] if w + 1 < len(word_first_tok) else len(tail_tokens)
+            cnt = 0
+            while gi < len(aligned) and aligned[gi][2] < nxt:
+                gi += 1
+                cnt += 1
+            word_gloss_counts.append(cnt)
+            self._boundary.append(ft not in crossing)
+
+        if timings is not None:
+            t_now = time.perf_counter()
+            timings["gloss"] = (t_now - t_mark) * 1000.0
+            t_mark = t_now
+        # compile the tail in one pass, then split events back per word
+        arr = compile_glosses_arrays(tail_glosses, start_ms=t0, gap_ms=gap_ms, include_aux_channels=include_aux_channels)
+        tail_events = arr.to_dicts()
+        gloss_starts = [i for i, ch in enumerate(arr.channel) if ch == "default"]
+        gi = 0
+        t = t0
+        for cnt in word_gloss_counts:
+            gi += cnt
+            if cnt:
+                j = gloss_starts[gi - 1]
+                t = arr.t_ms[j] + arr.dur_ms[j] + int(gap_ms)
+            e_cnt = gloss_starts[gi] if gi < len(gloss_starts) else len(tail_events)
+            self._gloss_end.append(g_keep + gi)
+            self._event_end.append(e_keep + e_cnt)
+            self._t_end.append(t)
+
+        self._glosses.extend(tail_glosses)
+        self._events.extend(tail_events)
+        self._text = text
+        if timings is not None:
+            timings["compile"] = (time.perf_counter() - t_mark) * 1000.0
+        self.stable_events = e_keep
+        self.last_replaced = replaced
+        now = int(time.time() * 1000)
+        return {
+            "id": f"signtimeline-{now}",
+            "created_ms": now,
+            "lang": "ko-KR->KSL",
+            "events": list(self._events),
+            "meta": {"version": "v0", "generator": "incremental.IncrementalCompiler", "lexicon_version": lex.version},
+        }
@@ -1,3 +1,25 @@
-from .rules import tokenize_ko, ko_to_gloss, load_overlay_lexicon, set_overlay_lexicon
+from .rules import (
+    tokenize_ko,
+    tokenize_ko_spans,
+    TokenSpans,
+    ko_to_gloss,
+    ko_to_gloss_aligned,
+    load_overlay_lexicon,
+    set_overlay_lexicon,
+    current_lexicon,
+)
+from .lexicon_index import LexiconIndex, LexiconSnapshot, strip_particle
 
-__all__ = ["tokenize_ko", "ko_to_gloss", "load_overlay_lexicon", "set_overlay_lexicon"]
+__all__ = [
+    "tokenize_ko",
+    "tokenize_ko_spans",
+    "TokenSpans",
+    "ko_to_gloss",
+    "ko_to_gloss_aligned",
+    "load_overlay_lexicon",
+    "set_overlay_lexicon",
+    "current_lexicon",
+    "LexiconIndex",
+    "LexiconSnapshot",
+    "strip_particle",
+]
@@ -0,0 +1,102 @@
+import time
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# 조사/어미 분리(간단): 어절 끝 조사를 떼어 사전 표제어와 매칭. 예: "서울에서" → "서울"
+_PARTICLES = (
+    "에서부터", "으로부터",
+    "에서는", "에게서", "으로는", "까지는",
+    "에서", "에게", "한테", "으로", "까지", "부터", "처럼", "보다", "마다", "에는", "이나", "이랑",
+    "은", "는", "이", "가", "을", "를", "에", "의", "도", "만", "와", "과", "로", "랑",
+)
+_PARTICLES_BY_LEN: Dict[int, frozenset] = {
+    n: frozenset(p for p in _PARTICLES if len(p) == n) for n in {len(p) for p in _PARTICLES}
+}
+_PARTICLE_LENS = tuple(sorted(_PARTICLES_BY_LEN, reverse=True))
+
+# trie 노드에서 표제어 종료를 나타내는 키(토큰은 빈 문자열이 될 수 없음)
+_END = ""
+
+
+def strip_particle(token: str) -> List[str]:
+    """Candidate stems of token with a trailing particle removed (longest particle first)."""
+    out = []
+    for k in _PARTICLE_LENS:
+        if len(token) > k and token[-k:] in _PARTICLES_BY_LEN[k]:
+            out.append(token[:-k])
+    return out
+
+
+class LexiconIndex:
+    """
+    Immutable token trie over lexicon entries {ko phrase: GLOSS}.
+    Phrases are split with the same tokenizer as the input, so "호우 경보" is a 2-token entry.
+    match() does a longest match bounded by the longest phrase, i.e. O(max_len) per position
+    independent of the number of entries.
+    """
+
+    __slots__ = ("_root", "max_len", "size")
+
+    def __init__(self, entries: Dict[str, str], tokenize):
+        root: Dict[str, dict] = {}
+        max_len = 0
+        size = 0
+        for ko, gloss in entries.items():
+            if not gloss:
+                continue
+            toks = tokenize(ko)
+            if not toks:
+                continue
+            node = root
+            for t in toks:
+                node = node.setdefault(t, {})
+            node[_END] = gloss
+            size += 1
+            if len(toks) > max_len:
+                max_len = len(toks)
+        self._root = root
+        self.max_len = max_len
+        self.size = size
+
+    def match(self, tokens: List[str], i: int) -> Optional[Tuple[str, int, bool]]:
+        """
+        Longest entry starting at tokens[i].
+        returns (gloss, n_tokens, particle_stripped) or None
+        """
+        node = self._root
+        best = None
+        j = i
+        end = min(len(tokens), i + self.max_len)
+        while j < end:
+            t = tokens[j]
+            child = node.get(t)
+            if child is not None and _END in child:
+                best = (child[_END], j - i + 1, False)
+            else:
+                # the last token of a phrase may carry a particle: "서울에서", "호우 경보가"
+                for stem in strip_particle(t):
+                    c2 = node.get(stem)
+                    if c2 is not None and _END in c2:
+                        best = (c2[_END], j - i + 1, True)
+                        break
+            if child is None:
+                break
+            node = child
+            j += 1
+        return best
+
+
+class LexiconSnapshot:
+    """
+    Immutable, versioned view of the active lexicon (base + overlay merged into one index).
+    Published by swapping a single module reference; readers grab it once per compile and
+    never lock. version is monotonically increasing per process.
+    """
+
+    __slots__ = ("version", "created_ms", "overlay", "index")
+
+    def __init__(self, version: int, overlay: Mapping[str, str], index: LexiconIndex):
+        self.version = version
+        self.created_ms = int(time.time() * 1000)
+        self.overlay: Mapping[str, str] = MappingProxyType(dict(overlay))
+        self.index = index
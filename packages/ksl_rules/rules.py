@@ -1,18 +1,109 @@
 from typing import List, Tuple, Dict, Optional
 import json
+import re
+import threading
+from bisect import bisect_right
+from itertools import accumulate, compress
+from operator import add
 from pathlib import Path
-from packages.nlp_norm import normalize_tokens
+from packages.nlp_norm import normalize_token
 from packages.nlp_norm.normalize import parse_sino_korean_number
+from .lexicon_index import LexiconIndex, LexiconSnapshot
 
 # 매우 단순한 한국어 토크나이저(공백/기호 기준). 실제 서비스는 형태소 분석기 사용 권장.
+# 공백(\n, \t 포함)은 split()이 처리하므로 그 외 구분기호만 치환한다.
+# 한글 텍스트에서는 str.translate/정규식보다 존재하는 기호만 C 레벨 replace 하는 쪽이 빠르다.
+_SEPS = ".!?;:()[]{}\"'"
+# 오프셋 계산용: 같은 길이로 치환하므로 치환 후 위치 == 원문 위치
+_SPAN_SEPS = _SEPS + "\n\t\r\x0b\x0c"
+_INC = (1).__add__
+# 공백이 아닌 문자의 연속 구간(그 외 유니코드 공백이 있을 때의 경로)
+_TOKEN_RE = re.compile(r"[^\s.!?;:()\[\]{}\"']+")
+
+
 def tokenize_ko(text: str) -> List[str]:
-    seps = ".!?;:()[]{}\"'\n\t"
-    for s in seps:
-        text = text.replace(s, " ")
-    # 숫자 구분 쉼표 제거: 1,234 → 1234
-    text = " ".join([w.replace(",", "") for w in text.split()])
-    toks = [t for t in text.strip().split() if t]
-    return toks
+    for s in _SEPS:
+        if s in text:
+            text = text.replace(s, " ")
+    if "," in text:
+        # 숫자 구분 쉼표 제거: 1,234 → 1234 (쉼표만 있는 토큰은 사라짐) — 토큰별 replace와 같은 결과
+        text = text.replace(",", "")
+    return text.split()
+
+
+class TokenSpans:
+    """
+    Column-oriented token offsets: tokens plus a parallel list of source start offsets.
+    End offsets are start + len(token), except for tokens that lost thousands-separator
+    commas (kept in _ends). Iterating yields (token, start, end_exclusive) tuples; building
+    the columns allocates no per-token tuple.
+    """
+    __slots__ = ("tokens", "starts", "_ends")
+
+    def __init__(self, tokens: List[str], starts: List[int], ends: Optional[Dict[int, int]] = None):
+        self.tokens = tokens
+        self.starts = starts
+        self._ends = ends or {}  # index -> end, only for tokens that lost commas
+
+    @property
+    def ends(self) -> List[int]:
+        out = list(map(add, self.starts, map(len, self.tokens)))
+        for k, e in self._ends.items():
+            out[k] = e
+        return out
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __iter__(self):
+        return zip(self.tokens, self.starts, self.ends)
+
+    def __getitem__(self, i: int) -> Tuple[str, int, int]:
+        i = range(len(self.tokens))[i]
+        return self.tokens[i], self.starts[i], self._ends.get(i, self.starts[i] + len(self.tokens[i]))
+
+
+def tokenize_ko_spans(text: str) -> TokenSpans:
+    """
+    Same tokens as tokenize_ko, with source character offsets.
+    Separators are replaced by same-length spaces, so one split(" ") gives every token and gap;
+    starts are running sums of piece lengths + 1 (C-level accumulate/compress, no per-token find).
+    """
+    t = text
+    for s in _SPAN_SEPS:
+        if s in t:
+            t = t.replace(s, " ")
+    if not t.isprintable():  # other unicode whitespace / control chars: regex scan
+        ms = list(_TOKEN_RE.finditer(text))
+        toks = [m.group() for m in ms]
+        starts = [m.start() for m in ms]
+    else:
+        pieces = t.split(" ")
+        # piece i starts after every earlier piece and its separating space; empty pieces are gaps
+        starts = list(compress(accumulate(map(_INC, map(len, pieces)), initial=0), pieces))
+        toks = list(compress(pieces, pieces))
+    if "," not in t:
+        return TokenSpans(toks, starts)
+    # 숫자 구분 쉼표: 쉼표가 있는 토큰만 고친다(쉼표만 있는 토큰은 버림)
+    ends: Dict[int, int] = {}
+    drop = []
+    i = t.find(",")
+    while i >= 0:
+        k = bisect_right(starts, i) - 1
+        end = starts[k] + len(toks[k])
+        toks[k] = toks[k].replace(",", "")
+        if toks[k]:
+            ends[k] = end
+        else:
+            drop.append(k)
+        i = t.find(",", end)
+    if drop:
+        for k in reversed(drop):
+            del toks[k], starts[k]
+        # indices after a dropped token move down
+        ends = {k - bisect_right(drop, k): e for k, e in ends.items()}
+    return TokenSpans(toks, starts, ends)
+
 
 # 최소 글로스 규칙: 고빈도 표제어 중심. 실제 서비스: 도메인 사전 + 규칙 + NMT 하이브리드.
 _LEXICON: Dict[str, str] = {
@@ -62,12 +153,45 @@ _LEXICON: Dict[str, str] = {
     "전국": "NATIONWIDE",
 }
 
-# 런타임 오버레이 사전(도메인 단어 추가/수정 용)
-_OVERLAY: Dict[str, str] = {}
+# 런타임 오버레이 사전(도메인 단어 추가/수정 용)은 스냅샷으로 관리한다.
+# 스냅샷은 불변이며, 새 스냅샷을 다 만든 뒤 참조 하나만 교체(copy-on-write)하므로 읽기 측은 락이 없다.
+_PUBLISH_LOCK = threading.Lock()
+_SEQ = 0  # 마지막으로 예약된 버전 번호(_PUBLISH_LOCK 보호)
+
+
+def _build_index(overlay: Dict[str, str]) -> LexiconIndex:
+    # 오버레이가 기본 사전보다 우선; 다어절 표제어("호우 경보")도 토큰 시퀀스로 색인
+    merged = dict(_LEXICON)
+    merged.update({k: v for k, v in overlay.items() if v})
+    return LexiconIndex(merged, tokenize_ko)
+
+
+_SNAPSHOT: LexiconSnapshot = LexiconSnapshot(0, {}, _build_index({}))
 
-def set_overlay_lexicon(d: Dict[str, str]):
-    global _OVERLAY
-    _OVERLAY = dict(d or {})
+
+def current_lexicon() -> LexiconSnapshot:
+    return _SNAPSHOT
+
+
+def set_overlay_lexicon(d: Dict[str, str], version: Optional[int] = None) -> LexiconSnapshot:
+    """
+    Build and publish a new overlay snapshot; returns the snapshot that is current afterwards.
+    version: 다른 프로세스의 스냅샷을 복제할 때 같은 버전 번호를 쓰기 위함(기본: +1)
+    The version is reserved before the (lock-free) index build; if a later-reserved update
+    has already been published when this build finishes, this one is stale and is dropped.
+    """
+    global _SNAPSHOT, _SEQ
+    overlay = dict(d or {})
+    with _PUBLISH_LOCK:
+        seq = _SEQ + 1 if version is None else int(version)
+        _SEQ = max(_SEQ, seq)
+    # 무거운 색인 생성은 락 밖에서; 게시(버전 확인+참조 교체)만 직렬화
+    index = _build_index(overlay)
+    with _PUBLISH_LOCK:
+        if seq <= _SNAPSHOT.version:
+            return _SNAPSHOT
+        _SNAPSHOT = LexiconSnapshot(seq, overlay, index)
+        return _SNAPSHOT
 
 
 def load_overlay_lexicon(path: str | Path) -> Optional[Dict[str, str]]:
@@ -80,26 +204,48 @@ def load_overlay_lexicon(path: str | Path) -> Optional[Dict[str, str]]:
     set_overlay_lexicon(data)  # set globally
     return data
 
-def ko_to_gloss(tokens: List[str]) -> List[Tuple[str, float]]:
-    glosses: List[Tuple[str, float]] = []
-    norm_tokens = normalize_tokens(tokens)
-    for t in norm_tokens:
-        g = _OVERLAY.get(t) or _LEXICON.get(t)
-        if g:
-            glosses.append((g, 0.9))
+def ko_to_gloss_aligned(tokens: List[str], lexicon: Optional[LexiconSnapshot] = None) -> List[Tuple[str, float, int, int]]:
+    """
+    Like ko_to_gloss, with source alignment: [(gloss, conf, token_start, token_end_exclusive)]
+    indices refer to the input tokens (a multi-word lexicon match spans several).
+    lexicon: snapshot to use (default: current); pass one to keep several calls consistent.
+    """
+    index = (lexicon or _SNAPSHOT).index
+    norm: List[str] = []
+    src: List[int] = []
+    for i, t in enumerate(tokens):
+        for n in normalize_token(t):
+            norm.append(n)
+            src.append(i)
+    glosses: List[Tuple[str, float, int, int]] = []
+    i = 0
+    n_norm = len(norm)
+    while i < n_norm:
+        m = index.match(norm, i)
+        if m:
+            g, n, stripped = m
+            glosses.append((g, 0.85 if stripped else 0.9, src[i], src[i + n - 1] + 1))
+            i += n
+            continue
+        t = norm[i]
+        # 미정 매핑: 지명/숫자/고유명사 등은 규칙/NER 처리 대상
+        # 숫자 규칙(간단): "12시" → NUM_12 + HOUR
+        if t.isdigit():
+            g, c = f"NUM_{t}", 0.85
+        elif t.startswith("NUM_"):
+            g, c = t, 0.85
         else:
-            # 미정 매핑: 지명/숫자/고유명사 등은 규칙/NER 처리 대상
-            # 숫자 규칙(간단): "12시" → NUM_12 + HOUR
-            if t.isdigit():
-                glosses.append((f"NUM_{t}", 0.85))
-            elif t.startswith("NUM_"):
-                glosses.append((t, 0.85))
+            # 한자어 수(일이삼사오육칠팔구, 십) 간단 파싱
+            val = parse_sino_korean_number(t)
+            if val is not None:
+                g, c = f"NUM_{val}", 0.85
             else:
-                # 한자어 수(일이삼사오육칠팔구, 십) 간단 파싱
-                val = parse_sino_korean_number(t)
-                if val is not None:
-                    glosses.append((f"NUM_{val}", 0.85))
-                else:
-                    glosses.append((t.upper(), 0.5))
+                g, c = t.upper(), 0.5
+        glosses.append((g, c, src[i], src[i] + 1))
+        i += 1
     # 간단한 불용어/어순 조정은 추후 추가
     return glosses
+
+
+def ko_to_gloss(tokens: List[str], lexicon: Optional[LexiconSnapshot] = None) -> List[Tuple[str, float]]:
+    return [(g, c) for g, c, _, _ in ko_to_gloss_aligned(tokens, lexicon)]
@@ -1,4 +1,3 @@
-from .normalize import normalize_tokens
-
-__all__ = ["normalize_tokens"]
+from .normalize import normalize_tokens, normalize_token
 
+__all__ = ["normalize_tokens", "normalize_token"]
@@ -1,6 +1,35 @@
 from typing import List
 
 
+def normalize_token(t: str) -> List[str]:
+    """
+    Normalize a single token; see normalize_tokens. Returns 1 or 2 tokens.
+    """
+    if t.endswith("시") and t[:-1].isdigit():
+        return [f"NUM_{t[:-1]}", "HOUR"]
+    elif t.endswith("분") and t[:-1].isdigit():
+        return [f"NUM_{t[:-1]}", "MINUTE"]
+    elif t.endswith("년") and t[:-1].isdigit():
+        return [f"NUM_{t[:-1]}", "YEAR"]
+    elif t.endswith("월") and t[:-1].isdigit():
+        return [f"NUM_{t[:-1]}", "MONTH"]
+    elif t.endswith("일") and t[:-1].isdigit():
+        return [f"NUM_{t[:-1]}", "DAY"]
+    elif t in ("오전", "AM", "am", "a.m."):
+        return ["AM"]
+    elif t in ("오후", "PM", "pm", "p.m."):
+        return ["PM"]
+    elif t in ("오늘",):
+        return ["TODAY"]
+    elif t in ("내일",):
+        return ["TOMORROW"]
+    elif t in ("모레",):
+        return ["DAY_AFTER_TOMORROW"]
+    elif t in ("어제",):
+        return ["YESTERDAY"]
+    return [t]
+
+
 def normalize_tokens(tokens: List[str]) -> List[str]:
     """
     Very light normalization for Korean date/time tokens.
@@ -9,35 +38,7 @@ def normalize_tokens(tokens: List[str]) -> List[str]:
     """
     out: List[str] = []
     for t in tokens:
-        if t.endswith("시") and t[:-1].isdigit():
-            out.append(f"NUM_{t[:-1]}")
-            out.append("HOUR")
-        elif t.endswith("분") and t[:-1].isdigit():
-            out.append(f"NUM_{t[:-1]}")
-            out.append("MINUTE")
-        elif t.endswith("년") and t[:-1].isdigit():
-            out.append(f"NUM_{t[:-1]}")
-            out.append("YEAR")
-        elif t.endswith("월") and t[:-1].isdigit():
-            out.append(f"NUM_{t[:-1]}")
-            out.append("MONTH")
-        elif t.endswith("일") and t[:-1].isdigit():
-            out.append(f"NUM_{t[:-1]}")
-            out.append("DAY")
-        elif t in ("오전", "AM", "am", "a.m."):
-            out.append("AM")
-        elif t in ("오후", "PM", "pm", "p.m."):
-            out.append("PM")
-        elif t in ("오늘",):
-            out.append("TODAY")
-        elif t in ("내일",):
-            out.append("TOMORROW")
-        elif t in ("모레",):
-            out.append("DAY_AFTER_TOMORROW")
-        elif t in ("어제",):
-            out.append("YESTERDAY")
-        else:
-            out.append(t)
+        out.extend(normalize_token(t))
     return out
 
 
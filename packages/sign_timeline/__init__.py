@@ -1,4 +1,5 @@
-from .timeline import compile_glosses
-
-__all__ = ["compile_glosses"]
+from .timeline import compile_glosses, compile_glosses_arrays, EventArrays, set_clip, invalidate_templates
+from .diff import diff_window, myers_windows, channel_windows, apply_windows, event_key, shape_key, windows_cheaper
 
+__all__ = ["compile_glosses", "compile_glosses_arrays", "EventArrays", "set_clip", "invalidate_templates", "diff_window",
+           "myers_windows", "channel_windows", "apply_windows", "event_key", "shape_key", "windows_cheaper"]
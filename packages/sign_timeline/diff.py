@@ -0,0 +1,208 @@
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# aux events follow their gloss's default event at the same t_ms in this order
+_CHANNEL_RANK = {"default": 0, "face": 1, "gaze": 2}
+# rough JSON sizes used to pick the cheaper replace encoding (one event / one window envelope)
+EVENT_WIRE_BYTES = 80
+WINDOW_WIRE_BYTES = 64
+
+
+def diff_window(old: List[str], new: List[str]) -> Tuple[int, int]:
+    """
+    returns (start_index_in_new, end_index_in_new_exclusive) to replace
+    calculates common prefix and suffix to minimize replacement window
+    """
+    # common prefix
+    p = 0
+    nmin = min(len(old), len(new))
+    while p < nmin and old[p] == new[p]:
+        p += 1
+    # common suffix (avoid overlap with prefix)
+    s = 0
+    while s < (len(old) - p) and s < (len(new) - p) and old[len(old) - 1 - s] == new[len(new) - 1 - s]:
+        s += 1
+    start = p
+    end = len(new) - s
+    if end < start:
+        end = start
+    return start, end
+
+
+def event_key(e: Dict[str, Any]) -> Tuple:
+    # events are equal only if everything a client plays matches (a timing shift is a change)
+    return (e["clip"], e["t_ms"], e["dur_ms"], e.get("channel", "default"), e.get("confidence"))
+
+
+def _myers_matches(a: Sequence[Hashable], b: Sequence[Hashable], max_d: int) -> Optional[List[Tuple[int, int]]]:
+    """Matched index pairs of a shortest edit script (Myers O(ND)), or None if it needs more than max_d edits."""
+    n, m = len(a), len(b)
+    limit = min(n + m, max_d)
+    off = limit + 1
+    v = [0] * (2 * limit + 3)
+    trace = []
+    for d in range(limit + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[off + k - 1] < v[off + k + 1]):
+                x = v[off + k + 1]
+            else:
+                x = v[off + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[off + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, d, n, m, off)
+    return None
+
+
+def _backtrack(trace: List[List[int]], d_end: int, x: int, y: int, off: int) -> List[Tuple[int, int]]:
+    matches = []
+    for d in range(d_end, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[off + k - 1] < v[off + k + 1]):
+            pk = k + 1
+        else:
+            pk = k - 1
+        px = v[off + pk]
+        py = px - pk
+        while x > px and y > py:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = px, py
+    matches.reverse()
+    return matches
+
+
+def myers_windows(old: Sequence[Hashable], new: Sequence[Hashable], max_d: int = 256) -> List[Tuple[int, int, int, int]]:
+    """
+    Minimal replace windows turning old into new: [(old_start, old_end, new_start, new_end)], ascending.
+    Common prefix/suffix are trimmed first; if the middle needs more than max_d edits it is returned as
+    one window (the prefix/suffix answer), which bounds the cost at O((N + M) * max_d).
+    """
+    n, m = len(old), len(new)
+    p = 0
+    while p < n and p < m and old[p] == new[p]:
+        p += 1
+    s = 0
+    while s < n - p and s < m - p and old[n - 1 - s] == new[m - 1 - s]:
+        s += 1
+    a, b = old[p:n - s], new[p:m - s]
+    if not a and not b:
+        return []
+    matches = _myers_matches(a, b, max_d) if a and b else []
+    if matches is None:
+        return [(p, n - s, p, m - s)]
+    out = []
+    i = j = 0
+    for mi, mj in matches + [(len(a), len(b))]:
+        if mi > i or mj > j:
+            out.append((p + i, p + mi, p + j, p + mj))
+        i, j = mi + 1, mj + 1
+    return out
+
+
+def shape_key(e: Dict[str, Any]) -> Tuple:
+    # what an event plays, without when: a duration change earlier in the sentence moves every later
+    # event, and those still match here (the move is sent as a window's shift_ms)
+    return (e["clip"], e["dur_ms"], e.get("channel", "default"), e.get("confidence"))
+
+
+def channel_windows(old: List[Dict[str, Any]], new: List[Dict[str, Any]], max_d: int = 256) -> List[Dict[str, Any]]:
+    """
+    Per-channel replace windows between two event lists, applied in order. Each window means: drop
+    the events of its `channels` with from_t_ms <= t_ms < to_t_ms (no to_t_ms = to the end), move
+    the ones at or after to_t_ms by shift_ms (if present), then insert `events`.
+    Events are matched on shape_key, so the unchanged suffix after a duration change is a shift, not
+    a resend; a window with no events and from_t_ms == to_t_ms is a pure shift. Times of a window
+    are those of the list after the windows before it, so order matters within a channel; windows
+    of different channels with the same range and shift share one entry where that keeps each
+    channel's order.
+    """
+    channels: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+    for e in old:
+        channels.setdefault(e.get("channel", "default"), ([], []))[0].append(e)
+    for e in new:
+        channels.setdefault(e.get("channel", "default"), ([], []))[1].append(e)
+    out: List[Dict[str, Any]] = []
+    at: Dict[Tuple[int, Optional[int], int], int] = {}  # (from, to, shift) -> index of its latest window in out
+
+    def add(ch: str, lo: int, hi: Optional[int], shift: int, events: List[Dict[str, Any]]) -> None:
+        nonlocal pos
+        rng = (lo, hi, shift)
+        k = at.get(rng, -1)
+        if k < pos:  # sharing an earlier entry would apply it before this channel's previous windows
+            w = {"channels": [], "from_t_ms": lo, "events": []}
+            if hi is not None:
+                w["to_t_ms"] = hi
+            if shift:
+                w["shift_ms"] = shift
+            k = at[rng] = len(out)
+            out.append(w)
+        out[k]["channels"].append(ch)
+        out[k]["events"].extend(events)
+        pos = k + 1
+
+    for ch in sorted(channels, key=lambda c: _CHANNEL_RANK.get(c, len(_CHANNEL_RANK))):
+        o, n = channels[ch]
+        pos = 0  # out index after this channel's latest window
+        cur = 0  # shift already applied to the rest of o by earlier windows
+        i = j = 0
+        for i0, i1, j0, j1 in myers_windows([shape_key(e) for e in o], [shape_key(e) for e in n], max_d) + [(len(o), len(o), len(n), len(n))]:
+            # matched run: a change in new_t - old_t (e.g. after an aux event moved) is a pure shift
+            for oe, ne in zip(o[i:i0], n[j:j0]):
+                d = ne["t_ms"] - oe["t_ms"]
+                if d != cur:
+                    add(ch, oe["t_ms"] + cur, oe["t_ms"] + cur, d - cur, [])
+                    cur = d
+            if i0 == i1 and j0 == j1:
+                break
+            hi = o[i1]["t_ms"] + cur if i1 < len(o) else None
+            ts = [e["t_ms"] + cur for e in o[i0:i1]] + [e["t_ms"] for e in n[j0:j1]]
+            lo = min(ts)
+            if i0 > 0:
+                lo = max(lo, n[j0 - 1]["t_ms"] + 1)  # never drop the matched event before the window
+            if hi is not None:
+                lo = min(lo, hi)
+            d = n[j1]["t_ms"] - o[i1]["t_ms"] if i1 < len(o) else cur
+            add(ch, lo, hi, d - cur, n[j0:j1])
+            cur = d
+            i, j = i1, j1
+    for w in out:
+        if len(w["channels"]) > 1:
+            w["events"].sort(key=_order)
+    return out
+
+
+def _order(e: Dict[str, Any]) -> Tuple[int, int]:
+    return e["t_ms"], _CHANNEL_RANK.get(e.get("channel", "default"), len(_CHANNEL_RANK))
+
+
+def windows_cheaper(windows: List[Dict[str, Any]], n_tail: int) -> bool:
+    """
+    True if the windows encode smaller than resending the n_tail events from their earliest
+    from_t_ms on (the single "replace from from_t_ms" form, which is also exact).
+    """
+    n_win = sum(len(w["events"]) for w in windows)
+    return n_win * EVENT_WIRE_BYTES + len(windows) * WINDOW_WIRE_BYTES < n_tail * EVENT_WIRE_BYTES
+
+
+def apply_windows(events: List[Dict[str, Any]], windows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Client-side application of channel_windows() (windows of several messages apply in order)."""
+    out = list(events)
+    for w in windows:
+        chs, lo, hi, shift = w["channels"], w["from_t_ms"], w.get("to_t_ms"), w.get("shift_ms", 0)
+        kept = []
+        for e in out:
+            if e.get("channel", "default") in chs and e["t_ms"] >= lo:
+                if hi is None or e["t_ms"] < hi:
+                    continue
+                if shift:
+                    e = {**e, "t_ms": e["t_ms"] + shift}
+            kept.append(e)
+        out = kept + w["events"]
+    out.sort(key=_order)
+    return out
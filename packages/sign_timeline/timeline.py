@@ -1,4 +1,5 @@
 import time
+from array import array
 from typing import List, Tuple, Dict, Any
 
 # 글로스→클립 매핑(간단 버전). 실제 서비스는 모션 리타게팅/변형 파라미터 포함.
@@ -47,45 +48,146 @@ _GAZE_CLIPS = {
 }
 
 
-def compile_glosses(glosses: List[Tuple[str, float]], start_ms: int = 0, gap_ms: int = 60, include_aux_channels: bool = True) -> Dict[str, Any]:
+# 글로스별 사전 컴파일 템플릿: gloss -> (clip, dur_ms, ((aux_clip, aux_dur_ms, channel), ...))
+# 클립 테이블이 바뀌면 invalidate_templates()로 재생성한다.
+_TEMPLATES: Dict[str, Tuple[str, int, Tuple[Tuple[str, int, str], ...]]] | None = None
+_TEMPLATES_AUX: Dict[str, Tuple[str, int, Tuple[Tuple[str, int, str], ...]]] | None = None
+_CONF_CACHE: Dict[float, float] = {}
+
+
+def _build_templates(include_aux_channels: bool):
+    out = {}
+    for gloss in set(_CLIPS) | set(_FACE_CLIPS) | set(_GAZE_CLIPS):
+        spec = _CLIPS.get(gloss, {"clip": gloss, "dur_ms": DEFAULT_DUR})
+        dur = spec["dur_ms"]
+        aux = []
+        if include_aux_channels:
+            for table, channel in ((_FACE_CLIPS, "face"), (_GAZE_CLIPS, "gaze")):
+                a = table.get(gloss)
+                if a:
+                    aux.append((a["clip"], min(a["dur_ms"], dur), channel))
+        out[gloss] = (spec["clip"], dur, tuple(aux))
+    return out
+
+
+def invalidate_templates():
+    global _TEMPLATES, _TEMPLATES_AUX
+    _TEMPLATES = None
+    _TEMPLATES_AUX = None
+
+
+def _templates(include_aux_channels: bool):
+    global _TEMPLATES, _TEMPLATES_AUX
+    if include_aux_channels:
+        if _TEMPLATES_AUX is None:
+            _TEMPLATES_AUX = _build_templates(True)
+        return _TEMPLATES_AUX
+    if _TEMPLATES is None:
+        _TEMPLATES = _build_templates(False)
+    return _TEMPLATES
+
+
+def set_clip(gloss: str, clip: str, dur_ms: int, channel: str = "default"):
+    """Register/override a clip mapping for a channel (default|face|gaze) and rebuild templates."""
+    table = {"default": _CLIPS, "face": _FACE_CLIPS, "gaze": _GAZE_CLIPS}.get(channel)
+    if table is None:
+        raise ValueError(f"unknown channel: {channel}")
+    table[gloss] = {"clip": clip, "dur_ms": int(dur_ms)}
+    invalidate_templates()
+
+
+class EventArrays:
+    """
+    Column-oriented timeline events (parallel arrays). Converted to JSON dicts only at the edge.
+    Stored columns are typed arrays; clip/channel hold references to the shared template strings.
+    compile_glosses_arrays() fills plain lists instead (appending to a list is cheaper than to a
+    typed array); compact() turns them into typed arrays for long-lived storage.
+    """
+    __slots__ = ("t_ms", "clip", "dur_ms", "channel", "confidence")
+
+    def __init__(self, t_ms=None, clip: List[str] | None = None, dur_ms=None, channel: List[str] | None = None, confidence=None):
+        self.t_ms = array("q") if t_ms is None else t_ms
+        self.clip: List[str] = [] if clip is None else clip
+        self.dur_ms = array("q") if dur_ms is None else dur_ms
+        self.channel: List[str] = [] if channel is None else channel
+        self.confidence = array("d") if confidence is None else confidence
+
+    def __len__(self) -> int:
+        return len(self.t_ms)
+
+    def compact(self) -> "EventArrays":
+        """Numeric columns as typed arrays (in place; returns self)."""
+        if not isinstance(self.t_ms, array):
+            self.t_ms = array("q", self.t_ms)
+            self.dur_ms = array("q", self.dur_ms)
+            self.confidence = array("d", self.confidence)
+        return self
+
+    def to_dicts(self, start: int = 0, end: int | None = None) -> List[Dict[str, Any]]:
+        sl = slice(start, end)
+        return [
+            {"t_ms": t, "clip": c, "dur_ms": d, "channel": ch, "confidence": cf}
+            for t, c, d, ch, cf in zip(self.t_ms[sl], self.clip[sl], self.dur_ms[sl], self.channel[sl], self.confidence[sl])
+        ]
+
+    def splice(self, start: int, end: int, events: List[Dict[str, Any]]) -> None:
+        """Replace events [start:end) with event dicts (the changed window of a diff)."""
+        self.t_ms[start:end] = array("q", [int(e["t_ms"]) for e in events])
+        self.clip[start:end] = [e["clip"] for e in events]
+        self.dur_ms[start:end] = array("q", [int(e["dur_ms"]) for e in events])
+        self.channel[start:end] = [e.get("channel", "default") for e in events]
+        self.confidence[start:end] = array("d", [float(e.get("confidence", 1.0)) for e in events])
+
+    @classmethod
+    def from_dicts(cls, events: List[Dict[str, Any]]) -> "EventArrays":
+        ev = cls()
+        ev.splice(0, 0, events)
+        return ev
+
+
+def compile_glosses_arrays(glosses: List[Tuple[str, float]], start_ms: int = 0, gap_ms: int = 60, include_aux_channels: bool = True) -> EventArrays:
     """
     glosses: [(gloss, confidence)]
-    returns SignTimeline v0 JSON
+    returns EventArrays (same events/order as compile_glosses) with list columns; see EventArrays.compact()
     """
+    tpl = _templates(include_aux_channels)
+    conf_cache = _CONF_CACHE
+    ts: List[int] = []
+    clips: List[str] = []
+    durs: List[int] = []
+    chans: List[str] = []
+    confs: List[float] = []
+    t_app, c_app, d_app, ch_app, cf_app = ts.append, clips.append, durs.append, chans.append, confs.append
     t = start_ms
-    events = []
     for gloss, conf in glosses:
-        spec = _CLIPS.get(gloss, {"clip": gloss, "dur_ms": DEFAULT_DUR})
-        events.append({
-            "t_ms": t,
-            "clip": spec["clip"],
-            "dur_ms": spec["dur_ms"],
-            "channel": "default",
-            "confidence": round(float(conf), 3)
-        })
-        if include_aux_channels:
-            face = _FACE_CLIPS.get(gloss)
-            if face:
-                events.append({
-                    "t_ms": t,
-                    "clip": face["clip"],
-                    "dur_ms": min(face["dur_ms"], spec["dur_ms"]),
-                    "channel": "face",
-                    "confidence": round(float(conf), 3)
-                })
-            gaze = _GAZE_CLIPS.get(gloss)
-            if gaze:
-                events.append({
-                    "t_ms": t,
-                    "clip": gaze["clip"],
-                    "dur_ms": min(gaze["dur_ms"], spec["dur_ms"]),
-                    "channel": "gaze",
-                    "confidence": round(float(conf), 3)
-                })
-        t += spec["dur_ms"] + gap_ms
+        spec = tpl.get(gloss)
+        if spec is None:
+            clip, dur, aux = gloss, DEFAULT_DUR, ()
+        else:
+            clip, dur, aux = spec
+        cf = conf_cache.get(conf)
+        if cf is None:
+            cf = round(float(conf), 3)
+            if len(conf_cache) < 1024:
+                conf_cache[conf] = cf
+        t_app(t); c_app(clip); d_app(dur); ch_app("default"); cf_app(cf)
+        if aux:
+            for a_clip, a_dur, a_ch in aux:
+                t_app(t); c_app(a_clip); d_app(a_dur); ch_app(a_ch); cf_app(cf)
+        t += dur + gap_ms
+    return EventArrays(ts, clips, durs, chans, confs)
+
+
+def compile_glosses(glosses: List[Tuple[str, float]], start_ms: int = 0, gap_ms: int = 60, include_aux_channels: bool = True) -> Dict[str, Any]:
+    """
+    glosses: [(gloss, confidence)]
+    returns SignTimeline v0 JSON
+    """
+    events = compile_glosses_arrays(glosses, start_ms=start_ms, gap_ms=gap_ms, include_aux_channels=include_aux_channels).to_dicts()
+    now = int(time.time()*1000)
     return {
-        "id": f"signtimeline-{int(time.time()*1000)}",
-        "created_ms": int(time.time()*1000),
+        "id": f"signtimeline-{now}",
+        "created_ms": now,
         "lang": "ko-KR->KSL",
         "events": events,
         "meta": {"version": "v0", "generator": "sign_timeline.compile_glosses"}
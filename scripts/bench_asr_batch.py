@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import time
+
+from services.asr import FakeASRModel, synth_pcm
+from services.asr_pool import PooledModel
+
+
+def p90(xs):
+    xs = sorted(xs)
+    return xs[int(0.9 * (len(xs) - 1))] if xs else 0.0
+
+
+async def run(channels, args, batch_max):
+    """p90 window latency (queued + inference, ms) with `channels` streams on one inference thread."""
+    model = FakeASRModel(delay_s=args.call_ms / 1000.0, item_delay_s=args.item_ms / 1000.0)
+    pm = PooledModel(("stub", "cpu", "int8"), model, concurrency=1, queue_max=channels,
+                     batch_max=batch_max, batch_deadline_ms=args.deadline_ms)
+    window = synth_pcm("속보 서울 태풍")[:32000]
+    hop = args.hop_ms / 1000.0
+    lat = []
+    end = time.perf_counter() + args.duration
+
+    async def channel(i):
+        await asyncio.sleep(hop * i / channels)  # streams are not aligned
+        nxt = time.perf_counter()
+        while nxt < end:
+            t0 = time.perf_counter()
+            await pm.infer(window, 16000)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            # a window that took longer than the hop is followed by the latest audio right away
+            nxt = max(nxt + hop, time.perf_counter())
+            await asyncio.sleep(max(0.0, nxt - time.perf_counter()))
+
+    await asyncio.gather(*(channel(i) for i in range(channels)))
+    pm.close()
+    return p90(lat)
+
+
+async def capacity(args, batch_max):
+    """Most channels whose p90 stays within the target (doubling, then bisection)."""
+    ok, lo = 0, 1
+    while lo <= args.max_channels and await run(lo, args, batch_max) <= args.p90_ms:
+        ok, lo = lo, lo * 2
+    hi = min(lo, args.max_channels + 1)
+    while hi - ok > 1:
+        mid = (ok + hi) // 2
+        if await run(mid, args, batch_max) <= args.p90_ms:
+            ok = mid
+        else:
+            hi = mid
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="ASR channels per core at a fixed p90: per-window vs cross-session batched inference (stub model)")
+    ap.add_argument("--batch", type=str, default="1,4,8,16", help="ASR_BATCH_MAX values")
+    ap.add_argument("--deadline-ms", type=float, default=30.0, help="ASR_BATCH_DEADLINE_MS")
+    ap.add_argument("--hop-ms", type=int, default=400, help="one window per channel every hop")
+    ap.add_argument("--p90-ms", type=float, default=400.0, help="latency target (window queued + inference)")
+    ap.add_argument("--call-ms", type=float, default=40.0, help="stub cost per inference call")
+    ap.add_argument("--item-ms", type=float, default=4.0, help="stub cost per window in a call")
+    ap.add_argument("--duration", type=float, default=3.0, help="seconds per measurement")
+    ap.add_argument("--max-channels", type=int, default=256)
+    args = ap.parse_args()
+
+    print(f"stub: {args.call_ms:g} ms/call + {args.item_ms:g} ms/window, hop {args.hop_ms} ms, p90 <= {args.p90_ms:g} ms, 1 inference thread")
+    for b in (int(x) for x in args.batch.split(",")):
+        n = asyncio.run(capacity(args, b))
+        p = asyncio.run(run(n, args, b)) if n else 0.0
+        print(f"  batch_max={b:3d} deadline={args.deadline_ms:g}ms  channels/core={n:4d}  p90={p:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+import time
+
+from packages.ksl_rules import tokenize_ko, ko_to_gloss
+from packages.sign_timeline import compile_glosses
+from services import wire
+from services.pipeline_server import ConnectionManager
+
+
+class MockWS:
+    """Websocket stand-in: send_json encodes like Starlette, send_text just counts."""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.frames += 1
+
+    async def send_text(self, text):
+        self.frames += 1
+
+
+async def per_socket_send_json(clients, message):
+    # previous behavior: Starlette re-encodes the message for every socket
+    await asyncio.gather(*[ws.send_json(message) for ws in clients], return_exceptions=True)
+
+
+async def broadcast_and_flush(m, message):
+    # enqueue + every per-client writer has sent the frame
+    await m.broadcast_json(message)
+    await m.drain()
+
+
+async def bench(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="timeline broadcast fan-out benchmark (mock websockets)")
+    ap.add_argument("--clients", type=int, default=500)
+    ap.add_argument("--words", type=int, default=200, help="timeline size in words")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    words = ("안녕하세요 한국 날씨 속보 태풍 서울 부산 1 2 3 " * (args.words // 10 + 1)).split()[:args.words]
+    tl = compile_glosses(ko_to_gloss(tokenize_ko(" ".join(words))))
+    message = {"type": "timeline", "session_id": "bench", "data": tl}
+    size = len(json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+    clients = [MockWS() for _ in range(args.clients)]
+    m = ConnectionManager()
+    for ws in clients:
+        await m.connect(ws)
+
+    old = await bench(lambda: per_socket_send_json(clients, message), args.repeat)
+    results = {}
+    for backend in ("json", "orjson") if wire.orjson is not None else ("json",):
+        wire.set_backend(backend)
+        results[backend] = await bench(lambda: broadcast_and_flush(m, message), args.repeat)
+    wire.set_backend("auto")
+
+    print(f"clients={args.clients} events={len(tl['events'])} message={size} bytes")
+    print(f"per-socket send_json: {old:.2f} ms/broadcast")
+    for backend, ms in results.items():
+        print(f"encode-once ({backend}): {ms:.2f} ms/broadcast  x{old / ms:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+import argparse
+import random
+from pathlib import Path
+
+from packages.sign_timeline import apply_windows, diff_window
+from services import wire
+from services.ingest_executor import _COMPILERS, compile_session, drop_session
+from services.replay import read_recording
+
+_VOCAB = "안녕하세요 오늘 한국 날씨 속보 태풍 서울 부산 호우 경보 1 2 3 지진 해일 강풍 주의보 내일 맑음 눈".split()
+
+
+def synthetic(sessions, words, correct_p, seed=0):
+    # growing ASR partials; with probability correct_p a recent word is revised while the next one arrives
+    rnd = random.Random(seed)
+    streams = {}
+    for s in range(sessions):
+        acc, texts = [], []
+        for _ in range(words):
+            if len(acc) > 3 and rnd.random() < correct_p:
+                acc[-rnd.randint(2, min(6, len(acc)))] = rnd.choice(_VOCAB)
+            acc.append(rnd.choice(_VOCAB))
+            texts.append(" ".join(acc))
+        streams[f"ch{s}"] = texts
+    return streams
+
+
+def from_recording(path):
+    streams = {}
+    for _, m in read_recording(Path(path)):
+        if m.get("type") in ("partial", "final"):
+            streams.setdefault(m["session_id"], []).append(m["text"])
+    return streams
+
+
+def _tail_apply(client, from_t, events):
+    return [x for x in client if x["t_ms"] < from_t] + events
+
+
+def run(streams, max_d):
+    kinds = ("previous", "prefix", "myers")
+    out = {k: {"bytes": 0, "replaces": 0, "outputs": 0, "events_sent": 0, "windows": 0, "mismatch": 0} for k in kinds}
+    for sid, texts in streams.items():
+        client = {k: None for k in kinds}
+        for i, text in enumerate(texts):
+            res = compile_session(sid, text, 0, 60, True, i == 0, False, max_d)
+            eng = _COMPILERS[sid]
+            new, p0 = eng.events, eng.stable_events
+            for kind in kinds:
+                r = out[kind]
+                if client[kind] is None:
+                    msg = {"type": "timeline", "session_id": sid, "data": {"id": "x", "events": list(new)}}
+                    client[kind] = list(new)
+                elif kind == "previous":
+                    # before: clip-name prefix/suffix, only the changed slice is sent
+                    s, e = diff_window([x["clip"] for x in eng.last_replaced], [x["clip"] for x in new[p0:]])
+                    if e <= s:
+                        continue
+                    evs = new[p0 + s:p0 + e]
+                    msg = {"type": "timeline.replace", "session_id": sid, "from_t_ms": evs[0]["t_ms"], "data": {"id": "x", "events": evs}}
+                    client[kind] = _tail_apply(client[kind], msg["from_t_ms"], evs)
+                    r["events_sent"] += len(evs)
+                else:
+                    if res["end"] <= res["start"] and res["n_events"] == len(client[kind]) and not res["windows"]:
+                        continue
+                    wins = res["windows"] if kind == "myers" else None
+                    if wins:
+                        data = {"id": "x", "windows": wins}
+                        client[kind] = apply_windows(client[kind], wins)
+                        r["events_sent"] += sum(len(w["events"]) for w in wins)
+                        r["windows"] += len(wins)
+                    else:
+                        evs = new[res["replace_from"]:]
+                        data = {"id": "x", "events": evs}
+                        client[kind] = _tail_apply(client[kind], res["from_t_ms"], evs)
+                        r["events_sent"] += len(evs)
+                    msg = {"type": "timeline.replace", "session_id": sid, "from_t_ms": res["from_t_ms"], "data": data}
+                r["outputs"] += 1
+                r["replaces"] += msg["type"] == "timeline.replace"
+                r["bytes"] += len(wire.dumps(msg).encode("utf-8"))
+        for kind in kinds:
+            out[kind]["mismatch"] += client[kind] != new
+        drop_session(sid)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="timeline.replace size: previous clip-name window vs REPLACE_DIFF=prefix|myers")
+    ap.add_argument("recording", nargs="?", default=None, help="INGEST_RECORD file; default: synthetic streams")
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--words", type=int, default=60)
+    ap.add_argument("--correct", type=float, default=0.2, help="synthetic: probability of a mid-sentence correction per partial")
+    ap.add_argument("--max-d", type=int, default=256)
+    args = ap.parse_args()
+
+    streams = from_recording(args.recording) if args.recording else synthetic(args.sessions, args.words, args.correct)
+    res = run(streams, args.max_d)
+    print(f"sessions={len(streams)} partials={sum(len(v) for v in streams.values())}")
+    base = res["previous"]["bytes"]
+    for kind, r in res.items():
+        ratio = r["replaces"] / r["outputs"] if r["outputs"] else 0
+        print(f"{kind:8s} bytes={r['bytes']:9d} ({r['bytes'] / base:5.2f}x)  replace_ratio={ratio:.3f}  events_resent={r['events_sent']:7d}"
+              f"  windows={r['windows']:6d}  client_state_mismatch={r['mismatch']}/{len(streams)}")
+
+
+if __name__ == "__main__":
+    main()
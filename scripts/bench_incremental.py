@@ -0,0 +1,53 @@
+import argparse
+import random
+import time
+
+from packages.incremental import IncrementalCompiler
+from packages.ksl_rules import tokenize_ko, ko_to_gloss
+from packages.sign_timeline import compile_glosses
+
+WORDS = "안녕하세요 오늘 한국 날씨 속보 태풍 지진 서울 부산 오후 12시 30분 비 눈 경보 주의보 기온 영하".split()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="per-partial cost: full recompile vs incremental compiler")
+    ap.add_argument("--tokens", type=int, default=4000, help="final session length in words")
+    ap.add_argument("--flip", type=float, default=0.3, help="probability a partial rewrites the last word")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    # simulate ASR partials: append a word, sometimes revise the last one
+    partials = []
+    words = []
+    while len(words) < args.tokens:
+        if words and rnd.random() < args.flip:
+            words[-1] = rnd.choice(WORDS)
+        else:
+            words.append(rnd.choice(WORDS))
+        partials.append(" ".join(words))
+
+    marks = sorted({m for m in (100, 500, 1000, 2000, 4000, 8000) if m <= args.tokens} | {args.tokens})
+    eng = IncrementalCompiler()
+    full_us = {}
+    inc_us = {}
+    for text in partials:
+        n = text.count(" ") + 1
+        t0 = time.perf_counter()
+        eng.update(text)
+        t1 = time.perf_counter()
+        if n in marks and n not in full_us:
+            compile_glosses(ko_to_gloss(tokenize_ko(text)))
+            t2 = time.perf_counter()
+            inc_us[n] = (t1 - t0) * 1e6
+            full_us[n] = (t2 - t1) * 1e6
+
+    print(f"partials={len(partials)}")
+    print(f"{'words':>7} {'full_us':>10} {'incr_us':>10} {'speedup':>8}")
+    for n in marks:
+        if n in full_us:
+            print(f"{n:>7} {full_us[n]:>10.1f} {inc_us[n]:>10.1f} {full_us[n] / max(inc_us[n], 1e-9):>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,45 @@
 import argparse
 import asyncio
 import json
+import math
 import time
 
 import websockets
 
 
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = min(len(sorted_vals) - 1, max(0, int(math.ceil(p / 100.0 * len(sorted_vals)) - 1)))
+    return sorted_vals[k]
+
+
+async def run_session(url, session_id, args, growing):
+    # returns per-message ack round-trip times (ms) for one session
+    rtts = []
+    words = args.text.split()
+    async with websockets.connect(url, ping_interval=20, max_queue=None) as ws:
+        for i in range(args.count):
+            if growing:
+                # long-running broadcast: text keeps growing by one word per partial
+                text = " ".join(words[j % len(words)] for j in range(i + 1))
+            else:
+                text = args.text
+            ts = int(time.time()*1000)
+            msg = {"type": "partial", "session_id": session_id, "text": text, "origin_ts": ts}
+            t0 = time.perf_counter()
+            await ws.send(json.dumps(msg, ensure_ascii=False))
+            ack = json.loads(await ws.recv())
+            rtts.append((time.perf_counter() - t0) * 1000.0)
+            if ack.get("ok"):
+                pass
+            elif ack.get("rate_limited"):
+                # backoff on RL
+                await asyncio.sleep(0.2)
+            await asyncio.sleep(args.interval_ms/1000.0)
+    return rtts
+
+
 async def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--url", default="ws://localhost:8000/ws/ingest")
@@ -15,6 +49,8 @@ async def main():
     ap.add_argument("--interval_ms", type=int, default=150)
     ap.add_argument("--text", default="안녕하세요 한국 날씨 속보 태풍")
     ap.add_argument("--stats", default="http://localhost:8000/stats")
+    ap.add_argument("--sessions", type=int, default=1, help="concurrent sessions (one websocket each)")
+    ap.add_argument("--growing", action="store_true", help="grow the text by one word per partial instead of repeating it")
     args = ap.parse_args()
 
     url = args.url
@@ -22,19 +58,21 @@ async def main():
         sep = '&' if '?' in url else '?'
         url = f"{url}{sep}key={args.api_key}"
 
-    lat = []
-    async with websockets.connect(url, ping_interval=20) as ws:
-        for i in range(args.count):
-            ts = int(time.time()*1000)
-            msg = {"type": "partial", "session_id": args.session, "text": args.text, "origin_ts": ts}
-            await ws.send(json.dumps(msg, ensure_ascii=False))
-            ack = json.loads(await ws.recv())
-            if ack.get("ok"):
-                pass
-            elif ack.get("rate_limited"):
-                # backoff on RL
-                await asyncio.sleep(0.2)
-            await asyncio.sleep(args.interval_ms/1000.0)
+    if args.sessions > 1:
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*[
+            run_session(url, f"{args.session}-{i}", args, args.growing) for i in range(args.sessions)
+        ])
+        elapsed = time.perf_counter() - t0
+        p99s = sorted(_pct(sorted(r), 99) for r in results if r)
+        all_rtt = sorted(x for r in results for x in r)
+        print(f"sessions={args.sessions} messages={len(all_rtt)} elapsed={elapsed:.1f}s rate={len(all_rtt)/elapsed:.1f} msg/s")
+        print("ack rtt ms p50/p90/p99 (all):", *(round(_pct(all_rtt, p), 1) for p in (50, 90, 99)))
+        print("per-session p99 ms min/median/max:", round(p99s[0], 1), round(_pct(p99s, 50), 1), round(p99s[-1], 1))
+    else:
+        rtts = sorted(await run_session(url, args.session, args, args.growing))
+        if rtts:
+            print("ack rtt ms p50/p90/p99:", *(round(_pct(rtts, p), 1) for p in (50, 90, 99)))
 
     try:
         import aiohttp
@@ -50,4 +88,3 @@ async def main():
 
 if __name__ == "__main__":
     asyncio.run(main())
-
@@ -0,0 +1,54 @@
+import argparse
+import random
+import time
+
+from packages.ksl_rules import current_lexicon, ko_to_gloss, set_overlay_lexicon, tokenize_ko
+
+_SYL = "가나다라마바사아자차카타파하거너더러머버서어저처커터퍼허"
+
+
+def random_lexicon(n, seed=5):
+    # 1–3 word phrases of 2–4 syllables, like domain overlay entries
+    rnd = random.Random(seed)
+    out = {}
+    while len(out) < n:
+        phrase = " ".join("".join(rnd.choice(_SYL) for _ in range(rnd.randint(2, 4))) for _ in range(rnd.randint(1, 3)))
+        out[phrase] = "G" + str(len(out))
+    return out
+
+
+def bench(toks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        ko_to_gloss(toks)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="ko_to_gloss cost vs overlay lexicon size (trie longest match)")
+    ap.add_argument("--sizes", default="0,1000,10000,100000")
+    ap.add_argument("--words", type=int, default=700, help="phrases in the input text")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    big = random_lexicon(max(sizes))
+    rnd = random.Random(0)
+    toks = tokenize_ko(" ".join(rnd.choice(list(big)) for _ in range(args.words)))
+    print(f"tokens={len(toks)}")
+    base = None
+    try:
+        for n in sizes:
+            overlay = dict(list(big.items())[:n])
+            set_overlay_lexicon(overlay)
+            us = bench(toks, args.repeat)
+            base = base or us
+            print(f"overlay={n:<7} max_len={current_lexicon().index.max_len}  {us:9.1f} us  {us / base:5.2f}x")
+    finally:
+        set_overlay_lexicon({})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+from packages.sign_timeline import compile_glosses_arrays
+from packages.sign_timeline.timeline import _CLIPS
+from services.session_state import SessionState
+
+
+class LegacySessionState(BaseModel):
+    # reference: the previous pydantic model (dict per event, list of recent timestamps)
+    text: str = ""
+    events: List[Dict[str, Any]] = []
+    base_id: Optional[str] = None
+    start_ms: int = 0
+    gap_ms: int = 60
+    recent_ms: List[int] = []
+    last_update_ms: int = 0
+    meta: Dict[str, Any] = {}
+    last_text: str = ""
+    last_replace_broadcast_ms: int = 0
+    _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
+
+
+def legacy_allow(st: LegacySessionState, now_ms: int, limit: int) -> bool:
+    st.recent_ms = [t for t in st.recent_ms if now_ms - t <= 1000]
+    if len(st.recent_ms) >= max(1, limit):
+        return False
+    st.recent_ms.append(now_ms)
+    return True
+
+
+def build(kind: str, n: int, glosses_per_session: int, rps: int, seed: int = 0) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    vocab = list(_CLIPS) + ["ALERT", "HEAVY_RAIN", "SEOUL", "NUM_12", "HOUR"]
+    now = int(time.time() * 1000)
+    out = {}
+    for i in range(n):
+        glosses = [(rnd.choice(vocab), rnd.choice((0.9, 0.85, 0.5))) for _ in range(glosses_per_session)]
+        arr = compile_glosses_arrays(glosses)
+        text = " ".join(g for g, _ in glosses).lower()
+        if kind == "legacy":
+            st = LegacySessionState()
+            st.events = arr.to_dicts()
+            for k in range(rps):
+                legacy_allow(st, now + k, rps)
+        else:
+            st = SessionState()
+            st.events = arr.compact()
+            for k in range(rps):
+                st.limiter.allow(now + k, rps)
+        st.text = st.last_text = text
+        st.base_id = f"signtimeline-{now}-{i}"
+        st.last_update_ms = now
+        out[f"s{i}"] = st
+    return out
+
+
+def measure(kind: str, args) -> int:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = build(kind, args.sessions, args.glosses, args.rps)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return used
+
+
+def bench_limiter(repeat: int, rps: int):
+    st_old, st_new = LegacySessionState(), SessionState()
+    t0 = time.perf_counter()
+    for k in range(repeat):
+        legacy_allow(st_old, k, rps)
+    t1 = time.perf_counter()
+    for k in range(repeat):
+        st_new.limiter.allow(k, rps)
+    t2 = time.perf_counter()
+    return (t1 - t0) / repeat * 1e9, (t2 - t1) / repeat * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser(description="per-session memory footprint (tracemalloc)")
+    ap.add_argument("--sessions", type=int, default=10000)
+    ap.add_argument("--glosses", type=int, default=40, help="glosses compiled per session")
+    ap.add_argument("--rps", type=int, default=20, help="MAX_INGEST_RPS (limiter fill)")
+    args = ap.parse_args()
+
+    legacy = measure("legacy", args)
+    compact = measure("compact", args)
+    print(f"sessions={args.sessions} glosses/session={args.glosses} rps={args.rps}")
+    print(f"legacy  (pydantic, dict/event)   {legacy / args.sessions:9.0f} B/session  {legacy / 2**20:7.1f} MiB")
+    print(f"compact (slots, EventArrays)     {compact / args.sessions:9.0f} B/session  {compact / 2**20:7.1f} MiB  {legacy / compact:4.1f}x")
+    old_ns, new_ns = bench_limiter(200000, args.rps)
+    print(f"rate limit check: list rebuild {old_ns:6.0f} ns  ring {new_ns:6.0f} ns  (msgs 1 ms apart, rps={args.rps})")
+
+
+if __name__ == "__main__":
+    main()
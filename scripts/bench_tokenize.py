@@ -0,0 +1,64 @@
+import argparse
+import random
+import time
+
+from packages.ksl_rules import tokenize_ko, tokenize_ko_spans
+from packages.ksl_rules.rules import _TOKEN_RE
+
+SENTENCES = [
+    "속보입니다. 오늘 오후 3시 12분쯤 경북 포항시 북쪽 9km 지역에서 규모 4.1의 지진이 발생했습니다.",
+    "기상청은 \"추가 여진 가능성이 있다\"며 주의를 당부했습니다!",
+    "내일(13일) 전국에 비가 내리겠고, 서울·경기 지역은 시간당 30mm 이상의 호우가 예상됩니다.",
+    "태풍 제14호 '풀라산'은 현재 제주 남쪽 해상에서 시속 25km로 북상 중입니다;",
+    "피해 신고는 1,234건, 재산 피해액은 약 12,500,000원으로 집계됐습니다.",
+    "[재난 안내] 강풍 경보가 발효된 지역 주민들은 외출을 자제해 주시기 바랍니다?",
+    "{현장 연결} 부산 해운대에서 김기자가 전해드립니다:",
+]
+
+
+def tokenize_ko_ref(text):
+    # reference: previous implementation (14x str.replace + split/join/split)
+    seps = ".!?;:()[]{}\"'\n\t"
+    for s in seps:
+        text = text.replace(s, " ")
+    text = " ".join([w.replace(",", "") for w in text.split()])
+    return [t for t in text.strip().split() if t]
+
+
+def bench(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="tokenize_ko benchmark on long news transcripts")
+    ap.add_argument("--sentences", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    rnd = random.Random(0)
+    text = "\n".join(rnd.choice(SENTENCES) for _ in range(args.sentences))
+    assert tokenize_ko(text) == tokenize_ko_ref(text)
+
+    ref = bench(tokenize_ko_ref, text, args.repeat)
+    new = bench(tokenize_ko, text, args.repeat)
+    spans = bench(tokenize_ko_spans, text, args.repeat)
+    print(f"chars={len(text)} tokens={len(tokenize_ko(text))}")
+    print(f"reference (replace loop)   {ref:10.1f} us")
+    print(f"tokenize_ko                {new:10.1f} us  {ref / new:5.1f}x")
+    print(f"tokenize_ko_spans          {spans:10.1f} us  {ref / spans:5.1f}x")
+    spans_re = bench(lambda t: [(m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(t)], text, args.repeat)
+    print(f"spans via regex finditer   {spans_re:10.1f} us  {ref / spans_re:5.1f}x")
+    # partial-sized inputs (the incremental compiler tokenizes word by word)
+    for short in (SENTENCES[0], "포항시"):
+        r = bench(tokenize_ko_ref, short, args.repeat * 200)
+        n = bench(tokenize_ko, short, args.repeat * 200)
+        print(f"short chars={len(short):<4} ref {r:6.2f} us  new {n:6.2f} us  {r / n:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
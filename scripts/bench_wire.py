@@ -0,0 +1,50 @@
+import argparse
+import json
+import time
+
+from packages.ksl_rules import tokenize_ko, ko_to_gloss
+from packages.sign_timeline import compile_glosses
+from services import binwire, wire
+
+
+def per_call_us(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best / repeat * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="timeline frame size / codec cost: JSON text vs binwire")
+    ap.add_argument("--words", type=str, default="10,50,200", help="timeline sizes in words")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    # (name, wire backend, encode, decode); the JSON rows are what send_text puts on the socket
+    codecs = [("json", "json", wire.dumps, json.loads)]
+    if wire.orjson is not None:
+        codecs.append(("orjson", "orjson", wire.dumps, wire.orjson.loads))
+    codecs.append(("binary", "auto", binwire.encode, binwire.decode))
+
+    for n in (int(x) for x in args.words.split(",")):
+        words = ("안녕하세요 한국 날씨 속보 태풍 서울 부산 1 2 3 " * (n // 10 + 1)).split()[:n]
+        tl = compile_glosses(ko_to_gloss(tokenize_ko(" ".join(words))))
+        message = {"type": "timeline", "session_id": "bench", "seq": 1, "data": tl}
+        print(f"words={n} events={len(tl['events'])}")
+        base = None
+        for name, backend, enc, dec in codecs:
+            wire.set_backend(backend)
+            frame = enc(message)
+            size = len(frame) if isinstance(frame, bytes) else len(frame.encode("utf-8"))
+            base = base or size
+            enc_us = per_call_us(enc, message, args.repeat)
+            dec_us = per_call_us(dec, frame, args.repeat)
+            print(f"  {name:7s} {size:8d} B ({size / base:4.0%})  encode {enc_us:8.1f} us  decode {dec_us:8.1f} us")
+    wire.set_backend("auto")
+
+
+if __name__ == "__main__":
+    main()
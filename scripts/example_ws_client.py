@@ -1,7 +1,11 @@
 import asyncio
 import json
+import sys
+
 import websockets
 
+from services import binwire
+
 
 async def consume(uri="ws://localhost:8000/ws/timeline"):
     async with websockets.connect(uri, ping_interval=20) as ws:
@@ -11,6 +15,9 @@ async def consume(uri="ws://localhost:8000/ws/timeline"):
         try:
             while True:
                 msg = await ws.recv()
+                if isinstance(msg, bytes):  # ?format=binary
+                    print(json.dumps(binwire.decode(msg), ensure_ascii=False, indent=2))
+                    continue
                 try:
                     data = json.loads(msg)
                 except Exception:
@@ -22,5 +29,6 @@ async def consume(uri="ws://localhost:8000/ws/timeline"):
 
 
 if __name__ == "__main__":
-    asyncio.run(consume())
+    # PYTHONPATH=. python scripts/example_ws_client.py ["ws://localhost:8000/ws/timeline?format=binary"]
+    asyncio.run(consume(*sys.argv[1:2]))
 
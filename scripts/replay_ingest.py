@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+from pathlib import Path
+
+from services.config import get_settings
+
+from services.replay import read_recording, write_recording, run_inproc, run_ws, diff_golden
+
+
+def _synthetic(sessions, words, interval_ms, flip=0.0):
+    # growing partials per session with a final at the end, interleaved like live channels
+    # flip: chance that a partial's last word is first misheard (an extra partial, like a flapping ASR tail)
+    vocab = "안녕하세요 오늘 한국 날씨 속보 태풍 서울 부산 호우 경보 1 2 3 지진 해일 강풍 주의보".split()
+    rnd = random.Random(0)
+    items = []
+    for s in range(sessions):
+        acc = []
+        for i in range(words):
+            acc.append(vocab[(i * 7 + s) % len(vocab)])
+            t = i * interval_ms + s * 7
+            if rnd.random() < flip:
+                wrong = acc[:-1] + [vocab[(i * 7 + s + 3) % len(vocab)]]
+                items.append((max(0, t - interval_ms // 2), {"type": "partial", "session_id": f"ch{s}", "text": " ".join(wrong)}))
+            items.append((t, {"type": "partial", "session_id": f"ch{s}", "text": " ".join(acc)}))
+        items.append((words * interval_ms + s * 7, {"type": "final", "session_id": f"ch{s}", "text": " ".join(acc)}))
+    items.sort(key=lambda x: x[0])
+    return items
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Replay a recorded ingest stream (INGEST_RECORD=...) and diff against a golden")
+    ap.add_argument("recording", help="recording file (.gz); with --synthesize it is created")
+    ap.add_argument("--mode", choices=("inproc", "ws"), default="inproc")
+    ap.add_argument("--url", default="ws://localhost:8000")
+    ap.add_argument("--api-key", default=None)
+    ap.add_argument("--speed", type=float, default=0, help="1 = recorded cadence, N = N times faster, 0 = max")
+    ap.add_argument("--max-rps", type=int, default=None, help="inproc: override MAX_INGEST_RPS (default: scaled by --speed, off at max)")
+    ap.add_argument("--golden", default=None, help="golden final-state JSON to diff against")
+    ap.add_argument("--write-golden", action="store_true", help="write the replay's final state to --golden")
+    ap.add_argument("--synthesize", type=int, default=0, metavar="SESSIONS", help="create a synthetic recording first")
+    ap.add_argument("--words", type=int, default=40)
+    ap.add_argument("--interval_ms", type=int, default=250)
+    ap.add_argument("--flip", type=float, default=0.0, help="synthetic: share of partials whose last word flips first")
+    args = ap.parse_args()
+
+    path = Path(args.recording)
+    if args.synthesize:
+        write_recording(path, _synthetic(args.synthesize, args.words, args.interval_ms, args.flip))
+    messages = read_recording(path)
+
+    if args.mode == "inproc":
+        rps = args.max_rps
+        if rps is None and args.speed != 1:
+            # the per-session limit is wall-clock based: scale it with the replay speed
+            rps = 10**9 if args.speed <= 0 else math.ceil(get_settings().max_ingest_rps * args.speed)
+        out = await run_inproc(messages, speed=args.speed, max_ingest_rps=rps)
+    else:
+        out = await run_ws(messages, base_url=args.url, speed=args.speed, api_key=args.api_key)
+    print(json.dumps(out["report"], ensure_ascii=False, indent=2))
+
+    if args.golden:
+        gpath = Path(args.golden)
+        actual = {"recording": path.name, "sessions": out["sessions"]}
+        if args.write_golden:
+            gpath.write_text(json.dumps(actual, ensure_ascii=False, indent=1), encoding="utf-8")
+            print(f"golden written: {gpath}")
+        else:
+            diffs = diff_golden(json.loads(gpath.read_text(encoding="utf-8")), actual)
+            for d in diffs:
+                print("DIFF", d)
+            print("golden: OK" if not diffs else f"golden: {len(diffs)} difference(s)")
+            raise SystemExit(1 if diffs else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
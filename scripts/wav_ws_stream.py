@@ -1,15 +1,32 @@
 import argparse
 import asyncio
+import io
 import json
 import wave
 import websockets
 
 
+def _synth_wav(text: str) -> io.BytesIO:
+    # offline demo audio for /ws/asr?model=fake (see services/asr.py)
+    from services.asr import synth_pcm
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(synth_pcm(text))
+    buf.seek(0)
+    return buf
+
+
 async def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--url', default='ws://localhost:8000/ws/asr')
-    ap.add_argument('--wav', required=True, help='path to 16k mono PCM WAV')
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument('--wav', help='path to 16k mono PCM WAV')
+    src.add_argument('--synth', help='synthesize audio for these words (use with ?model=fake)')
     ap.add_argument('--chunk_ms', type=int, default=100)
+    ap.add_argument('--realtime', action='store_true', help='pace chunks at audio speed')
     ap.add_argument('--api-key', default=None)
     ap.add_argument('--session', default='asr1')
     args = ap.parse_args()
@@ -19,22 +36,38 @@ async def main():
         sep = '&' if '?' in url else '?'
         url = f"{url}{sep}key={args.api_key}"
 
-    wf = wave.open(args.wav, 'rb')
+    wf = wave.open(_synth_wav(args.synth) if args.synth else args.wav, 'rb')
     assert wf.getframerate() == 16000 and wf.getnchannels() == 1 and wf.getsampwidth() == 2, 'requires 16k mono s16le'
     frames_per_chunk = int(wf.getframerate() * (args.chunk_ms/1000.0))
 
     async with websockets.connect(url, ping_interval=20) as ws:
+        done = asyncio.Event()
+
+        async def reader():
+            # chunk acks and transcription results arrive interleaved
+            async for raw in ws:
+                msg = json.loads(raw)
+                if 'bytes' in msg:
+                    continue
+                print(json.dumps(msg, ensure_ascii=False))
+                if msg.get('asr') == 'final' or msg.get('flushed') is False:
+                    done.set()
+
         # send a small JSON to set session (optional)
         await ws.send(json.dumps({"type":"partial","session_id":args.session,"text":""}))
-        _ = await ws.recv()
+        task = asyncio.create_task(reader())
         while True:
             data = wf.readframes(frames_per_chunk)
             if not data:
                 break
             await ws.send(data)
-            _ = await ws.recv()
+            if args.realtime:
+                await asyncio.sleep(args.chunk_ms / 1000.0)
+        # end of utterance: the server answers with the final (or flushed=false)
+        await ws.send(json.dumps({"op": "flush"}))
+        await asyncio.wait_for(done.wait(), timeout=30)
+        task.cancel()
 
 
 if __name__ == '__main__':
     asyncio.run(main())
-
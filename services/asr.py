@@ -0,0 +1,245 @@
+"""
+Streaming ASR for /ws/asr: hop/overlap windows over a fixed PCM ring, inference off the event loop,
+local-agreement stitching into stable partials and finals.
+
+- PcmRing: preallocated s16le ring (window_ms long). Audio is written in place; one window copy is
+  made per inference (the model needs contiguous samples anyway), never per received chunk.
+- A window (the last window_ms of the current utterance) is transcribed every hop_ms of new
+  audio, in the executor. Audio fed faster than that collapses into one window per step.
+- LocalAgreement: each hypothesis is anchored after the committed words it overlaps (windows
+  overlap by window - hop), and the words two consecutive hypotheses agree on are committed.
+  A partial is committed + the current tentative tail. Once the newest `silence_windows` hops
+  are below `silence_level` (or on flush) the utterance is final; the next one starts with
+  the audio after it.
+
+Models: anything with transcribe(pcm: bytes, sample_rate: int, **options) -> str, run in the given
+executor, or a pooled model (services/asr_pool.py) with async infer(). _WhisperStreamer wraps
+faster-whisper (numpy is only needed there); FakeASRModel decodes synth_pcm() audio, so the whole
+path runs offline (scripts/wav_ws_stream.py --synth).
+"""
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+
+
+class PcmRing:
+    __slots__ = ("_buf", "_cap", "_pos", "total")
+
+    def __init__(self, capacity_bytes: int):
+        self._cap = max(BYTES_PER_SAMPLE, capacity_bytes - capacity_bytes % BYTES_PER_SAMPLE)
+        self._buf = bytearray(self._cap)
+        self._pos = 0     # next write offset
+        self.total = 0    # bytes written since start
+
+    def write(self, data: bytes) -> None:
+        mv = memoryview(data)
+        if len(mv) >= self._cap:
+            mv = mv[len(mv) - self._cap:]
+            self.total += len(data) - len(mv)
+        n = len(mv)
+        first = min(n, self._cap - self._pos)
+        self._buf[self._pos:self._pos + first] = mv[:first]
+        if first < n:
+            self._buf[:n - first] = mv[first:]
+        self._pos = (self._pos + n) % self._cap
+        self.total += n
+
+    def window(self) -> bytes:
+        """The newest min(total, capacity) bytes, oldest first."""
+        if self.total < self._cap:
+            return bytes(self._buf[:self._pos])
+        return bytes(self._buf[self._pos:]) + bytes(self._buf[:self._pos])
+
+
+def _anchor(committed: Sequence[str], hyp: Sequence[str], max_run: int = 8) -> int:
+    """Index in hyp right after the longest committed suffix found in it (0 if none)."""
+    for m in range(min(max_run, len(committed), len(hyp)), 0, -1):
+        tail = list(committed[-m:])
+        for i in range(len(hyp) - m, -1, -1):
+            if list(hyp[i:i + m]) == tail:
+                return i + m
+    return 0
+
+
+class LocalAgreement:
+    __slots__ = ("committed", "tentative")
+
+    def __init__(self):
+        self.committed: List[str] = []
+        self.tentative: List[str] = []
+
+    def push(self, words: Sequence[str]) -> int:
+        """Add one window hypothesis; returns the number of newly committed words."""
+        new = list(words[_anchor(self.committed, words):]) if self.committed else list(words)
+        agreed = 0
+        while agreed < len(new) and agreed < len(self.tentative) and new[agreed] == self.tentative[agreed]:
+            agreed += 1
+        self.committed.extend(new[:agreed])
+        self.tentative = new[agreed:]
+        return agreed
+
+    def text(self) -> str:
+        return " ".join(self.committed + self.tentative)
+
+    def finish(self) -> str:
+        text = self.text()
+        self.committed, self.tentative = [], []
+        return text
+
+
+def _level(pcm: bytes) -> float:
+    """Mean absolute s16le sample value."""
+    if len(pcm) < BYTES_PER_SAMPLE:
+        return 0.0
+    mv = memoryview(pcm)[:len(pcm) - len(pcm) % BYTES_PER_SAMPLE].cast("h")
+    return sum(abs(x) for x in mv) / len(mv)
+
+
+class StreamingASR:
+    def __init__(self, model, executor: Optional[Executor] = None, window_ms: int = 1600, hop_ms: int = 400,
+                 silence_windows: int = 2, silence_level: int = 300, sample_rate: int = SAMPLE_RATE,
+                 options: Optional[Dict[str, Any]] = None, on_infer: Optional[Callable[[float], None]] = None):
+        self.model = model
+        self.executor = executor
+        self.options = options or {}  # decode options passed to the model (e.g. beam_size)
+        self.sample_rate = sample_rate
+        self.hop_bytes = max(BYTES_PER_SAMPLE, int(sample_rate * hop_ms / 1000) * BYTES_PER_SAMPLE)
+        self.ring = PcmRing(max(self.hop_bytes, int(sample_rate * window_ms / 1000) * BYTES_PER_SAMPLE))
+        self.silence_windows = max(1, silence_windows)
+        self.silence_level = silence_level
+        self.agreement = LocalAgreement()
+        self.on_infer = on_infer  # inference ms (stage timings)
+        self._next_at = self.hop_bytes  # ring.total at which the next window is due
+        self._utt_start = 0             # ring.total where the current utterance began
+        self._silent = 0
+        self._last_sent = ""
+
+    def feed(self, data: bytes) -> bool:
+        """Append audio; True if a window is due."""
+        self.ring.write(data)
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self.ring.total >= self._next_at
+
+    async def _transcribe(self, pcm: bytes) -> str:
+        t0 = time.perf_counter()
+        if hasattr(self.model, "infer"):  # pooled model: queued on its own inference threads
+            text = await self.model.infer(pcm, self.sample_rate, **self.options)
+        elif self.executor is None:
+            text = self.model.transcribe(pcm, self.sample_rate, **self.options)
+        else:
+            text = await asyncio.get_running_loop().run_in_executor(
+                self.executor, lambda: self.model.transcribe(pcm, self.sample_rate, **self.options))
+        if self.on_infer is not None:
+            self.on_infer((time.perf_counter() - t0) * 1000.0)
+        return text or ""
+
+    async def step(self) -> Optional[Tuple[str, str]]:
+        """Transcribe the latest window: ("partial" | "final", text), or None if nothing new to say."""
+        # windows that piled up since the last step collapse into this one
+        self._next_at = self.ring.total + self.hop_bytes
+        pcm = self.ring.window()
+        pcm = pcm[max(0, len(pcm) - (self.ring.total - self._utt_start)):]  # not the previous utterance
+        quiet = _level(pcm[-self.hop_bytes:]) < self.silence_level
+        self._silent = self._silent + 1 if quiet else 0
+        if quiet and not (self.agreement.committed or self.agreement.tentative):
+            self._utt_start = self.ring.total  # leading silence: nothing to transcribe
+            return None
+        words = (await self._transcribe(pcm)).split()
+        if words:
+            self.agreement.push(words)
+        if self._silent >= self.silence_windows and (self.agreement.committed or self.agreement.tentative):
+            return self._final()
+        text = self.agreement.text()
+        if not words or text == self._last_sent:
+            return None
+        self._last_sent = text
+        return "partial", text
+
+    async def flush(self) -> Optional[Tuple[str, str]]:
+        """End of audio: the pending utterance (with the audio since the last window) as a final, if any."""
+        if self.ring.total > self._next_at - self.hop_bytes:
+            out = await self.step()
+            if out and out[0] == "final":
+                return out
+        if self.agreement.committed or self.agreement.tentative:
+            return self._final()
+        return None
+
+    def _final(self) -> Tuple[str, str]:
+        self._silent = 0
+        self._last_sent = ""
+        self._utt_start = self.ring.total
+        return "final", self.agreement.finish()
+
+
+# --- offline stand-in for tests and demos -------------------------------------------------------
+
+FAKE_VOCAB = "안녕하세요 오늘 한국 날씨 속보 태풍 서울 부산 호우 경보 지진 강풍 주의보".split()
+_FAKE_STEP = 1000   # amplitude step per vocabulary index
+_FAKE_FRAME_MS = 20
+
+
+def synth_pcm(text: str, word_ms: int = 360, gap_ms: int = 160, sample_rate: int = SAMPLE_RATE,
+              vocab: Sequence[str] = FAKE_VOCAB) -> bytes:
+    """s16le audio FakeASRModel decodes back to text: one square-wave burst per word, amplitude = word id."""
+    out = bytearray()
+    gap = bytes(int(sample_rate * gap_ms / 1000) * BYTES_PER_SAMPLE)
+    out += gap
+    for w in text.split():
+        amp = (vocab.index(w) + 1) * _FAKE_STEP
+        burst = bytearray()
+        for i in range(int(sample_rate * word_ms / 1000)):
+            burst += (amp if i % 2 else -amp).to_bytes(2, "little", signed=True)
+        out += burst + gap
+    return bytes(out)
+
+
+class FakeASRModel:
+    """
+    Decodes synth_pcm() audio like a streaming recognizer would: a word cut by the window start is
+    dropped, a word cut by the window end is misheard (as its vocabulary neighbour).
+    Simulated inference time is delay_s per call plus item_delay_s per window, so batching
+    several windows into one transcribe_batch() call pays the fixed part once.
+    """
+
+    def __init__(self, vocab: Sequence[str] = FAKE_VOCAB, delay_s: float = 0.0, item_delay_s: float = 0.0):
+        self.vocab = list(vocab)
+        self.delay_s = delay_s
+        self.item_delay_s = item_delay_s
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE, **_options) -> str:
+        if self.delay_s or self.item_delay_s:
+            time.sleep(self.delay_s + self.item_delay_s)
+        return self._decode(pcm, sample_rate)
+
+    def transcribe_batch(self, pcms: Sequence[bytes], sample_rate: int = SAMPLE_RATE, **_options) -> List[str]:
+        if self.delay_s or self.item_delay_s:
+            time.sleep(self.delay_s + self.item_delay_s * len(pcms))
+        return [self._decode(pcm, sample_rate) for pcm in pcms]
+
+    def _decode(self, pcm: bytes, sample_rate: int) -> str:
+        frame = int(sample_rate * _FAKE_FRAME_MS / 1000) * BYTES_PER_SAMPLE
+        levels = []
+        for off in range(0, len(pcm) - frame + 1, frame):
+            mv = memoryview(pcm)[off:off + frame].cast("h")
+            levels.append(round(sum(abs(x) for x in mv) / len(mv) / _FAKE_STEP))
+        words = []
+        i = 0
+        while i < len(levels):
+            j = i
+            while j < len(levels) and levels[j] == levels[i]:
+                j += 1
+            lvl = levels[i]
+            # frames straddling a word edge read as a short run of another level: not a word
+            if j - i >= 2 and i > 0 and 0 < lvl <= len(self.vocab):
+                idx = lvl - 1 if j < len(levels) else lvl % len(self.vocab)
+                words.append(self.vocab[idx])
+            i = j
+        return " ".join(words)
@@ -0,0 +1,254 @@
+"""
+Process-wide ASR model pool for /ws/asr.
+
+Connections no longer load their own model: acquire((model, device, compute)) returns the
+shared PooledModel for that key, loading it once (concurrent connects wait for the same
+load) and counting references. A model nobody holds is evicted after idle_s; models
+warmed at startup (ASR_WARM_MODELS) are pinned.
+
+Each model has its own `concurrency` inference threads; windows wait in its queue, which is
+bounded at queue_max. A full queue rejects the window (infer returns ""); windows overlap,
+so the next hop hears the same audio again.
+
+Batching (batch_max > 1, models with transcribe_batch(pcms, sample_rate, **options)): a free
+inference thread takes the oldest window and keeps collecting windows from any session for
+up to batch_deadline_ms or batch_max windows, then runs them as one call; each connection
+gets its own transcript back. The deadline adds at most that much latency per window and
+buys throughput when many channels share the box. A model without transcribe_batch keeps
+one window per call (logged at load, batch_max 1 in snapshot()).
+
+Metrics: asr_model_load_seconds, asr_queue_wait_ms, asr_inference_ms (per call),
+asr_batch_size (per model), asr_models_loaded, asr_queue_rejected_total; snapshot() for /stats.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger("pipeline.asr_pool")
+
+ModelKey = Tuple[str, str, str]  # (model, device, compute)
+
+_MS_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+ASR_MODEL_LOAD = Histogram("asr_model_load_seconds", "ASR model load time in seconds", labelnames=("model",),
+                           buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60))
+ASR_QUEUE_WAIT = Histogram("asr_queue_wait_ms", "Time an ASR window waited for a model worker in ms", labelnames=("model",), buckets=_MS_BUCKETS)
+ASR_INFER = Histogram("asr_inference_ms", "ASR model inference time per window in ms", labelnames=("model",), buckets=_MS_BUCKETS)
+ASR_BATCH = Histogram("asr_batch_size", "Windows per ASR inference call", labelnames=("model",), buckets=(1, 2, 4, 8, 16, 32, 64))
+ASR_MODELS = Gauge("asr_models_loaded", "ASR models loaded in the pool")
+ASR_REJECTED = Counter("asr_queue_rejected_total", "ASR windows rejected because the model queue was full", labelnames=("model",))
+
+
+def parse_keys(spec: str) -> List[ModelKey]:
+    """"base:cpu:int8,small" -> [("base", "cpu", "int8"), ("small", "cpu", "int8")]"""
+    keys = []
+    for item in (spec or "").split(","):
+        parts = [p.strip() for p in item.split(":")]
+        if not parts[0]:
+            continue
+        parts += ["cpu", "int8"][len(parts) - 1:]
+        keys.append((parts[0], parts[1] or "cpu", parts[2] or "int8"))
+    return keys
+
+
+class PooledModel:
+    __slots__ = ("key", "model", "refs", "pinned", "idle_since", "load_s", "served", "rejected", "batches",
+                 "inflight", "concurrency", "batch_max", "batch_deadline_s", "_limit", "_queue", "_threads")
+
+    def __init__(self, key: ModelKey, model: Any, concurrency: int, queue_max: int,
+                 batch_max: int = 1, batch_deadline_ms: float = 30.0):
+        self.key = key
+        self.model = model
+        self.refs = 0
+        self.pinned = False
+        self.idle_since: Optional[float] = time.monotonic()
+        self.load_s = 0.0
+        self.served = 0
+        self.rejected = 0
+        self.batches = 0
+        self.inflight = 0  # windows running or queued
+        self.concurrency = max(1, concurrency)
+        # batching only for models that can (transcribe_batch); 1 = one window per call
+        self.batch_max = max(1, batch_max) if hasattr(model, "transcribe_batch") else 1
+        if batch_max > 1 and self.batch_max == 1:
+            logger.warning(f"ASR batching is off for {self.label}: the model has no transcribe_batch")
+        self.batch_deadline_s = max(0.0, batch_deadline_ms) / 1000.0
+        self._limit = self.concurrency + max(0, queue_max)
+        # a thread-safe queue, not bound to an event loop; None stops a worker
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._threads = [threading.Thread(target=self._serve, name=f"asr-{key[0]}", daemon=True) for _ in range(self.concurrency)]
+        for t in self._threads:
+            t.start()
+
+    @property
+    def label(self) -> str:
+        return ":".join(self.key)
+
+    async def infer(self, pcm: bytes, sample_rate: int, **options) -> str:
+        """Queue one window; its transcript, or "" if the queue is full."""
+        if self.inflight >= self._limit:
+            self.rejected += 1
+            try:
+                ASR_REJECTED.labels(self.label).inc()
+            except Exception:
+                pass
+            return ""
+        fut: Future = Future()
+        self.inflight += 1
+        try:
+            self._queue.put((pcm, sample_rate, options, time.perf_counter(), fut))
+            text = await asyncio.wrap_future(fut)
+        finally:
+            self.inflight -= 1
+        self.served += 1
+        return text
+
+    def _collect(self, first) -> List[tuple]:
+        """first plus whatever else arrives within the batch deadline, up to batch_max windows."""
+        batch = [first]
+        end = time.perf_counter() + self.batch_deadline_s
+        while len(batch) < self.batch_max:
+            try:
+                item = self._queue.get(timeout=max(0.0, end - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _serve(self) -> None:
+        # inference thread: one window, or one batch of windows from any sessions, per call
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = self._collect(item) if self.batch_max > 1 else [item]
+            batch = [it for it in batch if it[4].set_running_or_notify_cancel()]  # connections gone meanwhile
+            # one call per (sample rate, decode options) group
+            groups: Dict[Tuple[int, tuple], List[tuple]] = {}
+            for it in batch:
+                groups.setdefault((it[1], tuple(sorted(it[2].items()))), []).append(it)
+            for (sample_rate, _), items in groups.items():
+                t0 = time.perf_counter()
+                try:
+                    if len(items) == 1:
+                        texts = [self.model.transcribe(items[0][0], sample_rate, **items[0][2])]
+                    else:
+                        texts = self.model.transcribe_batch([it[0] for it in items], sample_rate, **items[0][2])
+                except Exception as e:
+                    for it in items:
+                        it[4].set_exception(e)
+                    continue
+                t1 = time.perf_counter()
+                self.batches += 1
+                try:
+                    for it in items:
+                        ASR_QUEUE_WAIT.labels(self.label).observe((t0 - it[3]) * 1000.0)
+                    ASR_INFER.labels(self.label).observe((t1 - t0) * 1000.0)
+                    ASR_BATCH.labels(self.label).observe(len(items))
+                except Exception:
+                    pass
+                texts = list(texts or ())
+                if len(texts) != len(items):
+                    # a short (or long) answer cannot be matched to windows: fail the whole call
+                    e = RuntimeError(f"{self.label}: transcribe_batch returned {len(texts)} results for {len(items)} windows")
+                    for it in items:
+                        it[4].set_exception(e)
+                    continue
+                for it, text in zip(items, texts):
+                    it[4].set_result(text)
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "model": self.key[0], "device": self.key[1], "compute": self.key[2],
+            "refs": self.refs, "pinned": self.pinned, "load_s": round(self.load_s, 3),
+            "queued": max(0, self.inflight - self.concurrency), "served": self.served, "rejected": self.rejected,
+            "batches": self.batches, "batch_max": self.batch_max,
+        }
+
+
+class ModelPool:
+    def __init__(self, loader: Callable[[ModelKey], Any], concurrency: int = 1, queue_max: int = 32, idle_s: float = 300.0,
+                 batch_max: int = 1, batch_deadline_ms: float = 30.0):
+        self.loader = loader            # key -> model with transcribe(pcm, sample_rate, **options); runs in a thread
+        self.concurrency = concurrency  # inference threads per model
+        self.queue_max = queue_max
+        self.batch_max = batch_max
+        self.batch_deadline_ms = batch_deadline_ms
+        self.idle_s = idle_s
+        self._models: Dict[ModelKey, PooledModel] = {}
+        self._loading: Dict[ModelKey, asyncio.Future] = {}
+
+    async def _get(self, key: ModelKey) -> PooledModel:
+        pm = self._models.get(key)
+        if pm is not None:
+            return pm
+        fut = self._loading.get(key)
+        if fut is None:
+            fut = self._loading[key] = asyncio.ensure_future(self._load(key))
+        # a cancelled connect must not cancel the load other connections wait for
+        return await asyncio.shield(fut)
+
+    async def _load(self, key: ModelKey) -> PooledModel:
+        try:
+            t0 = time.perf_counter()
+            model = await asyncio.to_thread(self.loader, key)
+            pm = PooledModel(key, model, self.concurrency, self.queue_max, self.batch_max, self.batch_deadline_ms)
+            pm.load_s = time.perf_counter() - t0
+            self._models[key] = pm
+        finally:
+            self._loading.pop(key, None)
+        try:
+            ASR_MODEL_LOAD.labels(pm.label).observe(pm.load_s)
+            ASR_MODELS.set(len(self._models))
+        except Exception:
+            pass
+        return pm
+
+    async def acquire(self, key: ModelKey) -> PooledModel:
+        pm = await self._get(key)
+        pm.refs += 1
+        pm.idle_since = None
+        return pm
+
+    def release(self, pm: PooledModel) -> None:
+        pm.refs = max(0, pm.refs - 1)
+        if pm.refs == 0:
+            pm.idle_since = time.monotonic()
+
+    async def warm(self, keys: Sequence[ModelKey]) -> None:
+        """Load and pin models (startup)."""
+        for key in keys:
+            (await self._get(key)).pinned = True
+
+    def evict_idle(self, now: Optional[float] = None) -> List[ModelKey]:
+        now = time.monotonic() if now is None else now
+        gone = [k for k, pm in self._models.items()
+                if not pm.pinned and pm.refs == 0 and pm.idle_since is not None and now - pm.idle_since >= self.idle_s]
+        for k in gone:
+            self._models.pop(k).close()
+        if gone:
+            try:
+                ASR_MODELS.set(len(self._models))
+            except Exception:
+                pass
+        return gone
+
+    def close(self) -> None:
+        for pm in self._models.values():
+            pm.close()
+        self._models.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [pm.snapshot() for pm in self._models.values()]
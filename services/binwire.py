@@ -0,0 +1,163 @@
+"""
+Compact binary frames for timeline / timeline.replace (opt-in per /ws/timeline client).
+
+Layout: b"KT\x01" | varint len + envelope | varint n + string table | event blocks
+
+- envelope: the message as compact JSON with every event list replaced by its length
+  (data.events, data.windows[i].events); everything but the events stays JSON.
+- string table: each distinct clip / channel / tag string of the frame, once. The table is
+  per frame, not per session: a frame is encoded once and shared by every binary
+  subscriber, coalesced in slow queues and resent on resync, so it must stand alone.
+- event block (one per event list, in envelope order), per event:
+  flags u8 (1 channel, 2 confidence, 4 tags, 8 extra keys), zigzag varint t_ms delta from
+  the previous event of the block, varint dur_ms, varint clip index, [varint channel index],
+  [u8 confidence * 200], [varint n + tag indexes], [varint len + JSON of other keys].
+
+Confidence is quantized to 0.005 steps (exact for two-decimal values). decode() returns
+the same message dict the JSON frame carries.
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+MAGIC = b"KT\x01"
+CONF_SCALE = 200
+
+_F_CHANNEL, _F_CONF, _F_TAGS, _F_EXTRA = 1, 2, 4, 8
+_KNOWN = frozenset(("t_ms", "clip", "dur_ms", "channel", "confidence", "tags"))
+
+
+def _varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf: bytes, i: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def _event_lists(message: Dict[str, Any]) -> Tuple[Dict[str, Any], List[List[Dict[str, Any]]]]:
+    """Envelope (event lists replaced by their lengths) and the lists, in envelope order."""
+    data = message.get("data")
+    if not isinstance(data, dict):
+        return message, []
+    lists = []
+    env_data = dict(data)
+    if isinstance(data.get("events"), list):
+        lists.append(data["events"])
+        env_data["events"] = len(data["events"])
+    if isinstance(data.get("windows"), list):
+        windows = []
+        for w in data["windows"]:
+            lists.append(w["events"])
+            windows.append({**w, "events": len(w["events"])})
+        env_data["windows"] = windows
+    return {**message, "data": env_data}, lists
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    env, lists = _event_lists(message)
+    strings: Dict[str, int] = {}
+    body = bytearray()
+    for events in lists:
+        _varint(body, len(events))
+        prev_t = 0
+        for e in events:
+            t = int(e["t_ms"])
+            d = t - prev_t
+            prev_t = t
+            ch, conf, tags = e.get("channel"), e.get("confidence"), e.get("tags")
+            n_known = 3 + (ch is not None) + (conf is not None) + (tags is not None)
+            extra = {k: v for k, v in e.items() if k not in _KNOWN} if len(e) > n_known else None
+            flags = ((_F_CHANNEL if ch is not None else 0) | (_F_CONF if conf is not None else 0)
+                     | (_F_TAGS if tags is not None else 0) | (_F_EXTRA if extra else 0))
+            body.append(flags)
+            _varint(body, (d << 1) ^ (d >> 63))
+            _varint(body, int(e["dur_ms"]))
+            _varint(body, strings.setdefault(e["clip"], len(strings)))
+            if ch is not None:
+                _varint(body, strings.setdefault(ch, len(strings)))
+            if conf is not None:
+                body.append(max(0, min(CONF_SCALE, round(conf * CONF_SCALE))))
+            if tags is not None:
+                _varint(body, len(tags))
+                for tag in tags:
+                    _varint(body, strings.setdefault(tag, len(strings)))
+            if extra:
+                raw = json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                _varint(body, len(raw))
+                body += raw
+    out = bytearray(MAGIC)
+    head = json.dumps(env, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _varint(out, len(head))
+    out += head
+    _varint(out, len(strings))
+    for s in strings:  # dict order = index order
+        raw = s.encode("utf-8")
+        _varint(out, len(raw))
+        out += raw
+    out += body
+    return bytes(out)
+
+
+def decode(buf: bytes) -> Dict[str, Any]:
+    if buf[:3] != MAGIC:
+        raise ValueError("not a binary timeline frame")
+    i = 3
+    n, i = _read_varint(buf, i)
+    env = json.loads(buf[i:i + n].decode("utf-8"))
+    i += n
+    n, i = _read_varint(buf, i)
+    table: List[str] = []
+    for _ in range(n):
+        ln, i = _read_varint(buf, i)
+        table.append(buf[i:i + ln].decode("utf-8"))
+        i += ln
+
+    def block() -> List[Dict[str, Any]]:
+        nonlocal i
+        count, i = _read_varint(buf, i)
+        events = []
+        t = 0
+        for _ in range(count):
+            flags = buf[i]
+            z, i = _read_varint(buf, i + 1)
+            t += (z >> 1) ^ -(z & 1)
+            dur, i = _read_varint(buf, i)
+            ci, i = _read_varint(buf, i)
+            e: Dict[str, Any] = {"t_ms": t, "clip": table[ci], "dur_ms": dur}
+            if flags & _F_CHANNEL:
+                ci, i = _read_varint(buf, i)
+                e["channel"] = table[ci]
+            if flags & _F_CONF:
+                e["confidence"] = round(buf[i] / CONF_SCALE, 3)
+                i += 1
+            if flags & _F_TAGS:
+                nt, i = _read_varint(buf, i)
+                tags = []
+                for _ in range(nt):
+                    ci, i = _read_varint(buf, i)
+                    tags.append(table[ci])
+                e["tags"] = tags
+            if flags & _F_EXTRA:
+                ln, i = _read_varint(buf, i)
+                e.update(json.loads(buf[i:i + ln].decode("utf-8")))
+                i += ln
+            events.append(e)
+        return events
+
+    data = env.get("data")
+    if isinstance(data, dict):
+        if isinstance(data.get("events"), int):
+            data["events"] = block()
+        for w in data.get("windows") or ():
+            w["events"] = block()
+    return env
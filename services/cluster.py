@@ -0,0 +1,416 @@
+"""
+Session-state affinity and timeline fan-out across server processes.
+
+Backends:
+- LocalBackend (default): single process; publish delivers locally, every session is ours.
+- SocketBackend: processes on one box (or nodes that can reach the address) share a tiny
+  TCP hub. The first process to bind CLUSTER_ADDR runs the hub; everyone connects as a node.
+  The hub relays published messages to all other nodes, records which node owns each
+  session (first claim wins) and routes forwarded ingest messages to the owner, so a
+  session's state lives in exactly one process no matter which worker received the message.
+  Nodes authenticate to the hub with an HMAC of a per-connection challenge under the shared
+  CLUSTER_SECRET; nothing else is accepted before that. When the hub dies the nodes race to
+  bind the address again, reconnect to the winner and re-claim the sessions they own.
+
+Wire format: one JSON object per line.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from services.wire import dumps
+
+logger = logging.getLogger("pipeline.cluster")
+
+# (message, local, text) -> None; local=False for messages published by another node,
+# text = the message already encoded with services.wire.dumps (reused for every socket)
+MessageHandler = Callable[[Dict[str, Any], bool, Optional[str]], Awaitable[None]]
+ForwardHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class LocalBackend:
+    name = "memory"
+
+    def __init__(self):
+        self.node_id = f"node-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._on_message: Optional[MessageHandler] = None
+        self._on_forward: Optional[ForwardHandler] = None
+
+    def bind(self, on_message: MessageHandler, on_forward: ForwardHandler):
+        self._on_message = on_message
+        self._on_forward = on_forward
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: Dict[str, Any], text: Optional[str] = None):
+        if self._on_message:
+            await self._on_message(message, True, text)
+
+    async def owner_of(self, session_id: str) -> str:
+        return self.node_id
+
+    async def forward(self, node_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._on_forward is None:
+            return {"ok": False, "error": "no forward handler"}
+        return await self._on_forward(payload)
+
+    async def release(self, session_id: str):
+        pass
+
+
+HANDSHAKE_TIMEOUT_S = 5.0
+
+
+def _frame(obj: Dict[str, Any]) -> bytes:
+    return (dumps(obj) + "\n").encode("utf-8")
+
+
+def _proof(secret: str, nonce: str, node: str) -> str:
+    return hmac.new(secret.encode("utf-8"), f"{nonce}:{node}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class BusHub:
+    """Relay for SocketBackend nodes: pub/sub fan-out, session claims, ingest forwarding."""
+
+    def __init__(self, secret: str = ""):
+        self.secret = secret
+        self._nodes: Dict[str, asyncio.StreamWriter] = {}
+        self._owners: Dict[str, str] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.rejected = 0
+
+    async def start(self, host: str, port: int):
+        self._server = await asyncio.start_server(self._serve, host, port, limit=2**24)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            # connected nodes must see the hub go away (and elect a new one)
+            for w in list(self._nodes.values()):
+                try:
+                    w.close()
+                except Exception:
+                    pass
+            await self._server.wait_closed()
+
+    def _broadcast(self, obj: Dict[str, Any], skip: Optional[str] = None):
+        out = _frame(obj)
+        for nid, w in list(self._nodes.items()):
+            if nid != skip:
+                try:
+                    w.write(out)
+                except Exception:
+                    pass
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[str]:
+        """Challenge/response on the shared secret; returns the node id, or None to drop the connection."""
+        nonce = uuid.uuid4().hex
+        writer.write(_frame({"op": "challenge", "nonce": nonce}))
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT_S)
+        m = json.loads(line) if line else {}
+        node = m.get("node")
+        if m.get("op") != "hello" or not isinstance(node, str) or not hmac.compare_digest(
+                str(m.get("auth", "")), _proof(self.secret, nonce, node)):
+            self.rejected += 1
+            logger.warning("cluster hub rejected a connection (bad or missing CLUSTER_SECRET proof)")
+            writer.write(_frame({"op": "denied"}))
+            await writer.drain()
+            return None
+        writer.write(_frame({"op": "welcome"}))
+        await writer.drain()
+        return node
+
+    async def _send(self, node: str, obj: Dict[str, Any]):
+        w = self._nodes.get(node)
+        if w is None:
+            return
+        try:
+            w.write(_frame(obj))
+            await w.drain()
+        except Exception:
+            pass
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        node = None
+        try:
+            node = await self._handshake(reader, writer)
+            if node is None:
+                return
+            self._nodes[node] = writer
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                m = json.loads(line)
+                op = m.get("op")
+                if op == "pub":
+                    self._broadcast({"op": "msg", "raw": m["raw"]}, skip=node)
+                elif op == "claim":
+                    owner = self._owners.get(m["sid"])
+                    if owner is None or owner not in self._nodes:
+                        owner = self._owners[m["sid"]] = node
+                    await self._send(node, {"op": "claimed", "rid": m["rid"], "owner": owner})
+                elif op == "release":
+                    if self._owners.get(m["sid"]) == node:
+                        self._owners.pop(m["sid"], None)
+                        # other nodes drop their cached owner for it
+                        self._broadcast({"op": "released", "sid": m["sid"]}, skip=node)
+                elif op == "fwd":
+                    if m["to"] in self._nodes:
+                        await self._send(m["to"], {"op": "fwd", "from": node, "rid": m["rid"], "payload": m["payload"]})
+                    else:
+                        await self._send(node, {"op": "fwd_ack", "rid": m["rid"], "ack": {"ok": False, "error": "owner gone"}})
+                elif op == "fwd_ack":
+                    await self._send(m["to"], {"op": "fwd_ack", "rid": m["rid"], "ack": m["ack"]})
+        except Exception as e:
+            logger.debug(f"hub connection error: {e}")
+        finally:
+            if node is not None and self._nodes.get(node) is writer:
+                self._nodes.pop(node, None)
+                # a departed node's sessions become claimable again
+                for sid in [s for s, o in self._owners.items() if o == node]:
+                    self._owners.pop(sid, None)
+                    self._broadcast({"op": "released", "sid": sid})
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+
+class SocketBackend(LocalBackend):
+    name = "socket"
+
+    def __init__(self, addr: str = "127.0.0.1:8790", secret: str = "", reconnect_max_s: float = 2.0):
+        super().__init__()
+        host, _, port = addr.rpartition(":")
+        self.host = host or "127.0.0.1"
+        self.port = int(port)
+        self.secret = secret
+        self.reconnect_max_s = float(reconnect_max_s)
+        self.hub: Optional[BusHub] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._owned: Set[str] = set()
+        self._owner_cache: Dict[str, str] = {}
+        self._rx_task: Optional[asyncio.Task] = None
+        self._up: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def start(self):
+        self._stopping = False
+        self._up = asyncio.Event()
+        await self._connect()
+        self._rx_task = asyncio.create_task(self._rx_loop())
+
+    async def _connect(self):
+        """Bind the hub if the address is free (first process / hub takeover), then join it."""
+        if self.hub is None:
+            try:
+                hub = BusHub(self.secret)
+                await hub.start(self.host, self.port)
+                self.hub = hub
+                logger.info(f"cluster hub listening on {self.host}:{self.port}")
+            except OSError:
+                # another process already runs the hub
+                pass
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=2**24)
+        try:
+            line = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT_S)
+            nonce = json.loads(line)["nonce"] if line else ""
+            writer.write(_frame({"op": "hello", "node": self.node_id, "auth": _proof(self.secret, nonce, self.node_id)}))
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT_S)
+        except Exception:
+            writer.close()
+            raise
+        if not line or json.loads(line).get("op") != "welcome":
+            writer.close()
+            raise PermissionError("cluster hub rejected this node (CLUSTER_SECRET mismatch)")
+        self._reader, self._writer = reader, writer
+        self._up.set()
+
+    async def stop(self):
+        self._stopping = True
+        if self._rx_task:
+            self._rx_task.cancel()
+        if self._writer:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        self._writer = None
+        if self.hub:
+            await self.hub.stop()
+            self.hub = None
+
+    async def _send(self, obj: Dict[str, Any]):
+        if self._writer is None:
+            raise ConnectionError("cluster bus not connected")
+        self._writer.write(_frame(obj))
+        await self._writer.drain()
+
+    async def _request(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        rid = uuid.uuid4().hex
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[rid] = fut
+        try:
+            await self._send(dict(obj, rid=rid))
+            return await asyncio.wait_for(fut, timeout=10.0)
+        finally:
+            self._pending.pop(rid, None)
+
+    def _disconnected(self):
+        self._writer = None
+        self._up.clear()
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("cluster bus disconnected"))
+        # the ownership table died with the hub; owned sessions are re-claimed on reconnect
+        self._owner_cache.clear()
+
+    async def _reconnect(self) -> bool:
+        delay = 0.05
+        while not self._stopping:
+            try:
+                await self._connect()
+                self.reconnects += 1
+                logger.info(f"cluster bus reconnected (hub {'here' if self.hub else 'elsewhere'})")
+                return True
+            except PermissionError as e:
+                logger.error(str(e))
+                return False
+            except (OSError, asyncio.TimeoutError, ValueError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_s)
+        return False
+
+    async def _reclaim(self):
+        # first claim wins on the new hub; a session another node claimed meanwhile moves there
+        for sid in list(self._owned):
+            try:
+                owner = (await self._request({"op": "claim", "sid": sid}))["owner"]
+            except Exception:
+                return
+            if owner != self.node_id:
+                self._owned.discard(sid)
+                self._owner_cache[sid] = owner
+
+    async def _rx_loop(self):
+        while True:
+            line = await self._reader.readline() if self._reader is not None else b""
+            if not line:
+                self._disconnected()
+                if self._stopping:
+                    return
+                logger.warning("cluster bus disconnected; reconnecting")
+                if not await self._reconnect():
+                    return
+                asyncio.create_task(self._reclaim())
+                continue
+            m = json.loads(line)
+            op = m.get("op")
+            if op == "msg":
+                if self._on_message:
+                    try:
+                        # the publisher's encoded text travels as-is and is reused for local sockets
+                        await self._on_message(json.loads(m["raw"]), False, m["raw"])
+                    except Exception as e:
+                        logger.debug(f"bus message handler error: {e}")
+            elif op in ("claimed", "fwd_ack"):
+                fut = self._pending.get(m["rid"])
+                if fut is not None and not fut.done():
+                    fut.set_result(m)
+            elif op == "fwd":
+                asyncio.create_task(self._serve_forward(m))
+            elif op == "released":
+                self._owner_cache.pop(m["sid"], None)
+
+    async def _serve_forward(self, m: Dict[str, Any]):
+        try:
+            ack = await self._on_forward(m["payload"]) if self._on_forward else {"ok": False}
+        except Exception as e:
+            ack = {"ok": False, "error": str(e)}
+        try:
+            await self._send({"op": "fwd_ack", "to": m["from"], "rid": m["rid"], "ack": ack})
+        except Exception:
+            pass
+
+    async def publish(self, message: Dict[str, Any], text: Optional[str] = None):
+        # local subscribers first, then every other node through the hub
+        if self._on_message:
+            await self._on_message(message, True, text)
+        if self._writer is not None:
+            try:
+                await self._send({"op": "pub", "raw": text if text is not None else dumps(message)})
+            except Exception as e:
+                logger.debug(f"bus publish error: {e}")
+
+    async def owner_of(self, session_id: str) -> str:
+        if session_id in self._owned:
+            return self.node_id
+        if self._writer is None and self._up is not None and not self._stopping:
+            # hub failover in progress: wait briefly rather than split the session
+            try:
+                await asyncio.wait_for(self._up.wait(), self.reconnect_max_s)
+            except asyncio.TimeoutError:
+                pass
+        if self._writer is None:
+            return self.node_id
+        owner = self._owner_cache.get(session_id)
+        if owner is not None:
+            return owner
+        try:
+            owner = (await self._request({"op": "claim", "sid": session_id}))["owner"]
+        except ConnectionError:
+            return self.node_id
+        if owner == self.node_id:
+            self._owned.add(session_id)
+        else:
+            self._owner_cache[session_id] = owner
+        return owner
+
+    async def forward(self, node_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if node_id == self.node_id:
+            return await super().forward(node_id, payload)
+        try:
+            ack = (await self._request({"op": "fwd", "to": node_id, "payload": payload}))["ack"]
+        except ConnectionError:
+            ack = {"ok": False, "error": "owner gone"}
+        if ack.get("error") == "owner gone":
+            # owner left (or the hub did): forget it and ask again, possibly taking the session over
+            self._owner_cache.pop(payload.get("session_id"), None)
+            return await self.forward(await self.owner_of(payload.get("session_id")), payload)
+        return ack
+
+    async def release(self, session_id: str):
+        self._owner_cache.pop(session_id, None)
+        if session_id in self._owned:
+            self._owned.discard(session_id)
+            try:
+                await self._send({"op": "release", "sid": session_id})
+            except Exception:
+                pass
+
+
+def make_backend(kind: str = "memory", addr: str = "127.0.0.1:8790", secret: str = ""):
+    if kind == "socket":
+        return SocketBackend(addr, secret)
+    if kind not in ("memory", "", None):
+        raise ValueError(f"unknown cluster backend: {kind}")
+    return LocalBackend()
@@ -15,6 +15,34 @@ class Settings:
     include_aux_channels: bool = os.getenv("INCLUDE_AUX_CHANNELS", "1") == "1"
     max_ingest_rps: int = int(os.getenv("MAX_INGEST_RPS", "20"))
     session_ttl_s: int = int(os.getenv("SESSION_TTL_S", "600"))
+    # Ingest executor: 0 = inline on the event loop; N>0 = N shards (thread|process)
+    ingest_workers: int = int(os.getenv("INGEST_WORKERS", "0"))
+    ingest_executor: str = os.getenv("INGEST_EXECUTOR", "thread")
+    # Multi-process: memory (single process) | socket (local TCP hub at CLUSTER_ADDR)
+    cluster_backend: str = os.getenv("CLUSTER_BACKEND", "memory")
+    cluster_addr: str = os.getenv("CLUSTER_ADDR", "127.0.0.1:8790")
+    # shared secret nodes prove to the hub (forwarded ingest skips the API key check); defaults to API_KEY
+    cluster_secret: str = os.getenv("CLUSTER_SECRET") or os.getenv("API_KEY") or ""
+    # Websocket/log encoder: auto (orjson if installed) | orjson | json
+    json_backend: str = os.getenv("JSON_BACKEND", "auto")
+    # Per-client websocket send queue; slow consumer policy: coalesce | drop_oldest | disconnect
+    ws_send_queue: int = int(os.getenv("WS_SEND_QUEUE", "64"))
+    ws_slow_policy: str = os.getenv("WS_SLOW_POLICY", "coalesce")
+    # Background timeline log writer: records buffered before new ones are dropped
+    log_queue_max: int = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+    # Timeline journal (full payloads, gzip segments); empty JOURNAL_DIR disables it
+    journal_dir: str = os.getenv("JOURNAL_DIR", "logs/journal")
+    journal_segment_mb: int = int(os.getenv("JOURNAL_SEGMENT_MB", "64"))
+    journal_segment_s: int = int(os.getenv("JOURNAL_SEGMENT_S", "3600"))
+    journal_retention_h: float = float(os.getenv("JOURNAL_RETENTION_H", "72"))
+    # journal records buffered for the writer thread before new ones are dropped (disk stall)
+    journal_queue_max: int = int(os.getenv("JOURNAL_QUEUE_MAX", "50000"))
+    # Record every ingest message to this file (gzip) for scripts/replay_ingest.py; empty = off
+    ingest_record: str = os.getenv("INGEST_RECORD", "")
+    # Per-stage latency spans (Prometheus pipeline_stage_latency_ms + /stats stages_ms)
+    stage_timing: bool = os.getenv("STAGE_TIMING", "1") == "1"
+    # Per-session stats kept for GET /stats/sessions (least recently active evicted)
+    stats_sessions_max: int = int(os.getenv("STATS_SESSIONS_MAX", "1000"))
     # Alert thresholds
     latency_p90_warn_ms: int = int(os.getenv("LATENCY_P90_WARN_MS", "1200"))
     replace_ratio_warn: float = float(os.getenv("REPLACE_RATIO_WARN", "0.5"))
@@ -25,6 +53,31 @@ class Settings:
     replace_min_events: int = int(os.getenv("REPLACE_MIN_EVENTS", "2"))
     replace_min_ms: int = int(os.getenv("REPLACE_MIN_MS", "300"))
     replace_min_interval_ms: int = int(os.getenv("REPLACE_MIN_INTERVAL_MS", "150"))
+    # timeline.replace diff: myers = per-channel minimal windows, prefix = one from_t_ms window (legacy clients)
+    replace_diff: str = os.getenv("REPLACE_DIFF", "prefix")
+    diff_max_edits: int = int(os.getenv("DIFF_MAX_EDITS", "256"))
+    # per-session timeline messages kept for client resync (older ones fold into a snapshot)
+    delta_history: int = int(os.getenv("DELTA_HISTORY", "64"))
+    # rolling look-ahead: send only events due within this many ms of the playhead (0 = whole timeline)
+    playout_window_ms: int = int(os.getenv("PLAYOUT_WINDOW_MS", "0"))
+    playout_tick_ms: int = int(os.getenv("PLAYOUT_TICK_MS", "100"))
+    # partial commit tracking: release events unchanged in K partials or held for an adaptive
+    # min..max hold (grows with the flip rate); 0 = every change goes out (REPLACE_MIN_* gating)
+    stability_k: int = int(os.getenv("STABILITY_K", "0"))
+    stability_min_hold_ms: int = int(os.getenv("STABILITY_MIN_HOLD_MS", "150"))
+    stability_max_hold_ms: int = int(os.getenv("STABILITY_MAX_HOLD_MS", "1200"))
+    # /ws/asr streaming: inference threads per loaded model, window/hop (overlap = window - hop), quiet hops that end an utterance
+    asr_workers: int = int(os.getenv("ASR_WORKERS", "2"))
+    asr_window_ms: int = int(os.getenv("ASR_WINDOW_MS", "1600"))
+    asr_hop_ms: int = int(os.getenv("ASR_HOP_MS", "400"))
+    asr_silence_windows: int = int(os.getenv("ASR_SILENCE_WINDOWS", "2"))
+    # shared ASR models: windows waiting per model, idle eviction, models loaded at startup ("base:cpu:int8,small")
+    asr_queue_max: int = int(os.getenv("ASR_QUEUE_MAX", "32"))
+    asr_model_idle_s: float = float(os.getenv("ASR_MODEL_IDLE_S", "300"))
+    asr_warm_models: str = os.getenv("ASR_WARM_MODELS", "")
+    # cross-session batching: windows per inference call (1 = off) and how long to wait for more
+    asr_batch_max: int = int(os.getenv("ASR_BATCH_MAX", "1"))
+    asr_batch_deadline_ms: float = float(os.getenv("ASR_BATCH_DEADLINE_MS", "30"))
 
 
 @lru_cache
@@ -0,0 +1,109 @@
+"""
+Bounded per-session history of published timeline messages, for client catch-up.
+
+Every timeline / timeline.replace of a session carries a monotonic "seq" (assigned by the
+owning node); a replace also carries "base_seq", the seq it applies on top of. A client
+whose last applied seq differs from base_seq (missed message, drop_oldest, late join)
+sends {"op":"resync","session_id","since":<last seq>} and gets only the missing messages,
+or one snapshot (a full timeline with "resync": true) when `since` is older than the
+history. Every node records what it relays, so any node can answer.
+
+The last `depth` messages are kept; older ones are folded into a base event list (the
+same application a client does), so a snapshot costs one pass over the retained deltas.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from packages.sign_timeline import apply_windows
+
+
+def apply_message(events: List[Dict[str, Any]], message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Client-side application of one timeline / timeline.replace message."""
+    data = message.get("data") or {}
+    if message.get("type") == "timeline":
+        return list(data.get("events") or [])
+    if "windows" in data:
+        return apply_windows(events, data["windows"])
+    f = message.get("from_t_ms") or 0
+    return [e for e in events if e.get("t_ms", 0) < f] + list(data.get("events") or [])
+
+
+class _Topic:
+    __slots__ = ("base", "base_seq", "head", "deltas")
+
+    def __init__(self):
+        self.base: Optional[Dict[str, Any]] = None  # full timeline message at base_seq (events folded in)
+        self.base_seq = 0
+        self.head = 0                               # newest recorded seq
+        self.deltas: Deque[Dict[str, Any]] = deque()
+
+
+class DeltaHistory:
+    def __init__(self, depth: int = 64, max_sessions: int = 10000):
+        self.depth = max(1, int(depth))
+        # sessions owned elsewhere are never reset here; the least recently updated ones go first
+        self.max_sessions = max(1, int(max_sessions))
+        self._topics: Dict[str, _Topic] = {}
+
+    def __len__(self) -> int:
+        return len(self._topics)
+
+    def record(self, message: Dict[str, Any]) -> None:
+        sid, seq = message.get("session_id"), message.get("seq")
+        if sid is None or seq is None:
+            return
+        tp = self._topics.pop(sid, None)  # re-inserted last: dict order = recency
+        if tp is None:
+            tp = _Topic()
+            if len(self._topics) >= self.max_sessions:
+                del self._topics[next(iter(self._topics))]
+        self._topics[sid] = tp
+        if message.get("type") == "timeline":
+            tp.base, tp.base_seq = message, seq
+            tp.deltas.clear()
+        else:
+            expected = tp.deltas[-1]["seq"] if tp.deltas else tp.base_seq
+            if message.get("base_seq") != expected:
+                # a gap in what this node relayed: only a later full timeline makes the base usable again
+                tp.base, tp.base_seq = None, seq
+                tp.deltas.clear()
+            else:
+                tp.deltas.append(message)
+                if len(tp.deltas) > self.depth:
+                    old = tp.deltas.popleft()
+                    if tp.base is not None:
+                        tp.base = {**tp.base, "seq": old["seq"],
+                                   "data": {**tp.base["data"], "events": apply_message(tp.base["data"]["events"], old)}}
+                    tp.base_seq = old["seq"]
+        tp.head = seq
+
+    def snapshot(self, session_id: str) -> Optional[Dict[str, Any]]:
+        tp = self._topics.get(session_id)
+        if tp is None or tp.base is None:
+            return None
+        events = tp.base["data"]["events"]
+        data_id = tp.base["data"].get("id")
+        for m in tp.deltas:
+            events = apply_message(events, m)
+            data_id = (m.get("data") or {}).get("id", data_id)
+        return {"type": "timeline", "session_id": session_id, "seq": tp.head, "resync": True,
+                "data": {**tp.base["data"], "id": data_id, "events": events}}
+
+    def since(self, session_id: str, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Messages bringing a client at `seq` up to date ([] = already current), or None if unknown."""
+        tp = self._topics.get(session_id)
+        if tp is None:
+            return None
+        if seq == tp.head:
+            return []
+        if tp.base_seq <= seq < tp.head:
+            return [m for m in tp.deltas if m["seq"] > seq]
+        snap = self.snapshot(session_id)
+        return [snap] if snap is not None else None
+
+    def head(self, session_id: str) -> Optional[int]:
+        tp = self._topics.get(session_id)
+        return tp.head if tp is not None else None
+
+    def drop(self, session_id: str) -> None:
+        self._topics.pop(session_id, None)
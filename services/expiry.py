@@ -0,0 +1,72 @@
+"""
+Idle-expiry index for sessions: a min-heap keyed on last activity with lazy invalidation.
+
+touch() only records the new activity time (O(1)) and pushes only for keys without a heap
+entry; a key has at most one entry (its pushed time is tracked), even across discard/touch.
+When an entry reaches the top and the key was touched since it was pushed, it is re-pushed
+at its real activity time instead of expiring, so pop_expired() costs O(expired + re-armed)
+log n and never walks idle-but-alive sessions. The heap is ordered by activity time, not by
+deadline, so a runtime TTL change needs no rebuild.
+"""
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+
+class ExpiryIndex:
+    __slots__ = ("_heap", "_last", "_pushed")
+
+    def __init__(self):
+        self._heap: List[Tuple[int, str]] = []  # (activity ms when pushed, key)
+        self._last: Dict[str, int] = {}         # key -> latest activity ms
+        self._pushed: Dict[str, int] = {}       # key -> time of its (single) heap entry
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._last
+
+    def touch(self, key: str, now_ms: int) -> None:
+        if key not in self._pushed:
+            heapq.heappush(self._heap, (now_ms, key))
+            self._pushed[key] = now_ms
+        self._last[key] = now_ms
+
+    def discard(self, key: str) -> None:
+        # the heap entry goes stale and is dropped when it reaches the top (or reused by a later touch)
+        self._last.pop(key, None)
+
+    def _rearm(self, key: str, real: Optional[int]) -> None:
+        # the top entry of key is stale: drop it (discarded) or move it to the real activity time
+        if real is None:
+            heapq.heappop(self._heap)
+            del self._pushed[key]
+        else:
+            heapq.heapreplace(self._heap, (real, key))
+            self._pushed[key] = real
+
+    def next_due(self, ttl_ms: int) -> Optional[int]:
+        """Time (ms) after which the next key expires unless touched again, or None if empty."""
+        heap, last = self._heap, self._last
+        while heap:
+            at, key = heap[0]
+            real = last.get(key)
+            if real == at:
+                return at + ttl_ms
+            self._rearm(key, real)
+        return None
+
+    def pop_expired(self, now_ms: int, ttl_ms: int) -> List[str]:
+        """Remove and return keys idle for more than ttl_ms."""
+        heap, last = self._heap, self._last
+        out: List[str] = []
+        while heap and now_ms - heap[0][0] > ttl_ms:
+            at, key = heap[0]
+            real = last.get(key)
+            if real != at:
+                self._rearm(key, real)  # discarded, or touched since: re-arm at the real time
+                continue
+            heapq.heappop(heap)
+            del last[key], self._pushed[key]
+            out.append(key)
+        return out
@@ -0,0 +1,165 @@
+"""
+Sharded executor for the CPU-bound part of ingest (tokenize → gloss → compile → diff).
+
+Sessions are pinned to a shard by a stable hash of session_id; each shard is a
+single worker, so jobs of one session run strictly in submission order while
+different sessions run in parallel. The event loop only does socket I/O and
+broadcast. Modes: "inline" (on the loop, default), "thread", "process".
+"""
+import asyncio
+import time
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from packages.incremental import IncrementalCompiler
+from packages.ksl_rules import current_lexicon, set_overlay_lexicon
+from packages.sign_timeline import EventArrays, channel_windows, diff_window, event_key, windows_cheaper
+
+# Worker-local compiler state. In process mode every worker process owns the
+# sessions of its shard; in inline/thread mode this is the server's own dict.
+_COMPILERS: Dict[str, IncrementalCompiler] = {}
+
+
+def compile_session(session_id: str, text: str, start_ms: int, gap_ms: int, include_aux_channels: bool, fresh: bool = False,
+                    timed: bool = False, windows_max_d: int = 0) -> Dict[str, Any]:
+    """
+    Recompile a session's text and diff against its previous events.
+    Returns only the changed window so the result stays small across processes:
+    new_events == old[:start] + events + old[len(old) - (n_events - end):]
+    For clients: replacing everything from from_t_ms on by new_events[replace_from:] is exact.
+    fresh: the caller holds no events for this session (new or reset) → diff against nothing.
+    timed: add "timings" {tokenize, gloss, compile, diff, worker} in ms (measured in the worker)
+    windows_max_d: > 0 → also return per-channel minimal replace "windows" (Myers, at most this many edits)
+    """
+    timings: Optional[Dict[str, float]] = {} if timed else None
+    if timed:
+        t0 = time.perf_counter()
+    eng = None if fresh else _COMPILERS.get(session_id)
+    if eng is None:
+        eng = _COMPILERS[session_id] = IncrementalCompiler()
+    tl = eng.update(text, start_ms=start_ms, gap_ms=gap_ms, include_aux_channels=include_aux_channels, timings=timings)
+    new = eng.events
+    p0 = eng.stable_events
+    if timed:
+        t_diff = time.perf_counter()
+    # compare whole events: a substitution that changes a duration shifts every later t_ms,
+    # so a clip-only match would splice stale timings back in from the old suffix
+    old = eng.last_replaced
+    s, e = diff_window([event_key(x) for x in old], [event_key(x) for x in new[p0:]])
+    # earliest changed time, counting removed events too
+    firsts = [x[i]["t_ms"] for x, i in ((old, s), (new, p0 + s)) if i < len(x)]
+    from_t = min(firsts) if firsts else (new[-1]["t_ms"] if new else 0)
+    windows = channel_windows(old, new[p0:], windows_max_d) if windows_max_d > 0 else None
+    if windows:
+        # a window's times are those after the windows before it; keep the tail fallback exact either way
+        from_t = min(from_t, min(w["from_t_ms"] for w in windows))
+    replace_from = p0 + s
+    while replace_from > 0 and new[replace_from - 1]["t_ms"] >= from_t:
+        replace_from -= 1
+    if windows and not windows_cheaper(windows, len(new) - replace_from):
+        windows = None
+    if timed:
+        t_end = time.perf_counter()
+        timings["diff"] = (t_end - t_diff) * 1000.0
+        timings["worker"] = (t_end - t0) * 1000.0
+    return {
+        "id": tl["id"],
+        "created_ms": tl["created_ms"],
+        "lang": tl["lang"],
+        "meta": tl["meta"],
+        "start": p0 + s,
+        "end": p0 + e,
+        "events": new[p0 + s:p0 + e],
+        "n_events": len(new),
+        "from_t_ms": from_t,
+        "replace_from": replace_from,
+        "windows": windows,
+        "timings": timings,
+    }
+
+
+def drop_session(session_id: str) -> None:
+    _COMPILERS.pop(session_id, None)
+
+
+def apply_lexicon(overlay: Dict[str, str], version: int) -> None:
+    # replicate the server's lexicon snapshot (same version number) into a worker process
+    if current_lexicon().version != version:
+        set_overlay_lexicon(overlay, version=version)
+
+
+def apply_delta(old: List[Dict[str, Any]], res: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rebuild the full new event list from the previous one and a compile_session() result."""
+    keep_suffix = res["n_events"] - res["end"]
+    return old[:res["start"]] + res["events"] + (old[len(old) - keep_suffix:] if keep_suffix else [])
+
+
+def apply_delta_arrays(ev: EventArrays, res: Dict[str, Any]) -> None:
+    """In-place apply_delta() for the server's column-oriented session events."""
+    keep_suffix = res["n_events"] - res["end"]
+    ev.splice(res["start"], len(ev) - keep_suffix, res["events"])
+
+
+def shard_of(session_id: str, n: int) -> int:
+    # crc32 is stable across processes (str hash is salted per process)
+    return zlib.crc32(session_id.encode("utf-8")) % n if n > 1 else 0
+
+
+class InlineExecutor:
+    """Runs jobs directly on the event loop (no parallelism; previous behavior)."""
+
+    mode = "inline"
+    workers = 0
+
+    async def submit(self, session_id: str, fn: Callable, *args):
+        return fn(*args)
+
+    async def broadcast(self, fn: Callable, *args):
+        fn(*args)
+
+    def shutdown(self):
+        pass
+
+
+class ShardedExecutor:
+    """N single-worker shards (threads or processes); a session always maps to the same shard."""
+
+    def __init__(self, workers: int, mode: str = "thread"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"unknown executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        factory = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+        self._shards: List[Executor] = [factory(max_workers=1) for _ in range(self.workers)]
+        # process shards hold their own lexicon copy; track what they were sent
+        self._lex_version: Optional[int] = 0 if mode == "process" else None
+
+    def _sync_lexicon(self):
+        if self._lex_version is None:
+            return
+        snap = current_lexicon()
+        if snap.version != self._lex_version:
+            # FIFO per shard: the update lands before any job submitted after it
+            for ex in self._shards:
+                ex.submit(apply_lexicon, dict(snap.overlay), snap.version)
+            self._lex_version = snap.version
+
+    async def submit(self, session_id: str, fn: Callable, *args):
+        self._sync_lexicon()
+        ex = self._shards[shard_of(session_id, self.workers)]
+        return await asyncio.wrap_future(ex.submit(fn, *args))
+
+    async def broadcast(self, fn: Callable, *args):
+        self._sync_lexicon()
+        await asyncio.gather(*[asyncio.wrap_future(ex.submit(fn, *args)) for ex in self._shards])
+
+    def shutdown(self):
+        for ex in self._shards:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+
+def make_executor(workers: int, mode: str = "thread"):
+    if not workers or workers < 1 or mode == "inline":
+        return InlineExecutor()
+    return ShardedExecutor(workers, mode)
@@ -0,0 +1,217 @@
+"""
+Segmented, compressed timeline journal with a sparse in-memory index.
+
+Layout (one pair per segment):
+  seg-<first_ts>.jsonl.gz   concatenated gzip members ("blocks"), each ~block_bytes of JSONL
+  seg-<first_ts>.idx        one JSON line per block: [offset, length, min_ts, max_ts, [session ids]]
+
+Each record is {"ts","type","session_id","msg"} where msg is the broadcast payload.
+A block is an independent gzip member, so a range query seeks to the block's offset and
+decompresses only the blocks whose time range and session set match. Segments rotate by
+size or age; segments older than the retention window are deleted on rotation.
+Writes come from a single thread (the timeline log writer); queries may run concurrently.
+"""
+import gzip
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("pipeline.journal")
+
+
+class _Segment:
+    __slots__ = ("path", "idx_path", "first_ts", "last_ts", "created", "bytes", "n", "sessions", "blocks")
+
+    def __init__(self, path: Path, first_ts: int):
+        self.path = path
+        self.idx_path = path.with_name(path.name[: -len(".jsonl.gz")] + ".idx")
+        self.first_ts = first_ts
+        self.last_ts = first_ts
+        self.created = time.time()
+        self.bytes = 0
+        self.n = 0
+        self.sessions: Set[str] = set()
+        # [offset, length, min_ts, max_ts, frozenset(session ids), n_records]
+        self.blocks: List[Tuple[int, int, int, int, frozenset, int]] = []
+
+    def add_block(self, block):
+        self.blocks.append(block)
+        off, ln, lo, hi, sids, n = block
+        self.first_ts = min(self.first_ts, lo)
+        self.last_ts = max(self.last_ts, hi)
+        self.bytes = max(self.bytes, off + ln)
+        self.n += n
+        self.sessions |= sids
+
+
+class TimelineJournal:
+    def __init__(self, directory: Path, segment_max_bytes: int = 64 << 20, segment_max_s: float = 3600,
+                 block_bytes: int = 64 << 10, block_max_age_s: float = 5.0, retention_s: float = 72 * 3600):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = int(segment_max_bytes)
+        self.segment_max_s = float(segment_max_s)
+        self.block_bytes = int(block_bytes)
+        self.block_max_age_s = float(block_max_age_s)
+        self.retention_s = float(retention_s)
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        # records not yet compressed into a block: (ts, session_id, line)
+        self._pending: List[Tuple[int, Optional[str], str]] = []
+        self._pending_bytes = 0
+        self._pending_since = 0.0
+        self.lost = 0  # records whose block could not be written
+        self._load()
+
+    # ---- writer side (single thread) ----
+
+    def append(self, ts: int, mtype: str, session_id: Optional[str], raw: str):
+        """raw: the message already encoded as JSON text."""
+        line = '{"ts":%d,"type":%s,"session_id":%s,"msg":%s}\n' % (
+            ts, json.dumps(mtype), json.dumps(session_id, ensure_ascii=False), raw)
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((ts, session_id, line))
+            self._pending_bytes += len(line)
+            full = self._pending_bytes >= self.block_bytes
+        if full:
+            self.flush()
+
+    def maybe_flush(self):
+        """Seal the pending block once it is old enough (called on the writer's idle ticks)."""
+        if self._pending and time.monotonic() - self._pending_since >= self.block_max_age_s:
+            self.flush()
+
+    def flush(self):
+        # items stay in _pending (visible to range()) until their block is in the index:
+        # both change under one lock, so a concurrent query sees each record exactly once
+        with self._lock:
+            items = list(self._pending)
+        if not items:
+            return
+        lo = min(t for t, _, _ in items)
+        hi = max(t for t, _, _ in items)
+        sids = frozenset(s for _, s, _ in items if s is not None)
+        data = gzip.compress("".join(line for _, _, line in items).encode("utf-8"), compresslevel=6)
+        seg = self._active_segment(lo)
+        block = None
+        try:
+            with seg.path.open("ab") as f:
+                off = f.tell()
+                f.write(data)
+            block = (off, len(data), lo, hi, sids, len(items))
+            with seg.idx_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps([off, len(data), lo, hi, sorted(sids), len(items)], ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning(f"journal write error: {e}")
+        with self._lock:
+            if block is not None:
+                seg.add_block(block)
+            else:
+                self.lost += len(items)
+            del self._pending[:len(items)]
+            self._pending_bytes = sum(len(line) for _, _, line in self._pending)
+
+    def _active_segment(self, ts: int) -> _Segment:
+        seg = self._segments[-1] if self._segments else None
+        if seg is None or seg.bytes >= self.segment_max_bytes or time.time() - seg.created >= self.segment_max_s:
+            seg = _Segment(self._segment_path(ts), ts)
+            with self._lock:
+                self._segments.append(seg)
+            self._apply_retention()
+        return seg
+
+    def _segment_path(self, ts: int) -> Path:
+        p = self.dir / f"seg-{ts:013d}.jsonl.gz"
+        k = 1
+        while p.exists():
+            p = self.dir / f"seg-{ts:013d}-{k}.jsonl.gz"
+            k += 1
+        return p
+
+    def _apply_retention(self):
+        if self.retention_s <= 0:
+            return
+        cutoff = int((time.time() - self.retention_s) * 1000)
+        with self._lock:
+            old = [s for s in self._segments[:-1] if s.last_ts < cutoff]
+            self._segments = [s for s in self._segments if s not in old]
+        for s in old:
+            for p in (s.path, s.idx_path):
+                try:
+                    p.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _load(self):
+        for idx in sorted(self.dir.glob("seg-*.idx")):
+            path = idx.with_name(idx.name[: -len(".idx")] + ".jsonl.gz")
+            if not path.exists():
+                continue
+            seg = None
+            for line in idx.read_text(encoding="utf-8").splitlines():
+                try:
+                    off, ln, lo, hi, sids, n = json.loads(line)
+                except Exception:
+                    continue  # torn last line after a crash
+                if seg is None:
+                    seg = _Segment(path, lo)
+                    seg.created = path.stat().st_mtime
+                seg.add_block((off, ln, lo, hi, frozenset(sids), n))
+            if seg is not None:
+                # unindexed bytes after the last block (crash mid-write) are never read
+                seg.bytes = path.stat().st_size
+                self._segments.append(seg)
+        self._segments.sort(key=lambda s: s.first_ts)
+
+    # ---- query side ----
+
+    def range(self, session_id: Optional[str] = None, from_ts: int = 0, to_ts: Optional[int] = None,
+              limit: int = 1000) -> List[Dict[str, Any]]:
+        """Records with from_ts <= ts <= to_ts (optionally of one session), oldest first."""
+        hi_ts = to_ts if to_ts is not None else 1 << 62
+        with self._lock:
+            plan = [
+                (s.path, [b for b in s.blocks
+                          if b[3] >= from_ts and b[2] <= hi_ts and (session_id is None or session_id in b[4])])
+                for s in self._segments
+                if s.last_ts >= from_ts and s.first_ts <= hi_ts and (session_id is None or session_id in s.sessions)
+            ]
+            pending = [line for ts, sid, line in self._pending
+                       if from_ts <= ts <= hi_ts and (session_id is None or sid == session_id)]
+        out: List[Dict[str, Any]] = []
+
+        def take(lines) -> bool:
+            for line in lines:
+                rec = json.loads(line)
+                if from_ts <= rec["ts"] <= hi_ts and (session_id is None or rec["session_id"] == session_id):
+                    out.append(rec)
+                    if len(out) >= limit:
+                        return False
+            return True
+
+        for path, blocks in plan:
+            if not blocks:
+                continue
+            with path.open("rb") as f:
+                for off, ln, _, _, _, _ in blocks:
+                    f.seek(off)
+                    if not take(gzip.decompress(f.read(ln)).decode("utf-8").splitlines()):
+                        return out
+        take(pending)
+        return out
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "blocks": sum(len(s.blocks) for s in self._segments),
+                "records": sum(s.n for s in self._segments) + len(self._pending),
+                "bytes": sum(s.bytes for s in self._segments),
+                "first_ts": self._segments[0].first_ts if self._segments else None,
+                "lost": self.lost,
+            }
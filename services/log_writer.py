@@ -0,0 +1,175 @@
+"""
+Background writer for the timeline log.
+
+The event loop only hands records over (queue.put_nowait, no I/O). A daemon thread
+appends them to timeline.log in batches and rewrites last_timeline.json at most once
+per debounce interval with the newest snapshot (older snapshots are coalesced away).
+If the disk stalls and the backlog reaches max_backlog, new records are dropped and
+counted instead of blocking ingest. The thread is started explicitly (start(), from the
+app's startup hook), not on construction. With a journal attached, the full encoded payload
+of each record goes through a separate queue to it on the same thread, so a full log
+backlog never costs journal records. That queue has its own, larger bound
+(journal_max_backlog): during a long disk stall new journal records are dropped and counted
+(journal_dropped) rather than growing memory without limit.
+"""
+import collections
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("pipeline.log_writer")
+
+
+class TimelineLogWriter:
+    def __init__(self, log_path: Path, last_path: Path, max_backlog: int = 10000, batch_size: int = 256,
+                 flush_interval_s: float = 0.2, last_debounce_s: float = 0.5, journal=None,
+                 on_drop: Optional[Callable[[int], None]] = None, journal_max_backlog: int = 50000,
+                 on_journal_drop: Optional[Callable[[int], None]] = None):
+        self.log_path = Path(log_path)
+        self.last_path = Path(last_path)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = float(flush_interval_s)
+        self.last_debounce_s = float(last_debounce_s)
+        self.journal = journal
+        self._q: "queue.Queue[Tuple[Dict[str, Any], Optional[str]]]" = queue.Queue(maxsize=max(1, int(max_backlog)))
+        # (ts, type, session_id, raw) for the journal; deque append/popleft are thread-safe
+        self._jq: "collections.deque[Tuple[int, str, Optional[str], str]]" = collections.deque()
+        self.journal_max_backlog = max(1, int(journal_max_backlog))
+        self._last_text: Optional[str] = None
+        self._last_dirty = False
+        self._stop = threading.Event()
+        self.on_drop = on_drop
+        self.on_journal_drop = on_journal_drop
+        # one counter per thread (no shared read-modify-write): backlog full on the submitter's
+        # thread, failed writes on the writer thread
+        self.dropped_full = 0
+        self.dropped_io = 0
+        self.journal_dropped = 0  # submitter's thread
+        self.written = 0
+        self.batches = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start (or restart after close()) the writer thread; no-op while it runs."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="timeline-log-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self) -> int:
+        return self.dropped_full + self.dropped_io
+
+    def _dropped(self, n: int, io: bool):
+        # every lost log record goes through here (metrics hook included)
+        if io:
+            self.dropped_io += n
+        else:
+            self.dropped_full += n
+        if self.on_drop is not None:
+            try:
+                self.on_drop(n)
+            except Exception:
+                pass
+
+    @property
+    def backlog(self) -> int:
+        return self._q.qsize()
+
+    @property
+    def last_text(self) -> Optional[str]:
+        """Newest snapshot handed in (may not be on disk yet)."""
+        return self._last_text
+
+    def submit(self, rec: Dict[str, Any], last_text: Optional[str] = None) -> bool:
+        """
+        Non-blocking. False when the backlog is full and rec was dropped.
+        last_text: the encoded payload (newest snapshot; also journaled when a journal is attached)
+        """
+        if last_text is not None:
+            self._last_text = last_text
+            self._last_dirty = True
+            if self.journal is not None:
+                if len(self._jq) < self.journal_max_backlog:
+                    self._jq.append((rec["ts"], rec["type"], rec.get("session_id"), last_text))
+                else:
+                    self.journal_dropped += 1
+                    if self.on_journal_drop is not None:
+                        try:
+                            self.on_journal_drop(1)
+                        except Exception:
+                            pass
+        try:
+            self._q.put_nowait((rec, last_text))
+            return True
+        except queue.Full:
+            self._dropped(1, io=False)
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"backlog": self.backlog, "dropped": self.dropped, "dropped_full": self.dropped_full,
+                "dropped_io": self.dropped_io, "written": self.written, "batches": self.batches,
+                "journal_backlog": len(self._jq), "journal_dropped": self.journal_dropped}
+
+    def close(self, timeout: float = 5.0):
+        """Flush what is queued and stop the thread (blocking; call off the event loop)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch)
+        with self.log_path.open("a", encoding="utf-8") as f:
+            f.write(data)
+
+    def _write_last(self, text: str):
+        tmp = self.last_path.with_suffix(self.last_path.suffix + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, self.last_path)
+
+    def _run(self):
+        last_snap = 0.0
+        while True:
+            batch: List[Tuple[Dict[str, Any], Optional[str]]] = []
+            try:
+                batch.append(self._q.get(timeout=self.flush_interval_s))
+                while len(batch) < self.batch_size:
+                    batch.append(self._q.get_nowait())
+            except queue.Empty:
+                pass
+            stopping = self._stop.is_set()
+            if batch:
+                try:
+                    self._write_batch([rec for rec, _ in batch])
+                    self.written += len(batch)
+                    self.batches += 1
+                except Exception as e:
+                    self._dropped(len(batch), io=True)
+                    logger.debug(f"timeline log write error: {e}")
+            if self.journal is not None:
+                try:
+                    jq = self._jq
+                    while jq:
+                        self.journal.append(*jq.popleft())
+                    if stopping:
+                        self.journal.flush()
+                    else:
+                        self.journal.maybe_flush()
+                except Exception as e:
+                    logger.debug(f"journal error: {e}")
+            now = time.monotonic()
+            if self._last_dirty and (stopping or now - last_snap >= self.last_debounce_s):
+                self._last_dirty = False
+                last_snap = now
+                try:
+                    self._write_last(self._last_text or "")
+                except Exception as e:
+                    logger.debug(f"last timeline write error: {e}")
+            if stopping and self._q.empty() and not self._jq:
+                return
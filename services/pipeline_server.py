@@ -1,9 +1,10 @@
-﻿from typing import List, Optional, Dict, Any, Tuple
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header, HTTPException, Depends, UploadFile, File
+﻿from typing import List, Optional, Dict, Any, Set, Tuple
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header, HTTPException, Depends, UploadFile, File, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import asyncio
+import bisect
 import time
 import json
 
@@ -13,9 +14,25 @@ from jsonschema import validate as jsonschema_validate, Draft202012Validator
 from pathlib import Path
 import os
 
-from packages.ksl_rules import tokenize_ko, ko_to_gloss, set_overlay_lexicon, load_overlay_lexicon
-from packages.sign_timeline import compile_glosses
+from packages.ksl_rules import tokenize_ko, ko_to_gloss, set_overlay_lexicon, load_overlay_lexicon, current_lexicon
+from packages.sign_timeline import compile_glosses, EventArrays, apply_windows
+from packages.sign_timeline.diff import diff_window as _diff_window  # noqa: F401 (re-exported for tests/tools)
 from services.config import get_settings
+from services.ingest_executor import make_executor, compile_session, drop_session, apply_delta_arrays
+from services.session_state import SessionState
+from services.expiry import ExpiryIndex
+from services.delta_history import DeltaHistory
+from services.playout import Playout
+from services.stability import StabilityTracker
+from services.asr import StreamingASR, FakeASRModel
+from services.asr_pool import ModelKey, ModelPool, parse_keys
+from services.cluster import make_backend
+from services import wire, binwire
+from services.log_writer import TimelineLogWriter
+from services.journal import TimelineJournal
+from services.replay import IngestRecorder
+from services.spans import StageTimings
+from services.sketch import RollingCounter, RollingSketch
 import logging
 from typing import Callable
 
@@ -27,49 +44,375 @@ class IngestText(BaseModel):
     id: Optional[str] = None
 
 
+def _csv(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [x.strip() for x in value.split(",") if x.strip()] or None
+
+
+WIRE_FORMATS = ("json", "binary")
+
+
+class Subscription:
+    """/ws/timeline 구독 필터. None = 전체(기존 동작). format=binary: timeline 메시지를 services.binwire 프레임으로."""
+
+    __slots__ = ("sessions", "types", "channels", "format")
+
+    def __init__(self, sessions=None, types=None, channels=None, format=None):
+        self.sessions = frozenset(sessions) if sessions else None
+        self.types = frozenset(types) if types else None
+        self.channels = frozenset(channels) if channels else None
+        self.format = format if format in WIRE_FORMATS else "json"
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Subscription":
+        def _lst(v):
+            return _csv(v) if isinstance(v, str) else (list(v) if v else None)
+        return cls(_lst(d.get("sessions")), _lst(d.get("types")), _lst(d.get("channels")), d.get("format"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {k: (sorted(getattr(self, k)) if getattr(self, k) is not None else None)
+                               for k in ("sessions", "types", "channels")}
+        if self.format != "json":
+            out["format"] = self.format
+        return out
+
+
+def _encode_frame(message: Dict[str, Any], binary: bool):
+    """(frame, nbytes): bytes for binary subscribers of timeline messages, else JSON text."""
+    if binary:
+        frame = binwire.encode(message)
+        return frame, len(frame)
+    text = wire.dumps(message)
+    return text, len(text.encode("utf-8"))
+
+
+def _filter_channels(message: Dict[str, Any], channels: frozenset) -> Dict[str, Any]:
+    data = message.get("data")
+    if not isinstance(data, dict):
+        return message
+    if "windows" in data:
+        windows = []
+        for w in data["windows"]:
+            keep = [c for c in w["channels"] if c in channels]
+            if keep:
+                windows.append({**w, "channels": keep, "events": [e for e in w["events"] if e.get("channel", "default") in channels]})
+        return {**message, "data": {**data, "windows": windows}}
+    if "events" not in data:
+        return message
+    events = [e for e in data["events"] if e.get("channel", "default") in channels]
+    return {**message, "data": {**data, "events": events}}
+
+
+def _coalesce(prev: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Merge two queued timeline messages of one session into the state the client reaches after both.
+    timeline.replace = "events from from_t_ms on are replaced by data.events" (the server sends the
+    whole tail from the first change, so the kept suffix travels with it), or with data.windows
+    (REPLACE_DIFF=myers) per-channel windows applied in order. None = the pair can't be merged.
+    """
+    if new.get("type") != "timeline.replace":
+        return new  # a full timeline supersedes anything queued before it
+    # delta protocol: the merged message goes from prev's base to new's seq
+    seqs = {k: v for k, v in (("seq", new.get("seq")), ("base_seq", prev.get("base_seq"))) if v is not None}
+    if "windows" in new["data"]:
+        if prev.get("type") == "timeline":
+            events = apply_windows(prev["data"]["events"], new["data"]["windows"])
+            return {**prev, **seqs, "data": {**prev["data"], "events": events}}
+        if "windows" not in prev["data"]:
+            return None
+        windows = prev["data"]["windows"] + new["data"]["windows"]
+        return {**new, **seqs, "from_t_ms": min(prev.get("from_t_ms") or 0, new.get("from_t_ms") or 0), "data": {**new["data"], "windows": windows}}
+    if "windows" in prev["data"]:
+        return None
+    f2 = new.get("from_t_ms") or 0
+    events = [e for e in prev["data"]["events"] if e.get("t_ms", 0) < f2] + new["data"]["events"]
+    if prev.get("type") == "timeline":
+        return {**prev, **seqs, "data": {**prev["data"], "events": events}}
+    return {**new, **seqs, "from_t_ms": min(prev.get("from_t_ms") or 0, f2), "data": {**new["data"], "events": events}}
+
+
+SLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+_COALESCIBLE = ("timeline", "timeline.replace")
+
+
+class _ClientQueue:
+    """Bounded outbound queue + writer task of one websocket. Entries: (type, session_id, message, frame, nbytes)."""
+
+    __slots__ = ("id", "ws", "items", "wake", "task", "sending", "sent", "dropped", "coalesced", "max_depth", "acked")
+
+    def __init__(self, cid: int, ws: WebSocket):
+        from collections import deque
+        self.id = cid
+        self.ws = ws
+        self.items = deque()
+        self.wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sending = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.acked: Optional[Dict[str, int]] = None  # session -> last seq the client acked
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"id": self.id, "depth": len(self.items), "max_depth": self.max_depth,
+                "sent": self.sent, "dropped": self.dropped, "coalesced": self.coalesced, "acked": dict(self.acked or {})}
+
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, max_queue: int = 64, slow_policy: str = "coalesce"):
+        if slow_policy not in SLOW_POLICIES:
+            raise ValueError(f"unknown slow consumer policy: {slow_policy}")
         self.active: List[WebSocket] = []
         self.lock = asyncio.Lock()
-
-    async def connect(self, websocket: WebSocket):
+        self.subs: Dict[WebSocket, Subscription] = {}
+        # topic index: session_id -> subscribed sockets; _all = sockets without a session filter
+        self._by_session: Dict[str, Set[WebSocket]] = {}
+        self._all: Set[WebSocket] = set()
+        # per-topic counters: topic -> [messages, fanout_total, bytes_sent]
+        self.topic_stats: Dict[str, List[int]] = {}
+        # per-client send queues: broadcast only enqueues, a writer task per socket sends
+        self.max_queue = max(1, int(max_queue))
+        self.slow_policy = slow_policy
+        self.queues: Dict[WebSocket, _ClientQueue] = {}
+        self._next_id = 0
+
+    async def connect(self, websocket: WebSocket, sub: Optional[Subscription] = None):
         await websocket.accept()
         async with self.lock:
             self.active.append(websocket)
+            self._index(websocket, sub or Subscription())
+            self._next_id += 1
+            q = self.queues[websocket] = _ClientQueue(self._next_id, websocket)
+            q.task = asyncio.create_task(self._writer(q))
             try:
                 WS_CLIENTS.set(len(self.active))
             except Exception:
                 pass
 
+    async def subscribe(self, websocket: WebSocket, sub: Subscription):
+        async with self.lock:
+            if websocket in self.subs:
+                self._index(websocket, sub)
+
     async def disconnect(self, websocket: WebSocket):
         async with self.lock:
             if websocket in self.active:
                 self.active.remove(websocket)
+                self._unindex(websocket)
+                q = self.queues.pop(websocket, None)
+                if q is not None and q.task is not None and q.task is not asyncio.current_task():
+                    q.task.cancel()
                 try:
                     WS_CLIENTS.set(len(self.active))
                 except Exception:
                     pass
 
-    async def broadcast_json(self, message):
+    def _index(self, ws: WebSocket, sub: Subscription):
+        # caller holds self.lock
+        self._unindex(ws)
+        self.subs[ws] = sub
+        if sub.sessions is None:
+            self._all.add(ws)
+        else:
+            for sid in sub.sessions:
+                self._by_session.setdefault(sid, set()).add(ws)
+
+    def _unindex(self, ws: WebSocket):
+        old = self.subs.pop(ws, None)
+        if old is None:
+            return
+        if old.sessions is None:
+            self._all.discard(ws)
+        else:
+            for sid in old.sessions:
+                subs = self._by_session.get(sid)
+                if subs is not None:
+                    subs.discard(ws)
+                    if not subs:
+                        del self._by_session[sid]
+
+    def _targets(self, session_id: Optional[str]) -> List[WebSocket]:
+        if session_id is None:
+            # session-less messages (stats, /ingest_text) go to everyone
+            return list(self.active)
+        subs = self._by_session.get(session_id)
+        return list(self._all | subs) if subs else list(self._all)
+
+    def drop_topic(self, session_id: str):
+        self.topic_stats.pop(session_id, None)
+
+    def topic_snapshot(self) -> Dict[str, Any]:
+        return {
+            t: {"subscribers": (len(self._all) + len(self._by_session.get(t, ()))) if t != "_global" else len(self.active),
+                "messages": v[0], "fanout_total": v[1], "bytes_sent": v[2]}
+            for t, v in self.topic_stats.items()
+        }
+
+    def queue_snapshot(self) -> List[Dict[str, Any]]:
+        out = [q.snapshot() for q in self.queues.values()]
+        try:
+            WS_QUEUE_DEPTH.set(max((x["depth"] for x in out), default=0))
+        except Exception:
+            pass
+        return out
+
+    async def broadcast_json(self, message, text: Optional[str] = None):
+        """
+        Queue message for interested sockets and return; per-socket writers do the sending.
+        text: message already encoded with wire.dumps.
+        """
+        mtype = message.get("type")
+        sid = message.get("session_id")
+        # group interested sockets by channel filter and wire format so each variant is encoded once
+        coalescible = mtype in _COALESCIBLE
+        groups: Dict[Tuple[Optional[frozenset], bool], List[_ClientQueue]] = {}
         async with self.lock:
-            send_tasks = []
-            for ws in list(self.active):
-                send_tasks.append(self._safe_send(ws, message))
-        if send_tasks:
-            await asyncio.gather(*send_tasks, return_exceptions=True)
+            for ws in self._targets(sid):
+                sub = self.subs.get(ws)
+                q = self.queues.get(ws)
+                if sub is None or q is None or (sub.types is not None and mtype not in sub.types):
+                    continue
+                groups.setdefault((sub.channels, coalescible and sub.format == "binary"), []).append(q)
+        fanout = 0
+        slow: List[_ClientQueue] = []
+        for (channels, binary), targets in groups.items():
+            # encode once per variant; every socket in the group gets the same frame
+            msg = _filter_channels(message, channels) if channels else message
+            if binary:
+                frame, nbytes = _encode_frame(msg, True)
+            elif channels:
+                frame, nbytes = _encode_frame(msg, False)
+            else:
+                if text is None:
+                    text = wire.dumps(message)
+                frame, nbytes = text, len(text.encode("utf-8"))
+            entry = (mtype, sid, msg, frame, nbytes)
+            fanout += len(targets)
+            for q in targets:
+                if not self._enqueue(q, entry):
+                    slow.append(q)
+        topic = sid if sid is not None else "_global"
+        rec = self.topic_stats.get(topic)
+        if rec is None:
+            rec = self.topic_stats[topic] = [0, 0, 0]
+        rec[0] += 1
+        rec[1] += fanout
+        try:
+            WS_FANOUT.labels(mtype or "unknown").observe(fanout)
+        except Exception:
+            pass
+        for q in slow:
+            await self._drop_client(q)
 
-    async def _safe_send(self, ws: WebSocket, message):
+    async def send_direct(self, websocket: WebSocket, messages: List[Dict[str, Any]]) -> None:
+        """Queue messages for one socket (resync replies): its channel filter applies, its type filter doesn't."""
+        async with self.lock:
+            sub = self.subs.get(websocket)
+            q = self.queues.get(websocket)
+        if sub is None or q is None:
+            return
+        for m in messages:
+            msg = _filter_channels(m, sub.channels) if sub.channels else m
+            frame, nbytes = _encode_frame(msg, sub.format == "binary" and m.get("type") in _COALESCIBLE)
+            # never merged into what is already queued: that may be ahead of the reply
+            if not self._enqueue(q, (m.get("type"), m.get("session_id"), msg, frame, nbytes), coalesce=False):
+                await self._drop_client(q)
+                return
+
+    def ack(self, websocket: WebSocket, session_id: str, seq: int) -> None:
+        q = self.queues.get(websocket)
+        if q is not None:
+            if q.acked is None:
+                q.acked = {}
+            q.acked[session_id] = seq
+
+    def _enqueue(self, q: _ClientQueue, entry, coalesce: bool = True) -> bool:
+        """Apply the slow-consumer policy; False = the client must be disconnected."""
+        items = q.items
+        mtype, sid = entry[0], entry[1]
+        if coalesce and self.slow_policy == "coalesce" and sid is not None and mtype in _COALESCIBLE and items:
+            # a not-yet-sent message of the same session can absorb this one
+            for i in range(len(items) - 1, -1, -1):
+                prev = items[i]
+                if prev[1] == sid and prev[0] in _COALESCIBLE:
+                    merged = _coalesce(prev[2], entry[2])
+                    if merged is None:
+                        break
+                    frame, nbytes = _encode_frame(merged, isinstance(entry[3], bytes))
+                    del items[i]
+                    entry = (merged["type"], sid, merged, frame, nbytes)
+                    q.coalesced += 1
+                    try:
+                        WS_COALESCED.inc()
+                    except Exception:
+                        pass
+                    break
+        if len(items) >= self.max_queue:
+            if self.slow_policy == "disconnect":
+                return False
+            items.popleft()
+            q.dropped += 1
+            try:
+                WS_DROPPED.inc()
+            except Exception:
+                pass
+        items.append(entry)
+        if len(items) > q.max_depth:
+            q.max_depth = len(items)
+        q.wake.set()
+        return True
+
+    async def _writer(self, q: _ClientQueue):
+        ws = q.ws
         try:
-            await ws.send_json(message)
+            while True:
+                if not q.items:
+                    q.wake.clear()
+                    await q.wake.wait()
+                    continue
+                mtype, sid, _, frame, nbytes = q.items.popleft()
+                q.sending = True
+                try:
+                    if isinstance(frame, bytes):
+                        await ws.send_bytes(frame)
+                    else:
+                        await ws.send_text(frame)
+                finally:
+                    q.sending = False
+                q.sent += 1
+                rec = self.topic_stats.get(sid if sid is not None else "_global")
+                if rec is not None:
+                    rec[2] += nbytes
+                try:
+                    WS_BYTES.labels(mtype or "unknown").inc(nbytes)
+                except Exception:
+                    pass
+        except asyncio.CancelledError:
+            raise
         except Exception:
             try:
                 BROADCAST_ERR.inc()
             except Exception:
                 pass
-            try:
-                await ws.close()
-            finally:
-                await self.disconnect(ws)
+            await self._drop_client(q)
+
+    async def _drop_client(self, q: _ClientQueue):
+        try:
+            await q.ws.close()
+        except Exception:
+            pass
+        finally:
+            await self.disconnect(q.ws)
+
+    async def drain(self, timeout: float = 5.0):
+        """Wait until every client queue is flushed (tests/benchmarks)."""
+        deadline = time.perf_counter() + timeout
+        while any(q.items or q.sending for q in self.queues.values()):
+            if time.perf_counter() > deadline:
+                break
+            await asyncio.sleep(0)
 
 
 settings = get_settings()
@@ -85,27 +428,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-manager = ConnectionManager()
+manager = ConnectionManager(settings.ws_send_queue, settings.ws_slow_policy)
+# CPU-bound ingest work: inline on the loop (INGEST_WORKERS=0) or sharded by session_id
+ingest_pool = make_executor(settings.ingest_workers, settings.ingest_executor)
+# session affinity + timeline fan-out across server processes (memory = single process)
+cluster = make_backend(settings.cluster_backend, settings.cluster_addr, settings.cluster_secret)
 
 # API key dependency used by protected endpoints
 def require_api_key(x_api_key: str | None = Header(default=None)):
     if settings.api_key and x_api_key != settings.api_key:
         raise HTTPException(status_code=401, detail="invalid api key")
 
-# 세션 상태: 증분 처리용(간단 버전)
-class SessionState(BaseModel):
-    text: str = ""
-    events: List[Dict[str, Any]] = []
-    base_id: Optional[str] = None
-    start_ms: int = 0
-    gap_ms: int = 60
-    recent_ms: List[int] = []
-    last_update_ms: int = 0
-    meta: Dict[str, Any] = {}
-    last_text: str = ""
-    last_replace_broadcast_ms: int = 0
-
 sessions: Dict[str, SessionState] = {}
+# recent timeline messages per session (every node records what it relays) for client resync
+delta_history = DeltaHistory(settings.delta_history)
+# sessions whose look-ahead window still has events to send (PLAYOUT_WINDOW_MS > 0), ticked by _playout_loop
+playing: Set[str] = set()
+# sessions with compiled events not yet released to clients (STABILITY_K > 0), ticked by _stability_loop
+settling: Set[str] = set()
+# idle-expiry index over sessions (last activity), drained by _session_purger
+session_expiry = ExpiryIndex()
+# per-stage latency (tokenize/gloss/compile/diff/queue/apply/broadcast/log/total, asr)
+stage_timings = StageTimings(enabled=settings.stage_timing)
 
 # Metrics
 REQ_LAT = Histogram("pipeline_request_latency_seconds", "Latency of API processing", labelnames=("endpoint",))
@@ -115,6 +459,15 @@ INGEST_TO_BC_MS = Histogram("ingest_to_broadcast_ms", "Latency from ingest messa
 BROADCAST_ERR = Counter("timeline_broadcast_errors_total", "Number of websocket broadcast errors")
 WS_CLIENTS = Gauge("websocket_clients", "Number of connected websocket clients")
 RATE_LIMITED = Counter("ingest_rate_limited_total", "Number of ingest messages rate-limited")
+WS_FANOUT = Histogram("ws_fanout_clients", "Websocket clients a message was sent to", labelnames=("type",), buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+WS_BYTES = Counter("ws_bytes_sent_total", "Bytes sent to websocket clients", labelnames=("type",))
+WS_QUEUE_DEPTH = Gauge("ws_send_queue_depth_max", "Deepest per-client websocket send queue")
+WS_DROPPED = Counter("ws_send_dropped_total", "Messages dropped from slow websocket clients' queues")
+WS_COALESCED = Counter("ws_send_coalesced_total", "Queued timeline messages coalesced for slow websocket clients")
+WS_RESYNC = Counter("ws_resync_total", "Client resync requests by answer", labelnames=("result",))
+LOG_BACKLOG = Gauge("timeline_log_backlog", "Timeline log records waiting for the background writer")
+LOG_DROPPED = Counter("timeline_log_dropped_total", "Timeline log records dropped (writer backlog full or write failure)")
+JOURNAL_DROPPED = Counter("timeline_journal_dropped_total", "Journal records dropped because the journal backlog was full")
 
 # Load timeline schema for validation
 _SCHEMA_PATH = Path("schemas/sign_timeline.schema.json")
@@ -149,6 +502,13 @@ async def get_stats(_: None = Depends(require_api_key)):
     return stats.snapshot()
 
 
+@app.get("/stats/sessions")
+async def get_stats_sessions(session_id: Optional[str] = None, _: None = Depends(require_api_key)):
+    # per-session 5m rates/replace ratio/latency (kept out of /stats: O(sessions))
+    items = stats.sessions_snapshot(session_id)
+    return {"count": len(items), "items": items}
+
+
 @app.get("/stats/alerts")
 async def get_stats_alerts(_: None = Depends(require_api_key)):
     s = stats.snapshot()
@@ -205,6 +565,11 @@ async def get_config(_: None = Depends(require_api_key)):
         "replace_min_events": getattr(settings, 'replace_min_events', None),
         "replace_min_ms": getattr(settings, 'replace_min_ms', None),
         "replace_min_interval_ms": getattr(settings, 'replace_min_interval_ms', None),
+        "playout_window_ms": settings.playout_window_ms,
+        "playout_tick_ms": settings.playout_tick_ms,
+        "stability_k": settings.stability_k,
+        "stability_min_hold_ms": settings.stability_min_hold_ms,
+        "stability_max_hold_ms": settings.stability_max_hold_ms,
     }
 
 
@@ -217,6 +582,11 @@ class ConfigUpdate(BaseModel):
     replace_min_events: Optional[int] = None
     replace_min_ms: Optional[int] = None
     replace_min_interval_ms: Optional[int] = None
+    playout_window_ms: Optional[int] = None
+    playout_tick_ms: Optional[int] = None
+    stability_k: Optional[int] = None
+    stability_min_hold_ms: Optional[int] = None
+    stability_max_hold_ms: Optional[int] = None
 
 
 @app.post("/config/update")
@@ -288,15 +658,54 @@ async def update_config(req: ConfigUpdate, _: None = Depends(require_api_key)):
             changed["replace_min_interval_ms"] = v
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
+    if req.playout_window_ms is not None:
+        try:
+            v = int(req.playout_window_ms)
+            if v < 0:
+                raise ValueError("playout_window_ms must be >=0")
+            settings.playout_window_ms = v
+            changed["playout_window_ms"] = v
+            # running look-ahead sessions take the new size; 0 only affects new sessions
+            if v > 0:
+                for st in sessions.values():
+                    if st.playout is not None:
+                        st.playout.window_ms = v
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if req.playout_tick_ms is not None:
+        try:
+            v = int(req.playout_tick_ms)
+            if v < 10:
+                raise ValueError("playout_tick_ms must be >=10")
+            settings.playout_tick_ms = v
+            changed["playout_tick_ms"] = v
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    for name in ("stability_k", "stability_min_hold_ms", "stability_max_hold_ms"):
+        val = getattr(req, name)
+        if val is None:
+            continue
+        try:
+            v = int(val)
+            if v < 0:
+                raise ValueError(f"{name} must be >=0")
+            setattr(settings, name, v)
+            changed[name] = v
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
     return {"ok": True, "changed": changed}
 
 
 @app.get("/timeline/last")
 async def get_last_timeline(_: None = Depends(require_api_key)):
-    if not LAST_TIMELINE_PATH.exists():
-        return {"exists": False}
+    # newest snapshot from memory; the file copy is debounced
+    text = timeline_writer.last_text
     try:
-        return json.loads(LAST_TIMELINE_PATH.read_text(encoding="utf-8"))
+        if text is None:
+            if not LAST_TIMELINE_PATH.exists():
+                return {"exists": False}
+            text = await asyncio.to_thread(LAST_TIMELINE_PATH.read_text, encoding="utf-8")
+        return json.loads(text)
     except Exception:
         return {"exists": False}
 
@@ -315,6 +724,22 @@ async def events_recent(n: int = 100, session_id: Optional[str] = None, _: None
     return {"count": len(items), "items": items}
 
 
+@app.get("/events/range")
+async def events_range(
+    session_id: Optional[str] = None,
+    from_ts: int = Query(0, alias="from"),
+    to_ts: Optional[int] = Query(None, alias="to"),
+    limit: int = 1000,
+    _: None = Depends(require_api_key),
+):
+    # full payloads from the on-disk journal (ts in epoch ms, inclusive)
+    if journal is None:
+        raise HTTPException(status_code=404, detail="journal disabled")
+    limit = max(1, min(int(limit), 10000))
+    items = await asyncio.to_thread(journal.range, session_id, from_ts, to_ts, limit)
+    return {"count": len(items), "items": items}
+
+
 @app.get("/events/summary")
 async def events_summary(n: int = 100, session_id: Optional[str] = None, _: None = Depends(require_api_key)):
     try:
@@ -405,10 +830,7 @@ async def gloss2timeline(payload: GlossIn):
         jsonschema_validate(timeline, _TIMELINE_SCHEMA)
     return timeline
 
-<<<<<<< HEAD
 
-=======
->>>>>>> origin/master
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 TIMELINE_LOG = LOG_DIR / "timeline.log"
@@ -423,8 +845,24 @@ try:
 except Exception:
     RECENT_EVENTS = []
 
-
-def _log_timeline(evt_type: str, payload: Dict[str, Any]):
+# full timeline/replace payloads for audits (GET /events/range)
+journal = TimelineJournal(
+    Path(settings.journal_dir),
+    segment_max_bytes=settings.journal_segment_mb << 20,
+    segment_max_s=settings.journal_segment_s,
+    retention_s=settings.journal_retention_h * 3600,
+) if settings.journal_dir else None
+# file I/O for timeline.log / last_timeline.json / journal runs on a background thread
+timeline_writer = TimelineLogWriter(TIMELINE_LOG, LAST_TIMELINE_PATH, max_backlog=settings.log_queue_max, journal=journal,
+                                    on_drop=LOG_DROPPED.inc, journal_max_backlog=settings.journal_queue_max,
+                                    on_journal_drop=JOURNAL_DROPPED.inc)
+LOG_BACKLOG.set_function(lambda: timeline_writer.backlog)
+# optional capture of every StreamIn for scripts/replay_ingest.py
+recorder = IngestRecorder(Path(settings.ingest_record)) if settings.ingest_record else None
+
+
+def _log_timeline(evt_type: str, payload: Dict[str, Any], text: Optional[str] = None):
+    # text: payload already encoded for the broadcast; reused for last_timeline.json
     try:
         rec = {
             "ts": int(time.time() * 1000),
@@ -434,31 +872,57 @@ def _log_timeline(evt_type: str, payload: Dict[str, Any]):
             "from_t_ms": payload.get("from_t_ms"),
             "event_count": len(payload.get("data", {}).get("events", [])) if "data" in payload else len(payload.get("events", [])),
         }
-        with TIMELINE_LOG.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-        try:
-            LAST_TIMELINE_PATH.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-        except Exception:
-            pass
-        try:
-            item = {
-                "ts": rec["ts"],
-                "type": rec["type"],
-                "session_id": rec["session_id"],
-                "event_count": rec["event_count"],
-            }
-            if isinstance(RECENT_EVENTS, list):
-                RECENT_EVENTS.append(item)
-                if len(RECENT_EVENTS) > RECENT_EVENTS_MAX:
-                    del RECENT_EVENTS[0:len(RECENT_EVENTS)-RECENT_EVENTS_MAX]
-            else:
-                RECENT_EVENTS.append(item)
-        except Exception:
-            pass
+        timeline_writer.submit(rec, text if text is not None else wire.dumps(payload))
+        _remember_event(rec["ts"], rec["type"], rec["session_id"], rec["event_count"])
     except Exception as e:
         logger.debug(f"timeline log error: {e}")
 
 
+def _remember_event(ts: int, evt_type: str, session_id: Optional[str], event_count: int):
+    try:
+        item = {
+            "ts": ts,
+            "type": evt_type,
+            "session_id": session_id,
+            "event_count": event_count,
+        }
+        if isinstance(RECENT_EVENTS, list):
+            RECENT_EVENTS.append(item)
+            if len(RECENT_EVENTS) > RECENT_EVENTS_MAX:
+                del RECENT_EVENTS[0:len(RECENT_EVENTS)-RECENT_EVENTS_MAX]
+        else:
+            RECENT_EVENTS.append(item)
+    except Exception:
+        pass
+
+
+async def _on_bus_message(message: Dict[str, Any], local: bool, text: Optional[str] = None):
+    # every node delivers published timelines to its own websocket subscribers
+    delta_history.record(message)
+    await manager.broadcast_json(message, text)
+    if not local:
+        data = message.get("data") or {}
+        _remember_event(int(time.time() * 1000), message.get("type"), message.get("session_id"), len(data.get("events", [])))
+
+
+async def _on_forwarded_ingest(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # another node received ingest for a session this node owns
+    return await _process_stream_in(StreamIn(**payload))
+
+
+cluster.bind(_on_bus_message, _on_forwarded_ingest)
+
+
+async def _publish_timeline(out: Dict[str, Any]):
+    # encode once: the same text goes to every socket, the cluster bus and the log
+    with stage_timings.span("broadcast"):
+        text = wire.dumps(out)
+        await cluster.publish(out, text)
+    stats.on_timeline(out.get("session_id"))
+    with stage_timings.span("log"):
+        _log_timeline(out["type"], out, text)
+
+
 async def _stats_broadcaster():
     # broadcast stats periodically to all timeline subscribers
     while True:
@@ -472,15 +936,15 @@ async def _stats_broadcaster():
 @app.post("/ingest_text")
 async def ingest_text(payload: IngestText, _: None = Depends(require_api_key)):
     start = time.perf_counter()
+    lex = current_lexicon()
     tokens = tokenize_ko(payload.text)
-    glosses = ko_to_gloss(tokens)
+    glosses = ko_to_gloss(tokens, lex)
     timeline = compile_glosses(glosses, start_ms=payload.start_ms, gap_ms=payload.gap_ms, include_aux_channels=settings.include_aux_channels)
+    timeline["meta"]["lexicon_version"] = lex.version
     if payload.id:
         timeline["id"] = payload.id
     payload = {"type": "timeline", "data": timeline}
-    await manager.broadcast_json(payload)
-    stats.on_timeline()
-    _log_timeline("timeline", payload)
+    await _publish_timeline(payload)
     TIMELINE_BC.inc()
     REQ_LAT.labels("ingest_text").observe(time.perf_counter() - start)
     return {"ok": True, "timeline": timeline}
@@ -488,18 +952,85 @@ async def ingest_text(payload: IngestText, _: None = Depends(require_api_key)):
 
 @app.websocket("/ws/timeline")
 async def ws_timeline(ws: WebSocket):
-    await manager.connect(ws)
+    # 구독 필터: ?sessions=a,b&types=timeline,timeline.replace&channels=default,face (생략 시 전체), &format=binary
+    qp = ws.query_params
+    await manager.connect(ws, Subscription(_csv(qp.get("sessions")), _csv(qp.get("types")), _csv(qp.get("channels")), qp.get("format")))
     try:
         # 단순 keep-alive; 클라이언트는 수신만 해도 됨
         while True:
             # 클라이언트가 ping/pong 또는 noop 메시지 보낼 수 있음
-            _ = await ws.receive_text()
+            # 구독 변경: {"op":"subscribe","sessions":[...],"types":[...],"channels":[...],"format":"binary"}
+            raw = await ws.receive_text()
+            try:
+                msg = json.loads(raw)
+            except Exception:
+                continue
+            if not isinstance(msg, dict):
+                continue
+            op = msg.get("op")
+            if op == "subscribe":
+                sub = Subscription.from_dict(msg)
+                await manager.subscribe(ws, sub)
+                # through the client's queue, so it cannot interleave with the writer task
+                await manager.send_direct(ws, [{"type": "subscribed", "data": sub.to_dict()}])
+            elif op == "resync" and msg.get("session_id"):
+                # 누락 복구: {"op":"resync","session_id":..,"since":<마지막 적용 seq>}
+                since = _seq_param(msg.get("since"))
+                if since is None:
+                    await manager.send_direct(ws, [{"type": "error", "op": "resync", "session_id": str(msg["session_id"]), "error": "invalid since"}])
+                else:
+                    await manager.send_direct(ws, _resync_replies(str(msg["session_id"]), since))
+            elif op == "ack" and msg.get("session_id"):
+                seq = _seq_param(msg.get("seq"))
+                if seq is not None:  # a malformed ack is ignored
+                    manager.ack(ws, str(msg["session_id"]), seq)
     except WebSocketDisconnect:
         await manager.disconnect(ws)
     except Exception:
         await manager.disconnect(ws)
 
 
+def _seq_param(value: Any) -> Optional[int]:
+    """Client-supplied seq (missing = 0); None if it is not a non-negative integer."""
+    if value is None:
+        return 0
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        seq = int(value)
+    except ValueError:
+        return None
+    return seq if seq >= 0 else None
+
+
+def _resync_replies(sid: str, since: int) -> List[Dict[str, Any]]:
+    """Missing deltas after `since` from the history, else a snapshot (history, or the owner's state)."""
+    out = delta_history.since(sid, since)
+    if out is not None:
+        result = "current" if not out else ("snapshot" if out[0].get("resync") else "deltas")
+    else:
+        st = sessions.get(sid)
+        if st is not None and st.seq:
+            result = "snapshot"
+            # look-ahead / commit-tracked sessions: only what was sent so far
+            if st.playout is not None:
+                n = st.playout.sent_index(st.events)
+            elif st.stability is not None:
+                n = st.stability.pub_clean
+            else:
+                n = len(st.events)
+            out = [{"type": "timeline", "session_id": sid, "seq": st.seq, "resync": True,
+                    "data": {"id": st.base_id, "events": st.events.to_dicts(0, n)}}]
+        else:
+            result = "unavailable"
+            out = [{"type": "resync.unavailable", "session_id": sid}]
+    try:
+        WS_RESYNC.labels(result).inc()
+    except Exception:
+        pass
+    return out
+
+
 class StreamIn(BaseModel):
     type: str  # "partial" | "final"
     session_id: str
@@ -510,20 +1041,28 @@ class StreamIn(BaseModel):
 
 
 async def _process_stream_in(payload: StreamIn):
+    # session state lives on the owning node; forward if that is not us
+    owner = await cluster.owner_of(payload.session_id)
+    if owner != cluster.node_id:
+        return await cluster.forward(owner, payload.model_dump())
+    if recorder is not None:
+        recorder.record(payload.model_dump())
+    with stage_timings.span("total"):
+        return await _ingest_local(payload)
+
+
+async def _ingest_local(payload: StreamIn):
     INGEST_MSG.labels(payload.type).inc()
-    stats.on_ingest(payload.type)
+    stats.on_ingest(payload.type, payload.session_id)
     st = sessions.get(payload.session_id)
     if not st:
         st = SessionState()
         sessions[payload.session_id] = st
     now_ms = int(time.time() * 1000)
-    window_ms = 1000
-    st.recent_ms = [t for t in st.recent_ms if now_ms - t <= window_ms]
-    if len(st.recent_ms) >= max(1, settings.max_ingest_rps):
+    if not st.limiter.allow(now_ms, settings.max_ingest_rps, window_ms=1000):
         RATE_LIMITED.inc()
-        stats.on_rate_limited()
+        stats.on_rate_limited(payload.session_id)
         return {"ok": False, "rate_limited": True, "session_id": payload.session_id}
-    st.recent_ms.append(now_ms)
     if payload.start_ms is not None:
         st.start_ms = int(payload.start_ms)
     if payload.gap_ms is not None:
@@ -544,35 +1083,67 @@ async def _process_stream_in(payload: StreamIn):
     if payload.type == "partial" and _norm_partial(payload.text) == _norm_partial(st.last_text or ""):
         return {"ok": True, "session_id": payload.session_id, "is_final": False}
     st.text = payload.text
-    tokens = tokenize_ko(st.text)
-    glosses = ko_to_gloss(tokens)
-    new_timeline = compile_glosses(glosses, start_ms=st.start_ms, gap_ms=st.gap_ms, include_aux_channels=settings.include_aux_channels)
+    # CPU-bound compile+diff runs on the session's shard; only the changed window comes back
+    timed = stage_timings.enabled
+    async with st.lock:
+        t_submit = time.perf_counter()
+        max_d = settings.diff_max_edits if settings.replace_diff == "myers" else 0
+        res = await ingest_pool.submit(payload.session_id, compile_session, payload.session_id, st.text, st.start_ms, st.gap_ms, settings.include_aux_channels, not st.events, timed, max_d)
+        t_done = time.perf_counter()
+        n_before = len(st.events)
+        had_events = n_before > 0
+        apply_delta_arrays(st.events, res)
+    if timed and res.get("timings"):
+        tm = res["timings"]
+        for stage in ("tokenize", "gloss", "compile", "diff"):
+            stage_timings.observe(stage, tm[stage])
+        # executor hand-off + wait for the shard, excluding the work itself
+        stage_timings.observe("queue", max(0.0, (t_done - t_submit) * 1000.0 - tm["worker"]))
+        stage_timings.observe("apply", (time.perf_counter() - t_done) * 1000.0)
     if st.base_id is None:
-        st.base_id = new_timeline["id"]
+        st.base_id = res["id"]
     st.last_update_ms = now_ms
-
-    old_clips = [e["clip"] for e in st.events]
-    new_clips = [e["clip"] for e in new_timeline["events"]]
-    start_idx, end_idx = _diff_window(old_clips, new_clips)
-    if start_idx < len(new_timeline["events"]):
-        from_t = new_timeline["events"][start_idx]["t_ms"]
-    else:
-        from_t = new_timeline["events"][-1]["t_ms"] if new_timeline["events"] else 0
-
-    if not st.events:
-        out = {"type": "timeline", "session_id": payload.session_id, "data": new_timeline}
-        await manager.broadcast_json(out)
-        stats.on_timeline()
-        _log_timeline("timeline", out)
+    session_expiry.touch(payload.session_id, now_ms)
+
+    ev = st.events
+    start_idx, end_idx = res["start"], res["end"]
+
+    if st.playout is not None or (settings.playout_window_ms > 0 and not had_events):
+        # rolling look-ahead: the change only moves what is pending; the window decides what goes out
+        if not had_events:
+            st.playout = Playout(settings.playout_window_ms, ev.t_ms[0] if len(ev) else st.start_ms, now_ms)
+        elif res["events"] or res["n_events"] != n_before:
+            st.playout.changed(res["from_t_ms"])
+        playing.add(payload.session_id)
+        meta = {"id": res["id"], "created_ms": res["created_ms"], "lang": res["lang"], "meta": res["meta"]}
+        if await _playout_tick(payload.session_id, st, None if had_events else meta) and payload.origin_ts:
+            lat = max(0, int(time.time()*1000) - int(payload.origin_ts))
+            INGEST_TO_BC_MS.observe(lat)
+            stats.on_latency(lat, payload.session_id)
+    elif st.stability is not None or (settings.stability_k > 0 and not had_events):
+        # commit tracking: only the released (stable) prefix goes out; a final releases everything
+        if not had_events:
+            st.stability = StabilityTracker({"id": res["id"], "created_ms": res["created_ms"], "lang": res["lang"], "meta": res["meta"]})
+        st.stability.update(res["start"], len(ev), now_ms)
+        settling.add(payload.session_id)
+        if await _publish_stable(payload.session_id, st, payload.type == "final") and payload.origin_ts:
+            lat = max(0, int(time.time()*1000) - int(payload.origin_ts))
+            INGEST_TO_BC_MS.observe(lat)
+            stats.on_latency(lat, payload.session_id)
+    elif not had_events:
+        new_timeline = {"id": res["id"], "created_ms": res["created_ms"], "lang": res["lang"], "events": ev.to_dicts(), "meta": res["meta"]}
+        st.seq += 1
+        out = {"type": "timeline", "session_id": payload.session_id, "seq": st.seq, "data": new_timeline}
+        await _publish_timeline(out)
         if payload.origin_ts:
             lat = max(0, int(time.time()*1000) - int(payload.origin_ts))
             INGEST_TO_BC_MS.observe(lat)
-            stats.on_latency(lat)
+            stats.on_latency(lat, payload.session_id)
         TIMELINE_BC.inc()
     else:
         # replace window quality checks
         ev_delta = max(0, end_idx - start_idx)
-        win_ms = _slice_window_ms(new_timeline["events"], start_idx, end_idx)
+        win_ms = _slice_window_ms(ev, start_idx, end_idx)
         now_ms = int(time.time() * 1000)
         min_ev = getattr(settings, 'replace_min_events', 0) or 0
         min_ms = getattr(settings, 'replace_min_ms', 0) or 0
@@ -580,33 +1151,137 @@ async def _process_stream_in(payload: StreamIn):
         too_small = (ev_delta < min_ev) or (win_ms < min_ms)
         too_soon = (min_it > 0 and (now_ms - (st.last_replace_broadcast_ms or 0) < min_it))
         if not too_small and not too_soon and ev_delta > 0:
-            out = {"type": "timeline.replace", "session_id": payload.session_id, "from_t_ms": from_t, "data": {"id": st.base_id, "events": new_timeline["events"][start_idx:end_idx]}}
-            await manager.broadcast_json(out)
-            stats.on_timeline()
-            _log_timeline("timeline.replace", out)
+            if res.get("windows"):
+                # per-channel minimal windows (REPLACE_DIFF=myers, when smaller than resending the tail)
+                data = {"id": st.base_id, "windows": res["windows"]}
+            else:
+                data = {"id": st.base_id, "events": ev.to_dicts(res["replace_from"])}
+            st.seq += 1
+            out = {"type": "timeline.replace", "session_id": payload.session_id, "seq": st.seq, "base_seq": st.seq - 1,
+                   "from_t_ms": res["from_t_ms"], "data": data}
+            await _publish_timeline(out)
             if payload.origin_ts:
                 lat = max(0, int(time.time()*1000) - int(payload.origin_ts))
                 INGEST_TO_BC_MS.observe(lat)
-                stats.on_latency(lat)
+                stats.on_latency(lat, payload.session_id)
             TIMELINE_BC.inc()
-            stats.on_replace()
+            stats.on_replace(payload.session_id)
             st.last_replace_broadcast_ms = now_ms
-    st.events = new_timeline["events"]
     st.last_text = payload.text
     return {"ok": True, "session_id": payload.session_id, "is_final": payload.type == "final"}
 
 
+async def _playout_tick(sid: str, st: SessionState, first: Optional[Dict[str, Any]] = None) -> bool:
+    """Publish the slice of the session's look-ahead window that is due now; True if one went out."""
+    async with st.lock:
+        po = st.playout
+        due = po.due(st.events, int(time.time() * 1000)) if po is not None else None
+        if due is None:
+            return False
+        from_t, i0, i1, corrected = due
+        st.seq += 1
+        if first is not None:
+            out = {"type": "timeline", "session_id": sid, "seq": st.seq, "playhead_ms": po.playhead,
+                   "data": {**first, "events": st.events.to_dicts(i0, i1)}}
+        else:
+            out = {"type": "timeline.replace", "session_id": sid, "seq": st.seq, "base_seq": st.seq - 1,
+                   "from_t_ms": from_t, "playhead_ms": po.playhead,
+                   "data": {"id": st.base_id, "events": st.events.to_dicts(i0, i1)}}
+        await _publish_timeline(out)
+    TIMELINE_BC.inc()
+    if corrected:
+        stats.on_replace(sid)
+    return True
+
+
+async def _playout_loop():
+    # advances every look-ahead window; sessions leave `playing` once everything is sent
+    while True:
+        await asyncio.sleep(max(10, settings.playout_tick_ms) / 1000.0)
+        for sid in list(playing):
+            st = sessions.get(sid)
+            try:
+                if st is not None and st.playout is not None:
+                    await _playout_tick(sid, st)
+                    if st.playout.pending(st.events):
+                        continue
+            except Exception as e:
+                logger.warning(f"playout tick failed for {sid}: {e}")
+            playing.discard(sid)
+
+
+async def _publish_stable(sid: str, st: SessionState, final: bool = False) -> bool:
+    """Bring clients up to the session's released prefix; True if a message went out."""
+    async with st.lock:
+        tr, ev = st.stability, st.events
+        if tr is None:
+            return False
+        n = len(ev)
+        if not final:
+            now_ms = int(time.time() * 1000)
+            hold = tr.hold_ms(settings.stability_min_hold_ms, settings.stability_max_hold_ms)
+            # the same adaptive hold debounces sends: a flapping session batches its releases
+            if tr.pub_t is not None and now_ms - st.last_replace_broadcast_ms < hold:
+                return False
+            n = tr.stable(now_ms, settings.stability_k, hold)
+        due = tr.due(n, len(ev))
+        if due is None:
+            return False
+        i0, i1 = due
+        st.seq += 1
+        if tr.pub_t is None:
+            out = {"type": "timeline", "session_id": sid, "seq": st.seq, "data": {**tr.header, "events": ev.to_dicts(0, i1)}}
+        else:
+            # earliest t_ms clients must drop: the first corrected published event or the first new one
+            firsts = [x[i0] for x in (tr.pub_t, ev.t_ms) if i0 < len(x)]
+            from_t = min(firsts)
+            r = i0
+            while r > 0 and ev.t_ms[r - 1] >= from_t:
+                r -= 1
+            out = {"type": "timeline.replace", "session_id": sid, "seq": st.seq, "base_seq": st.seq - 1,
+                   "from_t_ms": from_t, "data": {"id": st.base_id, "events": ev.to_dicts(r, i1)}}
+        tr.published(ev.t_ms, i1)
+        await _publish_timeline(out)
+    TIMELINE_BC.inc()
+    if out["type"] == "timeline.replace":
+        stats.on_replace(sid)
+        st.last_replace_broadcast_ms = int(time.time() * 1000)
+    return True
+
+
+async def _stability_loop():
+    # releases tails that held for their hold time without a new partial arriving
+    while True:
+        await asyncio.sleep(max(10, settings.stability_min_hold_ms // 2) / 1000.0)
+        for sid in list(settling):
+            st = sessions.get(sid)
+            try:
+                if st is not None and st.stability is not None:
+                    await _publish_stable(sid, st)
+                    if st.stability.pending(len(st.events)):
+                        continue
+            except Exception as e:
+                logger.warning(f"stability tick failed for {sid}: {e}")
+            settling.discard(sid)
+
+
 # Optional Whisper streaming transcriber (very simple, best-effort)
 class _WhisperStreamer:
     def __init__(self, model_name: str = "base", device: str = "cpu", compute: str = "int8", beam_size: int = 1):
+        self.beam_size = beam_size
+        self._tokenizer = None
+        self._batch_failed = False
         try:
             from faster_whisper import WhisperModel  # type: ignore
             self.model = WhisperModel(model_name, device=device, compute_type=compute)
-            self.beam_size = beam_size
         except Exception:
             self.model = None
 
-    def transcribe_pcm16le(self, pcm_bytes: bytes, sample_rate: int = 16000) -> str:
+    def transcribe(self, pcm_bytes: bytes, sample_rate: int = 16000, beam_size: Optional[int] = None) -> str:
+        # StreamingASR model interface (called on the pool's inference threads)
+        return self.transcribe_pcm16le(pcm_bytes, sample_rate, beam_size)
+
+    def transcribe_pcm16le(self, pcm_bytes: bytes, sample_rate: int = 16000, beam_size: Optional[int] = None) -> str:
         if not self.model or not pcm_bytes:
             return ""
         try:
@@ -617,51 +1292,91 @@ class _WhisperStreamer:
                 language="ko",
                 vad_filter=True,
                 vad_parameters={"min_silence_duration_ms": 200},
-                beam_size=self.beam_size or 1,
+                beam_size=beam_size or self.beam_size or 1,
             )
             return " ".join([s.text.strip() for s in segments]).strip()
         except Exception:
             return ""
 
+    def transcribe_batch(self, pcms: List[bytes], sample_rate: int = 16000, beam_size: Optional[int] = None) -> List[str]:
+        """
+        Cross-session batch (ASR_BATCH_MAX > 1): all windows go through one encoder pass and one
+        CTranslate2 generate call on stacked 30 s log-mel features. There is no VAD filter here;
+        StreamingASR does not send windows that start in silence, and windows Whisper scores as
+        no-speech come back empty.
+        """
+        if not self.model or not pcms:
+            return [""] * len(pcms)
+        if not self._batch_failed:
+            try:
+                return self._generate_batch(pcms, beam_size or self.beam_size or 1)
+            except Exception as e:
+                # e.g. a faster-whisper version with other internals: per-window calls from now on
+                self._batch_failed = True
+                logger.warning(f"batched whisper inference unavailable, transcribing windows one by one: {e}")
+        return [self.transcribe_pcm16le(b, sample_rate, beam_size) for b in pcms]
+
+    def _generate_batch(self, pcms: List[bytes], beam_size: int) -> List[str]:
+        import numpy as np  # type: ignore
+        import ctranslate2  # type: ignore
+        from faster_whisper.tokenizer import Tokenizer  # type: ignore
+
+        wm = self.model
+        fe = wm.feature_extractor
+        feats = []
+        for b in pcms:
+            audio = np.frombuffer(b, dtype=np.int16).astype(np.float32) / 32768.0
+            audio = np.pad(audio[:fe.n_samples], (0, max(0, fe.n_samples - len(audio))))  # pad/trim to 30 s
+            feats.append(fe(audio)[:, :fe.nb_max_frames])
+        if self._tokenizer is None:
+            self._tokenizer = Tokenizer(wm.hf_tokenizer, wm.model.is_multilingual, task="transcribe", language="ko")
+        tok = self._tokenizer
+        encoded = wm.model.encode(ctranslate2.StorageView.from_array(np.ascontiguousarray(np.stack(feats), dtype=np.float32)))
+        prompt = list(tok.sot_sequence) + [tok.no_timestamps]
+        results = wm.model.generate(encoded, [prompt] * len(pcms), beam_size=beam_size, max_length=wm.max_length,
+                                    suppress_blank=True, suppress_tokens=[-1], return_no_speech_prob=True)
+        out = []
+        for r in results:
+            if getattr(r, "no_speech_prob", 0.0) > 0.6:
+                out.append("")
+            else:
+                out.append(tok.decode([t for t in r.sequences_ids[0] if t < tok.eot]).strip())
+        return out
 
-def _first_diff_index(a: List[str], b: List[str]) -> int:
-    n = min(len(a), len(b))
-    for i in range(n):
-        if a[i] != b[i]:
-            return i
-    return n
 
+def _load_asr_model(key: ModelKey):
+    # pool loader (runs in a thread): one model per (model, device, compute)
+    model, device, compute = key
+    if model == "fake":
+        return FakeASRModel()
+    return _WhisperStreamer(model_name=model, device=device, compute=compute)
 
-def _diff_window(old: List[str], new: List[str]) -> Tuple[int, int]:
-    """
-    returns (start_index_in_new, end_index_in_new_exclusive) to replace
-    calculates common prefix and suffix to minimize replacement window
-    """
-    # common prefix
-    p = 0
-    nmin = min(len(old), len(new))
-    while p < nmin and old[p] == new[p]:
-        p += 1
-    # common suffix (avoid overlap with prefix)
-    s = 0
-    while s < (len(old) - p) and s < (len(new) - p) and old[len(old) - 1 - s] == new[len(new) - 1 - s]:
-        s += 1
-    start = p
-    end = len(new) - s
-    if end < start:
-        end = start
-    return start, end
-
-
-def _slice_window_ms(evts: List[Dict[str, Any]], start_idx: int, end_idx_ex: int) -> int:
+
+asr_pool = ModelPool(_load_asr_model, concurrency=settings.asr_workers, queue_max=settings.asr_queue_max, idle_s=settings.asr_model_idle_s,
+                     batch_max=settings.asr_batch_max, batch_deadline_ms=settings.asr_batch_deadline_ms)
+
+
+async def _asr_pool_loop():
+    # evict models no connection has used for ASR_MODEL_IDLE_S
+    while True:
+        await asyncio.sleep(max(1.0, min(30.0, asr_pool.idle_s / 2)))
+        for key in asr_pool.evict_idle():
+            logger.info(f"evicted idle ASR model {':'.join(key)}")
+
+
+async def _warm_asr_models(keys):
     try:
-        if end_idx_ex <= start_idx or start_idx < 0 or end_idx_ex > len(evts):
-            return 0
-        first = evts[start_idx]
-        last = evts[end_idx_ex-1]
-        return int((last.get("t_ms", 0) + last.get("dur_ms", 0)) - first.get("t_ms", 0))
-    except Exception:
+        await asr_pool.warm(keys)
+        logger.info(f"warmed ASR models: {', '.join(':'.join(k) for k in keys)}")
+    except Exception as e:
+        logger.warning(f"ASR model warmup failed: {e}")
+
+
+def _slice_window_ms(evts: EventArrays, start_idx: int, end_idx_ex: int) -> int:
+    if end_idx_ex <= start_idx or start_idx < 0 or end_idx_ex > len(evts):
         return 0
+    last = end_idx_ex - 1
+    return int(evts.t_ms[last] + evts.dur_ms[last] - evts.t_ms[start_idx])
 
 
 @app.websocket("/ws/ingest")
@@ -696,112 +1411,30 @@ async def ws_ingest(ws: WebSocket):
             pass
 
 
-@app.websocket("/ws/ingest")
-async def ws_ingest(ws: WebSocket):
-    # optional API key via query param 'key'
-    key = ws.query_params.get("key")
-    if settings.api_key and key != settings.api_key:
-        await ws.close(code=4401)
-        return
-    await ws.accept()
-    try:
-        while True:
-            start = time.perf_counter()
-            msg = await ws.receive_json()
-            start = time.perf_counter()
-            payload = StreamIn(**msg)
-            INGEST_MSG.labels(payload.type).inc()
-            stats.on_ingest(payload.type)
-            st = sessions.get(payload.session_id)
-            if not st:
-                st = SessionState()
-                sessions[payload.session_id] = st
-            # rate limiting per session
-            now_ms = int(time.time() * 1000)
-            window_ms = 1000
-            st.recent_ms = [t for t in st.recent_ms if now_ms - t <= window_ms]
-            if len(st.recent_ms) >= max(1, settings.max_ingest_rps):
-                RATE_LIMITED.inc()
-                await ws.send_json({"ok": False, "rate_limited": True, "session_id": payload.session_id})
-                continue
-            st.recent_ms.append(now_ms)
-            if payload.start_ms is not None:
-                st.start_ms = int(payload.start_ms)
-            if payload.gap_ms is not None:
-                st.gap_ms = int(payload.gap_ms)
-
-            # 전체 텍스트 기준으로 단순 증분 처리
-            st.text = payload.text
-            tokens = tokenize_ko(st.text)
-            glosses = ko_to_gloss(tokens)
-            new_timeline = compile_glosses(glosses, start_ms=st.start_ms, gap_ms=st.gap_ms, include_aux_channels=settings.include_aux_channels)
-            if st.base_id is None:
-                st.base_id = new_timeline["id"]
-            st.last_update_ms = int(time.time() * 1000)
-
-            old_clips = [e["clip"] for e in st.events]
-            new_clips = [e["clip"] for e in new_timeline["events"]]
-            start_idx, end_idx = _diff_window(old_clips, new_clips)
-
-            # 교체 시작 시간 산정
-            if start_idx < len(new_timeline["events"]):
-                from_t = new_timeline["events"][start_idx]["t_ms"]
-            else:
-                from_t = new_timeline["events"][-1]["t_ms"] if new_timeline["events"] else 0
-
-            # 메시지 전송: 최초에는 full timeline, 이후에는 replace
-            if not st.events:
-                out = {
-                    "type": "timeline",
-                    "session_id": payload.session_id,
-                    "data": new_timeline,
-                }
-                await manager.broadcast_json(out)
-                stats.on_timeline()
-                _log_timeline("timeline", out)
-                if payload.origin_ts:
-                    lat = max(0, int(time.time()*1000) - int(payload.origin_ts))
-                    INGEST_TO_BC_MS.observe(lat)
-                    stats.on_latency(lat)
-                TIMELINE_BC.inc()
-            else:
-                out = {
-                    "type": "timeline.replace",
-                    "session_id": payload.session_id,
-                    "from_t_ms": from_t,
-                    "data": {
-                        "id": st.base_id,
-                        "events": new_timeline["events"][start_idx:end_idx],
-                    },
-                }
-                await manager.broadcast_json(out)
-                stats.on_timeline()
-                _log_timeline("timeline.replace", out)
-                if payload.origin_ts:
-                    lat = max(0, int(time.time()*1000) - int(payload.origin_ts))
-                    INGEST_TO_BC_MS.observe(lat)
-                    stats.on_latency(lat)
-                TIMELINE_BC.inc()
-                stats.on_replace()
-
-            st.events = new_timeline["events"]
-
-            # 요청자에게도 ack
-            proc_ms = int((time.perf_counter() - start) * 1000)
-            await ws.send_json({"ok": True, "session_id": payload.session_id, "is_final": payload.type == "final", "proc_ms": proc_ms})
-    except WebSocketDisconnect:
-        pass
-    except Exception:
-        try:
-            await ws.close()
-        except Exception:
-            pass
-
-
 @app.on_event("startup")
 async def _on_startup():
+    try:
+        wire.set_backend(settings.json_backend)
+    except ValueError as e:
+        logger.warning(f"{e}; using {wire.backend()}")
+    # timeline.log / last_timeline.json / journal writer thread
+    timeline_writer.start()
+    # join the cluster bus (no-op for the in-memory backend)
+    try:
+        await cluster.start()
+        logger.info(f"cluster backend={cluster.name} node={cluster.node_id}")
+    except Exception as e:
+        logger.warning(f"Cluster start failed, running standalone: {e}")
     # start stats broadcaster
     asyncio.create_task(_stats_broadcaster())
+    # rolling look-ahead windows (idle unless PLAYOUT_WINDOW_MS > 0)
+    asyncio.create_task(_playout_loop())
+    # time-based release of held partial tails (idle unless STABILITY_K > 0)
+    asyncio.create_task(_stability_loop())
+    # shared ASR models: idle eviction, optional warmup in the background
+    asyncio.create_task(_asr_pool_loop())
+    if settings.asr_warm_models:
+        asyncio.create_task(_warm_asr_models(parse_keys(settings.asr_warm_models)))
     # optional overlay lexicon load from file
     try:
         lp = getattr(settings, 'lexicon_path', None)
@@ -821,13 +1454,21 @@ async def list_sessions(_: None = Depends(require_api_key)):
         out.append({
             "session_id": sid,
             "text_len": len(st.text or ""),
-            "events": len(st.events or []),
+            "events": len(st.events),
             "start_ms": st.start_ms,
             "gap_ms": st.gap_ms,
         })
     return {"count": len(out), "items": out}
 
 
+@app.get("/sessions/timeline")
+async def session_timeline(session_id: str, _: None = Depends(require_api_key)):
+    st = sessions.get(session_id)
+    if st is None:
+        raise HTTPException(status_code=404, detail="unknown session")
+    return {"session_id": session_id, "text": st.text, "events": st.events.to_dicts()}
+
+
 class ResetReq(BaseModel):
     session_id: Optional[str] = None
 
@@ -835,11 +1476,12 @@ class ResetReq(BaseModel):
 @app.post("/sessions/reset")
 async def reset_sessions(req: ResetReq, _: None = Depends(require_api_key)):
     if req.session_id:
-        sessions.pop(req.session_id, None)
+        await _forget_session(req.session_id)
         return {"ok": True, "cleared": [req.session_id]}
     else:
         cleared = list(sessions.keys())
-        sessions.clear()
+        for sid in cleared:
+            await _forget_session(sid)
         return {"ok": True, "cleared": cleared}
 class LexiconUpdate(BaseModel):
     items: Dict[str, str]
@@ -847,16 +1489,21 @@ class LexiconUpdate(BaseModel):
 
 @app.post("/lexicon/update")
 async def lexicon_update(payload: LexiconUpdate, _: None = Depends(require_api_key)):
-    set_overlay_lexicon(payload.items)
-    _audit_lexicon({"action": "update", "size": len(payload.items)})
-    return {"ok": True, "size": len(payload.items)}
+    snap = await _publish_overlay(payload.items)
+    _audit_lexicon({"action": "update", "size": len(payload.items), "version": snap.version})
+    return {"ok": True, "size": len(payload.items), "version": snap.version}
+
+
+async def _publish_overlay(items: Dict[str, str]):
+    # 대형 사전의 색인 생성은 이벤트 루프 밖(스레드)에서; 완료 시 스냅샷 참조만 교체
+    return await asyncio.to_thread(set_overlay_lexicon, items)
 
 
 @app.get("/lexicon")
 async def lexicon_get(_: None = Depends(require_api_key)):
     # 보안을 위해 오버레이 크기만 공개, 상세는 관리 용도로 반환
-    from packages.ksl_rules.rules import _OVERLAY  # type: ignore
-    return {"size": len(_OVERLAY), "items": _OVERLAY}
+    snap = current_lexicon()
+    return {"size": len(snap.overlay), "version": snap.version, "items": dict(snap.overlay)}
 
 
 @app.middleware("http")
@@ -865,23 +1512,47 @@ async def log_requests(request, call_next):
     response = await call_next(request)
     dur = (time.perf_counter() - start) * 1000.0
     try:
-<<<<<<< HEAD
         logger.info(f"{request.method} {request.url.path} {int(dur)}ms status={getattr(response,'status_code',0)}")
     except Exception:
         pass
     return response
-=======
-        response = await call_next(request)
-        return response
-    finally:
-        dur = (time.perf_counter() - start) * 1000.0
-        logger.info(f"{request.method} {request.url.path} {int(dur)}ms status={getattr(response,'status_code',0)}")
->>>>>>> origin/master
 
 # Lightweight runtime stats (for dashboard)
+_WINDOWS = (("1m", 60), ("5m", 300), ("15m", 900))
+_LAT_BUCKETS = [100, 200, 300, 400, 600, 800, 1000, 1500, 2000, 3000]
+
+
+class _SessionStats:
+    """Per-session rolling view: 5 min of 30 s slots, coarser sketch (2%) to keep it small."""
+
+    __slots__ = ("ingest", "timeline", "replaces", "rate_limited", "lat")
+
+    def __init__(self):
+        self.ingest = RollingCounter(30, 10)
+        self.timeline = RollingCounter(30, 10)
+        self.replaces = RollingCounter(30, 10)
+        self.rate_limited = RollingCounter(30, 10)
+        self.lat = RollingSketch(30, 10, alpha=0.02)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        tl = self.timeline.total(300, now)
+        p50, p90, p99 = self.lat.window(300, now).quantiles([0.5, 0.9, 0.99])
+        return {
+            "ingest_rate_per_sec_5m": round(self.ingest.rate(300, now), 3),
+            "timeline_rate_per_sec_5m": round(tl / 300.0, 3),
+            "replace_ratio_5m": round(self.replaces.total(300, now) / tl, 3) if tl else 0,
+            "rate_limited_5m": self.rate_limited.total(300, now),
+            "latency_ms_5m": {"p50": _r(p50), "p90": _r(p90), "p99": _r(p99)},
+        }
+
+
+def _r(v: Optional[float]) -> Optional[float]:
+    return round(v, 1) if v is not None else None
+
+
 class Stats:
     def __init__(self):
-        from collections import deque
+        from collections import deque, OrderedDict
         from services.config import get_settings as _gs
         _st = _gs()
         self.timeline_total = 0
@@ -889,73 +1560,107 @@ class Stats:
         self.rate_limited_total = 0
         self.ingest_partial = 0
         self.ingest_final = 0
-        self._timeline_ts = deque(maxlen=5000)
-        self._ingest_ts = deque(maxlen=5000)
+        # O(1) per observation, bounded memory: 15 min of 10 s slots
+        self._timeline_rate = RollingCounter()
+        self._ingest_rate = RollingCounter()
         self.last_ingest_to_bc_ms: int | None = None
-        self._lat_ms = deque(maxlen=5000)
+        self._lat = RollingSketch()
+        self._lat_recent = deque(maxlen=30)
+        # per-session breakdown (LRU-capped)
+        self._sessions: "OrderedDict[str, _SessionStats]" = OrderedDict()
+        self._sessions_max = max(1, int(getattr(_st, 'stats_sessions_max', 1000) or 1000))
         # Alerts history and last state
         self._alerts = deque(maxlen=max(1, int(getattr(_st, 'alerts_max_items', 500) or 500)))
         self._warn_last = {"latency_p90": False, "replace_ratio": False, "rate_limit_ratio": False}
 
-    def on_timeline(self):
-        from time import time as now
+    def _sess(self, session_id: Optional[str]) -> Optional[_SessionStats]:
+        if session_id is None:
+            return None
+        ss = self._sessions.get(session_id)
+        if ss is None:
+            ss = self._sessions[session_id] = _SessionStats()
+            if len(self._sessions) > self._sessions_max:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return ss
+
+    def drop_session(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def on_timeline(self, session_id: Optional[str] = None):
         self.timeline_total += 1
-        self._timeline_ts.append(int(now() * 1000))
+        self._timeline_rate.add()
+        ss = self._sess(session_id)
+        if ss is not None:
+            ss.timeline.add()
 
-    def on_ingest(self, mtype: str):
-        from time import time as now
+    def on_ingest(self, mtype: str, session_id: Optional[str] = None):
         if mtype == "partial":
             self.ingest_partial += 1
         elif mtype == "final":
             self.ingest_final += 1
-        self._ingest_ts.append(int(now() * 1000))
+        self._ingest_rate.add()
+        ss = self._sess(session_id)
+        if ss is not None:
+            ss.ingest.add()
 
-    def on_replace(self):
+    def on_replace(self, session_id: Optional[str] = None):
         self.replace_total += 1
+        ss = self._sess(session_id)
+        if ss is not None:
+            ss.replaces.add()
 
-    def on_rate_limited(self):
+    def on_rate_limited(self, session_id: Optional[str] = None):
         self.rate_limited_total += 1
+        ss = self._sess(session_id)
+        if ss is not None:
+            ss.rate_limited.add()
 
-    def on_latency(self, ms: int):
+    def on_latency(self, ms: int, session_id: Optional[str] = None):
         try:
             self.last_ingest_to_bc_ms = int(ms)
-            self._lat_ms.append(int(ms))
+            self._lat.add(float(ms))
+            self._lat_recent.append(int(ms))
+            ss = self._sess(session_id)
+            if ss is not None:
+                ss.lat.add(float(ms))
         except Exception:
             pass
 
+    def sessions_snapshot(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        now = time.time()
+        if session_id is not None:
+            ss = self._sessions.get(session_id)
+            return {session_id: ss.snapshot(now)} if ss is not None else {}
+        return {sid: ss.snapshot(now) for sid, ss in self._sessions.items()}
+
     def snapshot(self) -> Dict[str, Any]:
-        import time as _t
-        now = int(_t.time() * 1000)
-        window_ms = 60_000
-        timeline_rate = len([t for t in self._timeline_ts if now - t <= window_ms]) / 60.0
-        ingest_rate = len([t for t in self._ingest_ts if now - t <= window_ms]) / 60.0
-        # latency percentiles/histogram (simple bins)
-        lats = list(self._lat_ms)
-        p50 = p90 = p99 = None
+        now = time.time()
+        rates = {
+            name: {w: round(c.rate(sec, now), 3) for w, sec in _WINDOWS}
+            for name, c in (("timeline", self._timeline_rate), ("ingest", self._ingest_rate))
+        }
+        timeline_rate = rates["timeline"]["1m"]
+        ingest_rate = rates["ingest"]["1m"]
+        # latency percentiles per window from merged sketches; headline numbers use 5m
+        lat_windows = {}
+        for w, sec in _WINDOWS:
+            sk = self._lat.window(sec, now)
+            q50, q90, q99 = sk.quantiles([0.5, 0.9, 0.99])
+            lat_windows[w] = {"p50": _r(q50), "p90": _r(q90), "p99": _r(q99), "count": sk.count}
+            if w == "5m":
+                lat5 = sk
+        p50, p90, p99 = (lat_windows["5m"][k] for k in ("p50", "p90", "p99"))
         hist = None
-        recent = []
-        if lats:
-            sl = sorted(lats)
-            def pct(p):
-                import math
-                if not sl:
-                    return None
-                k = min(len(sl)-1, max(0, int(math.ceil(p/100.0*len(sl))-1)))
-                return sl[k]
-            p50 = pct(50)
-            p90 = pct(90)
-            p99 = pct(99)
+        if lat5.count:
             # fixed buckets in ms
-            buckets = [100,200,300,400,600,800,1000,1500,2000,3000]
-            counts = [0]*(len(buckets)+1)
-            for v in lats:
-                idx = 0
-                while idx < len(buckets) and v > buckets[idx]:
-                    idx += 1
-                counts[idx] += 1
-            hist = {"buckets": buckets, "counts": counts}
-            # tail (last 30)
-            recent = lats[-30:]
+            counts = [0] * (len(_LAT_BUCKETS) + 1)
+            for v, c in lat5.items():
+                counts[bisect.bisect_left(_LAT_BUCKETS, v)] += c
+            hist = {"buckets": _LAT_BUCKETS, "counts": counts}
+        # tail (last 30)
+        recent = list(self._lat_recent)
         out = {
             "timeline_broadcast_total": self.timeline_total,
             "timeline_rate_per_sec_1m": round(timeline_rate, 3),
@@ -967,8 +1672,16 @@ class Stats:
             "ingest_rate_per_sec_1m": round(ingest_rate, 3),
             "last_ingest_to_bc_ms": self.last_ingest_to_bc_ms,
             "latency_ms": {"p50": p50, "p90": p90, "p99": p99, "hist": hist, "recent": recent},
+            "latency_windows_ms": lat_windows,
+            "rates_per_sec": rates,
             "session_count": len(sessions),
             "ws_clients": len(manager.active) if hasattr(manager, 'active') else None,
+            "ws_topics": manager.topic_snapshot(),
+            "ws_queues": manager.queue_snapshot(),
+            "timeline_log": timeline_writer.snapshot(),
+            "journal": journal.snapshot() if journal is not None else None,
+            "stages_ms": stage_timings.snapshot(),
+            "asr_models": asr_pool.snapshot(),
             "rate_limit_ratio": (round(self.rate_limited_total / (self.ingest_partial + self.ingest_final), 3) if (self.ingest_partial + self.ingest_final) else 0),
         }
         # compute warn flags using current settings
@@ -1007,25 +1720,37 @@ stats = Stats()
 PURGED_SESS = Counter("sessions_purged_total", "Number of sessions purged due to TTL")
 
 
+async def _forget_session(sid: str):
+    # 세션 종료 훅: 세션 상태, 샤드의 증분 컴파일러(NLP 캐시), 클러스터 소유권, 구독 토픽, 세션 통계 해제
+    sessions.pop(sid, None)
+    session_expiry.discard(sid)
+    delta_history.drop(sid)
+    playing.discard(sid)
+    settling.discard(sid)
+    await ingest_pool.submit(sid, drop_session, sid)
+    await cluster.release(sid)
+    manager.drop_topic(sid)
+    stats.drop_session(sid)
+
+
 async def _session_purger():
+    # sleeps until the earliest idle deadline (re-checked at least every second so a TTL
+    # change via config applies promptly) and expires only the sessions that are due
     while True:
         try:
             ttl_ms = max(10, int(settings.session_ttl_s)) * 1000
             now = int(time.time() * 1000)
-            to_del = []
-            for sid, st in list(sessions.items()):
-                last = getattr(st, 'last_update_ms', 0) or 0
-                if last and now - last > ttl_ms:
-                    to_del.append(sid)
-            for sid in to_del:
-                sessions.pop(sid, None)
+            for sid in session_expiry.pop_expired(now, ttl_ms):
+                await _forget_session(sid)
                 try:
                     PURGED_SESS.inc()
                 except Exception:
                     pass
+            due = session_expiry.next_due(ttl_ms)
+            delay = 1.0 if due is None else min(1.0, max(0.0, (due - int(time.time() * 1000) + 1) / 1000.0))
         except Exception:
-            pass
-        await asyncio.sleep(15)
+            delay = 1.0
+        await asyncio.sleep(delay)
 
 
 @app.on_event("startup")
@@ -1033,6 +1758,16 @@ async def _start_session_purger():
     asyncio.create_task(_session_purger())
 
 
+@app.on_event("shutdown")
+async def _stop_background_workers():
+    ingest_pool.shutdown()
+    asr_pool.close()
+    await cluster.stop()
+    await asyncio.to_thread(timeline_writer.close)
+    if recorder is not None:
+        await asyncio.to_thread(recorder.close)
+
+
 @app.get("/sessions_full")
 async def sessions_full(_: None = Depends(require_api_key)):
     items = []
@@ -1057,11 +1792,11 @@ async def sessions_full(_: None = Depends(require_api_key)):
         items.append({
             "session_id": sid,
             "text_len": len(st.text or ""),
-            "events": len(st.events or []),
+            "events": len(st.events),
             "start_ms": st.start_ms,
             "gap_ms": st.gap_ms,
             "last_update_ms": getattr(st, 'last_update_ms', 0),
-            "meta": getattr(st, 'meta', {}),
+            "meta": st.meta,
             "last_text_preview": preview,
             "replace_ratio_recent": rep_ratio,
         })
@@ -1074,9 +1809,9 @@ async def lexicon_upload(file: UploadFile = File(...), _: None = Depends(require
         obj = json.loads(data)
         if not isinstance(obj, dict):
             raise ValueError("uploaded JSON must be an object {ko: GLOSS}")
-        set_overlay_lexicon(obj)
-        _audit_lexicon({"action": "upload", "size": len(obj)})
-        return {"ok": True, "size": len(obj)}
+        snap = await _publish_overlay(obj)
+        _audit_lexicon({"action": "upload", "size": len(obj), "version": snap.version})
+        return {"ok": True, "size": len(obj), "version": snap.version}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -1087,11 +1822,11 @@ class LexiconSnapshotReq(BaseModel):
 
 @app.post("/lexicon/snapshot")
 async def lexicon_snapshot(req: LexiconSnapshotReq, _: None = Depends(require_api_key)):
-    from packages.ksl_rules.rules import _OVERLAY  # type: ignore
+    snap = current_lexicon()
     ts = int(time.time()*1000)
     name = f"overlay-{ts}.json"
     path = VERS_DIR / name
-    data = {"_meta": {"ts": ts, "note": req.note or ""}, "items": _OVERLAY}
+    data = {"_meta": {"ts": ts, "note": req.note or "", "lexicon_version": snap.version}, "items": dict(snap.overlay)}
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
     _audit_lexicon({"action": "snapshot", "name": name, "note": req.note or ""}, ts)
     return {"ok": True, "name": name}
@@ -1126,9 +1861,9 @@ async def lexicon_rollback(req: LexiconRollbackReq, _: None = Depends(require_ap
             items = obj if isinstance(obj, dict) else None
         if not isinstance(items, dict):
             raise ValueError("invalid snapshot format")
-        set_overlay_lexicon(items)
-        _audit_lexicon({"action": "rollback", "name": req.name, "size": len(items)})
-        return {"ok": True, "name": req.name, "size": len(items)}
+        snap = await _publish_overlay(items)
+        _audit_lexicon({"action": "rollback", "name": req.name, "size": len(items), "version": snap.version})
+        return {"ok": True, "name": req.name, "size": len(items), "version": snap.version}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -1174,8 +1909,17 @@ async def ws_asr(ws: WebSocket):
         await ws.close(code=4401)
         return
     await ws.accept()
+    session_id = None
+    asr: Optional[StreamingASR] = None
+    pooled = None
+
+    async def emit(out, reply: bool = True):
+        kind, text = out
+        res = await _process_stream_in(StreamIn(type=kind, session_id=session_id, text=text, origin_ts=int(time.time() * 1000)))
+        if reply:
+            await ws.send_json({**res, "asr": kind, "text": text})
+
     try:
-        session_id = None
         # parse optional params
         model = ws.query_params.get("model") or "base"
         device = ws.query_params.get("device") or "cpu"
@@ -1185,26 +1929,39 @@ async def ws_asr(ws: WebSocket):
         except Exception:
             beam_size = 1
         try:
-            chunk_ms = int(ws.query_params.get("chunk_ms") or 400)
+            # chunk_ms: transcription window; hop_ms: new audio between windows (overlap = chunk - hop)
+            chunk_ms = int(ws.query_params.get("chunk_ms") or settings.asr_window_ms)
+            hop_ms = int(ws.query_params.get("hop_ms") or settings.asr_hop_ms)
         except Exception:
-            chunk_ms = 400
-        streamer = _WhisperStreamer(model_name=model, device=device, compute=compute, beam_size=beam_size)
-        ring = bytearray()
-        chunk_bytes = int(16000 * 2 * (chunk_ms/1000.0))
+            chunk_ms, hop_ms = settings.asr_window_ms, settings.asr_hop_ms
+        # shared per (model, device, compute): loaded once, then only a refcount per connection
+        pooled = await asr_pool.acquire((model, device, compute))
+        asr = StreamingASR(pooled, window_ms=chunk_ms, hop_ms=hop_ms, silence_windows=settings.asr_silence_windows,
+                           options=({} if model == "fake" else {"beam_size": beam_size}),
+                           on_infer=lambda ms: stage_timings.observe("asr", ms))
         while True:
             msg = await ws.receive()
+            if msg.get("type") == "websocket.disconnect":
+                break
             if msg.get("type") != "websocket.receive":
                 continue
             if msg.get("text") is not None:
-                # Init or direct text bridge
+                # Init or direct text bridge; {"op":"flush"} ends the current utterance
                 try:
                     data = json.loads(msg["text"])
+                    if isinstance(data, dict) and data.get("op") == "flush":
+                        out = await asr.flush() if session_id else None
+                        if out:
+                            await emit(out)
+                        else:
+                            await ws.send_json({"ok": True, "session_id": session_id, "flushed": False})
+                        continue
                     payload = StreamIn(**data)
                     if not session_id:
                         session_id = payload.session_id
                         # store ASR meta on session
                         st = sessions.get(session_id) or SessionState()
-                        st.meta.update({"model": model, "device": device, "compute": compute, "beam_size": beam_size, "chunk_ms": chunk_ms})
+                        st.meta.update({"model": model, "device": device, "compute": compute, "beam_size": beam_size, "chunk_ms": chunk_ms, "hop_ms": hop_ms})
                         sessions[session_id] = st
                     res = await _process_stream_in(payload)
                     await ws.send_json(res)
@@ -1215,15 +1972,14 @@ async def ws_asr(ws: WebSocket):
                 if not b:
                     await ws.send_json({"ok": True, "bytes": 0})
                     continue
-                ring.extend(b)
+                asr.feed(b)
                 await ws.send_json({"ok": True, "bytes": len(b)})
-                if len(ring) >= chunk_bytes and session_id:
-                    # best-effort local transcription
-                    text = streamer.transcribe_pcm16le(bytes(ring))
-                    if text:
-                        res = await _process_stream_in(StreamIn(type="partial", session_id=session_id, text=text))
-                        await ws.send_json(res)
-                        ring.clear()
+                # inference runs in the ASR executor: other connections keep going, this one
+                # reads its next chunk once the window is transcribed (no audio is skipped)
+                while session_id and asr.ready:
+                    out = await asr.step()
+                    if out:
+                        await emit(out)
     except WebSocketDisconnect:
         pass
     except Exception:
@@ -1231,6 +1987,15 @@ async def ws_asr(ws: WebSocket):
             await ws.close()
         except Exception:
             pass
+    # end of audio: what was heard so far becomes the final
+    try:
+        out = await asr.flush() if asr is not None and session_id else None
+        if out:
+            await emit(out, reply=False)
+    except Exception as e:
+        logger.warning(f"asr flush failed for {session_id}: {e}")
+    if pooled is not None:
+        asr_pool.release(pooled)
 
 # Mount static after routes
 try:
@@ -0,0 +1,79 @@
+"""
+Rolling look-ahead playout per session (PLAYOUT_WINDOW_MS > 0).
+
+Instead of the whole compiled timeline plus replace tails, the owning node keeps a playhead
+(timeline ms) per session and sends only the events that come due within the next
+`window_ms`, as the playhead advances. The playhead follows the wall clock but never runs
+past the end of the known events (it waits for new text instead of leaving gaps).
+
+Sent messages use the legacy replace rule ("events from from_t_ms on are replaced by
+data.events"), so existing clients, coalescing and the resync history work unchanged:
+- the first slice of a session is a "timeline" with only the first window,
+- a slice that just extends the window has from_t_ms at the previous window end (clients
+  hold nothing there yet),
+- a correction of already sent, not yet played events re-sends from the earliest changed
+  t_ms. Corrections never reach behind the playhead: played events are not re-sent, and a
+  change there is only counted (`late`).
+Every slice carries "playhead_ms" so a client can align its clock with the server's.
+"""
+from bisect import bisect_left
+from typing import Optional, Tuple
+
+from packages.sign_timeline import EventArrays
+
+
+class Playout:
+    __slots__ = ("window_ms", "playhead", "wall_ms", "sent_until", "dirty_from", "late")
+
+    def __init__(self, window_ms: int, start_t_ms: int, now_ms: int):
+        self.window_ms = max(1, int(window_ms))
+        self.playhead = start_t_ms        # timeline ms being played now
+        self.wall_ms = now_ms             # wall clock of the last advance
+        self.sent_until = start_t_ms      # every event with t_ms < sent_until is on the clients
+        self.dirty_from: Optional[int] = None  # earliest sent-but-unplayed t_ms to re-send
+        self.late = 0                     # changes behind the playhead (not re-sent)
+
+    def changed(self, from_t_ms: int) -> None:
+        """The compiled events changed from from_t_ms on."""
+        if from_t_ms >= self.sent_until:
+            return  # not sent yet: goes out when it comes due
+        if from_t_ms < self.playhead:
+            self.late += 1
+            from_t_ms = self.playhead
+        self.dirty_from = from_t_ms if self.dirty_from is None else min(self.dirty_from, from_t_ms)
+
+    def advance(self, ev: EventArrays, now_ms: int) -> None:
+        n = len(ev)
+        end = ev.t_ms[n - 1] + ev.dur_ms[n - 1] if n else self.playhead
+        self.playhead = max(self.playhead, min(self.playhead + max(0, now_ms - self.wall_ms), end))
+        self.wall_ms = now_ms
+
+    def due(self, ev: EventArrays, now_ms: int) -> Optional[Tuple[int, int, int, bool]]:
+        """
+        (from_t_ms, i0, i1, corrected) if clients need ev[i0:i1] now, replacing their events from
+        from_t_ms on; None if the window did not move over new events and nothing sent was corrected.
+        """
+        self.advance(ev, now_ms)
+        n = len(ev)
+        limit = max(self.sent_until, self.playhead + self.window_ms)
+        start = self.sent_until if self.dirty_from is None else self.dirty_from
+        i0 = bisect_left(ev.t_ms, start)
+        i1 = bisect_left(ev.t_ms, limit)
+        corrected = self.dirty_from is not None
+        # past the last event nothing is pending: later events start after it, not inside the window
+        if i1 < n:
+            self.sent_until = limit
+        elif n:
+            self.sent_until = min(limit, ev.t_ms[n - 1] + 1)
+        self.dirty_from = None
+        if i0 >= i1 and not corrected:
+            return None
+        return start, i0, i1, corrected
+
+    def sent_index(self, ev: EventArrays) -> int:
+        """Number of leading events the clients hold (resync without history)."""
+        return bisect_left(ev.t_ms, self.sent_until)
+
+    def pending(self, ev: EventArrays) -> bool:
+        """False once every event is sent and nothing is corrected (no tick needed until new text)."""
+        return self.dirty_from is not None or self.sent_index(ev) < len(ev)
@@ -0,0 +1,333 @@
+"""
+Ingest recording and deterministic replay.
+
+Recording format (gzip, one member per flush, JSON lines):
+  {"v": 1, "t0": <epoch ms>}                                   header
+  [dt_ms, type, session_id, keep, suffix(, start_ms, gap_ms)]  one per StreamIn message
+where text = previous text of the same session[:keep] + suffix (partials mostly grow, so
+only the new tail is stored). dt_ms is relative to t0.
+
+replay() re-drives a recording through any async send(msg) -> ack at 1x, Nx or max speed
+(speed <= 0), one task per session so channels run concurrently with their recorded
+cadence. run_inproc()/run_ws() wire it to _process_stream_in or to /ws/ingest, collect the
+broadcast output and the final per-session timelines, and diff_golden() compares those
+against a golden file.
+"""
+import asyncio
+import gzip
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from packages.incremental import common_prefix_len
+
+FORMAT_VERSION = 1
+
+
+class IngestRecorder:
+    """Appends StreamIn messages to a recording; file writes run on one background thread."""
+
+    def __init__(self, path: Path, flush_lines: int = 200, flush_interval_s: float = 1.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_lines = max(1, int(flush_lines))
+        self.flush_interval_s = float(flush_interval_s)
+        self.t0 = int(time.time() * 1000)
+        self.count = 0
+        self._texts: Dict[str, str] = {}
+        self._buf: List[str] = [json.dumps({"v": FORMAT_VERSION, "t0": self.t0}) + "\n"]
+        self._last_flush = time.monotonic()
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-recorder")
+
+    def record(self, msg: Dict[str, Any], ts_ms: Optional[int] = None):
+        sid = msg["session_id"]
+        text = msg.get("text") or ""
+        prev = self._texts.get(sid, "")
+        keep = common_prefix_len(prev, text)
+        self._texts[sid] = text
+        ts = int(time.time() * 1000) if ts_ms is None else int(ts_ms)
+        row = [ts - self.t0, msg["type"], sid, keep, text[keep:]]
+        if msg.get("start_ms") is not None or msg.get("gap_ms") is not None:
+            row += [msg.get("start_ms"), msg.get("gap_ms")]
+        self._buf.append(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+        if len(self._buf) >= self.flush_lines or time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self):
+        if not self._buf:
+            return
+        data, self._buf = "".join(self._buf), []
+        self._last_flush = time.monotonic()
+        # single worker: members land in order
+        self._io.submit(self._write, data)
+
+    def _write(self, data: str):
+        with self.path.open("ab") as f:
+            f.write(gzip.compress(data.encode("utf-8")))
+
+    def close(self):
+        self.flush()
+        self._io.shutdown(wait=True)
+
+
+def write_recording(path: Path, items: List[Tuple[int, Dict[str, Any]]]):
+    """Write (dt_ms, StreamIn dict) pairs as a recording (fixtures/tools)."""
+    rec = IngestRecorder(path, flush_lines=1 << 30, flush_interval_s=1e9)
+    for dt, msg in items:
+        rec.record(msg, ts_ms=rec.t0 + int(dt))
+    rec.close()
+
+
+def read_recording(path: Path) -> List[Tuple[int, Dict[str, Any]]]:
+    """[(dt_ms, StreamIn dict)] in recorded order."""
+    texts: Dict[str, str] = {}
+    out: List[Tuple[int, Dict[str, Any]]] = []
+    with gzip.open(Path(path), "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if isinstance(row, dict):
+                if row.get("v") != FORMAT_VERSION:
+                    raise ValueError(f"unsupported recording version: {row.get('v')}")
+                continue
+            dt, mtype, sid, keep, suffix = row[:5]
+            text = texts.get(sid, "")[:keep] + suffix
+            texts[sid] = text
+            msg = {"type": mtype, "session_id": sid, "text": text}
+            if len(row) > 5:
+                msg["start_ms"], msg["gap_ms"] = row[5], row[6]
+            out.append((int(dt), msg))
+    return out
+
+
+async def replay(messages: List[Tuple[int, Dict[str, Any]]], send: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 speed: float = 1.0, on_sent: Optional[Callable[[str, float], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Send messages with their recorded spacing divided by speed (speed <= 0: as fast as acks allow).
+    Returns one record per message: {session_id, type, ack_ms, lag_ms, ack}.
+    """
+    by_session: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+    for dt, msg in messages:
+        by_session.setdefault(msg["session_id"], []).append((dt, msg))
+    results: List[Dict[str, Any]] = []
+    base = min((dt for dt, _ in messages), default=0)
+    t_start = time.perf_counter()
+
+    async def run(items):
+        for dt, msg in items:
+            lag = 0.0
+            if speed > 0:
+                due = t_start + (dt - base) / 1000.0 / speed
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                lag = max(0.0, time.perf_counter() - due) * 1000.0
+            msg = dict(msg, origin_ts=int(time.time() * 1000))
+            t0 = time.perf_counter()
+            if on_sent:
+                on_sent(msg["session_id"], t0)
+            ack = await send(msg)
+            results.append({"session_id": msg["session_id"], "type": msg["type"],
+                            "ack_ms": (time.perf_counter() - t0) * 1000.0, "lag_ms": lag, "ack": ack})
+
+    await asyncio.gather(*[run(items) for items in by_session.values()])
+    return results
+
+
+class OutputCollector:
+    """Timeline subscriber stand-in: records broadcast output and its latency from the last send."""
+
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        self.bytes = 0
+        self.latency_ms: List[float] = []
+        self._last_sent: Dict[str, float] = {}
+
+    def on_sent(self, session_id: str, t: float):
+        self._last_sent[session_id] = t
+
+    def on_message(self, msg: Dict[str, Any], nbytes: int = 0):
+        self.messages.append(msg)
+        self.bytes += nbytes
+        t = self._last_sent.get(msg.get("session_id"))
+        if t is not None:
+            self.latency_ms.append((time.perf_counter() - t) * 1000.0)
+
+    # websocket interface for ConnectionManager
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.on_message(json.loads(text), len(text.encode("utf-8")))
+
+    async def close(self):
+        pass
+
+
+def _pct(vals: List[float]) -> Dict[str, Optional[float]]:
+    if not vals:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    s = sorted(vals)
+
+    def p(q):
+        return round(s[min(len(s) - 1, max(0, int(math.ceil(q / 100.0 * len(s))) - 1))], 2)
+    return {"p50": p(50), "p90": p(90), "p99": p(99), "max": round(s[-1], 2)}
+
+
+def summarize(results: List[Dict[str, Any]], collector: OutputCollector, elapsed_s: float, speed: float) -> Dict[str, Any]:
+    outputs = [m for m in collector.messages if m.get("type") in ("timeline", "timeline.replace")]
+    replaces = sum(1 for m in outputs if m["type"] == "timeline.replace")
+    return {
+        "messages": len(results),
+        "sessions": len({r["session_id"] for r in results}),
+        "speed": speed if speed > 0 else "max",
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_msg_s": round(len(results) / elapsed_s, 1) if elapsed_s > 0 else None,
+        "rate_limited": sum(1 for r in results if (r["ack"] or {}).get("rate_limited")),
+        "ack_ms": _pct([r["ack_ms"] for r in results]),
+        "broadcast_ms": _pct(collector.latency_ms),
+        "schedule_lag_ms": _pct([r["lag_ms"] for r in results]),
+        "outputs": len(outputs),
+        "replaces": replaces,
+        "replace_ratio": round(replaces / len(outputs), 3) if outputs else 0,
+        "output_bytes": collector.bytes,
+    }
+
+
+_EVENT_KEYS = ("t_ms", "clip", "dur_ms", "channel", "confidence")
+
+
+def normalize_state(state: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Keep only the deterministic parts of per-session final timelines."""
+    return {
+        sid: {"text": st.get("text", ""), "events": [{k: e.get(k) for k in _EVENT_KEYS} for e in st.get("events", [])]}
+        for sid, st in sorted(state.items())
+    }
+
+
+def client_mismatch(messages: List[Dict[str, Any]], state: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Sessions whose client-side timeline (all received messages applied in order) differs from the server's."""
+    from services.delta_history import apply_message
+
+    held: Dict[str, List[Dict[str, Any]]] = {}
+    for m in messages:
+        sid = m.get("session_id")
+        if sid in state and m.get("type") in ("timeline", "timeline.replace"):
+            held[sid] = apply_message(held.get(sid, []), m)
+    return [sid for sid, st in state.items()
+            if normalize_state({sid: {"events": held.get(sid, [])}})[sid]["events"] != st["events"]]
+
+
+def diff_golden(golden: Dict[str, Any], actual: Dict[str, Any], max_diffs: int = 20) -> List[str]:
+    """Human-readable differences between two normalized final states ([] = identical)."""
+    g, a = golden.get("sessions", {}), actual.get("sessions", {})
+    diffs: List[str] = []
+    for sid in sorted(set(g) | set(a)):
+        if sid not in a:
+            diffs.append(f"{sid}: missing from replay")
+            continue
+        if sid not in g:
+            diffs.append(f"{sid}: not in golden")
+            continue
+        ge, ae = g[sid]["events"], a[sid]["events"]
+        if g[sid].get("text") != a[sid].get("text"):
+            diffs.append(f"{sid}: final text differs")
+        if ge != ae:
+            i = next((k for k, (x, y) in enumerate(zip(ge, ae)) if x != y), min(len(ge), len(ae)))
+            diffs.append(f"{sid}: events differ at #{i} (golden {len(ge)}, replay {len(ae)}): "
+                         f"{ge[i] if i < len(ge) else None} != {ae[i] if i < len(ae) else None}")
+        if len(diffs) >= max_diffs:
+            break
+    return diffs
+
+
+async def run_inproc(messages: List[Tuple[int, Dict[str, Any]]], speed: float = 0, max_ingest_rps: Optional[int] = None) -> Dict[str, Any]:
+    """Replay through the server's _process_stream_in in this process."""
+    from services import pipeline_server as ps
+
+    sids = sorted({m["session_id"] for _, m in messages})
+    for sid in sids:
+        await ps._forget_session(sid)
+    collector = OutputCollector()
+    await ps.manager.connect(collector, ps.Subscription(sessions=sids))
+    saved_rps = ps.settings.max_ingest_rps
+    if max_ingest_rps is not None:
+        ps.settings.max_ingest_rps = max_ingest_rps
+    ps.stage_timings.reset()
+    # look-ahead / commit release loops (idle unless enabled), as under the server's startup hook
+    loops = [asyncio.create_task(ps._playout_loop()), asyncio.create_task(ps._stability_loop())]
+    try:
+        t0 = time.perf_counter()
+
+        async def send(msg):
+            return await ps._process_stream_in(ps.StreamIn(**msg))
+
+        results = await replay(messages, send, speed, on_sent=collector.on_sent)
+        elapsed = time.perf_counter() - t0
+        # held partial tails (STABILITY_K) go out once their hold time passes
+        deadline = time.perf_counter() + 2 * ps.settings.stability_max_hold_ms / 1000.0
+        while (ps.playing or ps.settling) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.02)
+        await ps.manager.drain()
+    finally:
+        ps.settings.max_ingest_rps = saved_rps
+        for task in loops:
+            task.cancel()
+        await ps.manager.disconnect(collector)
+    state = normalize_state({sid: {"text": ps.sessions[sid].text, "events": ps.sessions[sid].events.to_dicts()}
+                             for sid in sids if sid in ps.sessions})
+    report = summarize(results, collector, elapsed, speed)
+    report["client_mismatch"] = client_mismatch(collector.messages, state)
+    report["stages_ms"] = ps.stage_timings.snapshot()
+    return {"report": report, "sessions": state}
+
+
+async def run_ws(messages: List[Tuple[int, Dict[str, Any]]], base_url: str = "ws://localhost:8000", speed: float = 1.0,
+                 api_key: Optional[str] = None, settle_s: float = 0.5) -> Dict[str, Any]:
+    """Replay over /ws/ingest (one connection per session) and collect output from /ws/timeline."""
+    import urllib.parse
+    import urllib.request
+    import websockets
+
+    sids = sorted({m["session_id"] for _, m in messages})
+    q = f"?key={urllib.parse.quote(api_key)}" if api_key else ""
+    collector = OutputCollector()
+    sub_url = f"{base_url}/ws/timeline?sessions={urllib.parse.quote(','.join(sids))}"
+
+    async with websockets.connect(sub_url, max_queue=None) as sub:
+        async def listen():
+            async for raw in sub:
+                collector.on_message(json.loads(raw), len(raw.encode("utf-8")) if isinstance(raw, str) else len(raw))
+        listener = asyncio.create_task(listen())
+        conns = {sid: await websockets.connect(f"{base_url}/ws/ingest{q}", max_queue=None) for sid in sids}
+        try:
+            t0 = time.perf_counter()
+
+            async def send(msg):
+                ws = conns[msg["session_id"]]
+                await ws.send(json.dumps(msg, ensure_ascii=False))
+                return json.loads(await ws.recv())
+
+            results = await replay(messages, send, speed, on_sent=collector.on_sent)
+            await asyncio.sleep(settle_s)
+            elapsed = time.perf_counter() - t0 - settle_s
+        finally:
+            for ws in conns.values():
+                await ws.close()
+            listener.cancel()
+
+    http = base_url.replace("ws://", "http://").replace("wss://", "https://")
+
+    def fetch(sid):
+        req = urllib.request.Request(f"{http}/sessions/timeline?session_id={urllib.parse.quote(sid)}",
+                                     headers={"x-api-key": api_key} if api_key else {})
+        with urllib.request.urlopen(req) as r:
+            return json.loads(r.read().decode("utf-8"))
+
+    state = {}
+    for sid in sids:
+        state[sid] = await asyncio.to_thread(fetch, sid)
+    return {"report": summarize(results, collector, elapsed, speed), "sessions": normalize_state(state)}
@@ -0,0 +1,89 @@
+"""
+Compact per-session ingest state.
+
+Thousands of idle-but-not-yet-purged sessions are normal for a long broadcast day, so the
+state is a slotted class: events live in typed parallel arrays (EventArrays) instead of one
+dict per event, the per-session lock and ASR meta dict are created on first use, and the
+ingest rate limiter is a fixed ring of the last N accepted timestamps (O(1) per message).
+"""
+import asyncio
+from array import array
+from typing import Any, Dict, Optional
+
+from packages.sign_timeline import EventArrays
+
+
+class SlidingWindowLimiter:
+    """
+    At most `limit` accepted messages in any `window_ms` (same rule as filtering a list of
+    recent timestamps, without rebuilding it). The ring holds the last `limit` accepted
+    timestamps; a message is allowed iff the oldest of them has left the window.
+    """
+
+    __slots__ = ("_ts", "_i")
+
+    def __init__(self):
+        self._ts = array("q")
+        self._i = 0  # index of the oldest timestamp once the ring is full
+
+    def _resize(self, limit: int) -> None:
+        # keep the most recent `limit` timestamps, oldest first
+        ordered = self._ts[self._i:] + self._ts[:self._i]
+        self._ts = ordered[len(ordered) - limit:] if len(ordered) > limit else ordered
+        self._i = 0
+
+    def allow(self, now_ms: int, limit: int, window_ms: int = 1000) -> bool:
+        limit = max(1, int(limit))
+        ts = self._ts
+        n = len(ts)
+        # limit changed at runtime (POST /config): re-lay the ring out oldest-first
+        if n > limit or (n < limit and self._i):
+            self._resize(limit)
+            ts = self._ts
+            n = len(ts)
+        if n < limit:
+            ts.append(now_ms)
+            return True
+        if now_ms - ts[self._i] <= window_ms:
+            return False
+        ts[self._i] = now_ms
+        self._i = (self._i + 1) % limit
+        return True
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+
+class SessionState:
+    # 세션 상태: 증분 처리용
+    __slots__ = ("text", "events", "base_id", "start_ms", "gap_ms", "limiter", "last_update_ms",
+                 "_meta", "last_text", "last_replace_broadcast_ms", "_lock", "seq", "playout", "stability")
+
+    def __init__(self, start_ms: int = 0, gap_ms: int = 60):
+        self.text = ""
+        self.events = EventArrays()
+        self.base_id: Optional[str] = None
+        self.start_ms = start_ms
+        self.gap_ms = gap_ms
+        self.limiter = SlidingWindowLimiter()
+        self.last_update_ms = 0
+        self._meta: Optional[Dict[str, Any]] = None
+        self.last_text = ""
+        self.last_replace_broadcast_ms = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self.seq = 0  # last published timeline message seq (delta protocol)
+        self.playout = None  # services.playout.Playout when PLAYOUT_WINDOW_MS > 0
+        self.stability = None  # services.stability.StabilityTracker when STABILITY_K > 0
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        if self._meta is None:
+            self._meta = {}
+        return self._meta
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # 세션 내 컴파일 순서 보장
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
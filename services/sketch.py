@@ -0,0 +1,127 @@
+"""
+Constant-memory streaming statistics for Stats.
+
+DDSketch: log-bucketed quantile sketch with relative accuracy alpha (1% → every quantile
+is within ±1% of a true sample value). add() is O(1); bins grow with log(max/min), not
+with the number of samples, and sketches merge by adding bin counts.
+
+RollingSketch / RollingCounter: a ring of fixed-width time slots (default 10 s × 90 = 15 min).
+An observation touches only the current slot; a window query merges the slots it covers,
+so 1m/5m/15m percentiles and rates cost O(slots × bins) per snapshot.
+"""
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class DDSketch:
+    __slots__ = ("alpha", "_lg", "_gamma", "bins", "zero", "count", "sum")
+
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self._gamma = (1 + alpha) / (1 - alpha)
+        self._lg = math.log(self._gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, v: float, n: int = 1):
+        if v <= 1e-9:
+            self.zero += n
+        else:
+            k = math.ceil(math.log(v) / self._lg)
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.count += n
+        self.sum += v * n
+
+    def merge(self, other: "DDSketch"):
+        bins = self.bins
+        for k, c in other.bins.items():
+            bins[k] = bins.get(k, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+
+    def _value(self, k: int) -> float:
+        return 2.0 * self._gamma ** k / (self._gamma + 1)
+
+    def items(self) -> Iterable[Tuple[float, int]]:
+        """(representative value, count) in ascending order."""
+        if self.zero:
+            yield 0.0, self.zero
+        for k in sorted(self.bins):
+            yield self._value(k), self.bins[k]
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        if not self.count:
+            return [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        out: List[Optional[float]] = [None] * len(qs)
+        j = 0
+        seen = 0
+        last = 0.0
+        for v, c in self.items():
+            seen += c
+            last = v
+            # nearest-rank: smallest value whose cumulative count reaches ceil(q * n)
+            while j < len(order) and seen >= max(1, math.ceil(qs[order[j]] * self.count)):
+                out[order[j]] = v
+                j += 1
+        while j < len(order):
+            out[order[j]] = last
+            j += 1
+        return out
+
+
+class RollingCounter:
+    __slots__ = ("slot_s", "_epochs", "_counts")
+
+    def __init__(self, slot_s: float = 10.0, slots: int = 90):
+        self.slot_s = float(slot_s)
+        self._epochs = [-1] * int(slots)
+        self._counts = [0] * int(slots)
+
+    def add(self, n: int = 1, now: Optional[float] = None):
+        e = int((time.time() if now is None else now) // self.slot_s)
+        i = e % len(self._epochs)
+        if self._epochs[i] != e:
+            self._epochs[i] = e
+            self._counts[i] = 0
+        self._counts[i] += n
+
+    def total(self, window_s: float, now: Optional[float] = None) -> int:
+        e = int((time.time() if now is None else now) // self.slot_s)
+        lo = e - max(1, math.ceil(window_s / self.slot_s)) + 1
+        return sum(c for ep, c in zip(self._epochs, self._counts) if lo <= ep <= e)
+
+    def rate(self, window_s: float, now: Optional[float] = None) -> float:
+        return self.total(window_s, now) / float(window_s)
+
+
+class RollingSketch:
+    __slots__ = ("slot_s", "alpha", "_epochs", "_sketches")
+
+    def __init__(self, slot_s: float = 10.0, slots: int = 90, alpha: float = 0.01):
+        self.slot_s = float(slot_s)
+        self.alpha = alpha
+        self._epochs = [-1] * int(slots)
+        self._sketches: List[Optional[DDSketch]] = [None] * int(slots)
+
+    def add(self, v: float, now: Optional[float] = None):
+        e = int((time.time() if now is None else now) // self.slot_s)
+        i = e % len(self._epochs)
+        sk = self._sketches[i]
+        if self._epochs[i] != e or sk is None:
+            self._epochs[i] = e
+            sk = self._sketches[i] = DDSketch(self.alpha)
+        sk.add(v)
+
+    def window(self, window_s: float, now: Optional[float] = None) -> DDSketch:
+        e = int((time.time() if now is None else now) // self.slot_s)
+        lo = e - max(1, math.ceil(window_s / self.slot_s)) + 1
+        out = DDSketch(self.alpha)
+        for ep, sk in zip(self._epochs, self._sketches):
+            if sk is not None and lo <= ep <= e:
+                out.merge(sk)
+        return out
@@ -0,0 +1,101 @@
+"""
+Per-stage latency spans for the ingest path.
+
+    with stage_timings.span("broadcast"):
+        ...
+    stage_timings.observe("tokenize", ms)   # timings measured elsewhere (worker shards)
+
+Each observation feeds a Prometheus histogram labeled by stage and a RollingSketch (the
+last window_s, DDSketch per time slot) for the /stats breakdown, so a snapshot merges a
+few sketches instead of sorting recent samples. When disabled, span() returns a shared
+no-op context manager and observe() returns immediately.
+"""
+import time
+from typing import Any, Dict, Optional
+
+from prometheus_client import Histogram
+
+from services.sketch import RollingSketch
+
+STAGE_LAT = Histogram(
+    "pipeline_stage_latency_ms", "Per-stage ingest processing latency in ms", labelnames=("stage",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_owner", "_stage", "_t0")
+
+    def __init__(self, owner: "StageTimings", stage: str):
+        self._owner = owner
+        self._stage = stage
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._owner.observe(self._stage, (time.perf_counter() - self._t0) * 1000.0)
+        return False
+
+
+class StageTimings:
+    def __init__(self, enabled: bool = True, window_s: float = 300.0, slot_s: float = 10.0, alpha: float = 0.01):
+        self.enabled = bool(enabled)
+        self.window_s = float(window_s)
+        self.slot_s = float(slot_s)
+        self.alpha = alpha
+        self._recent: Dict[str, RollingSketch] = {}
+        self._count: Dict[str, int] = {}
+        self._sum: Dict[str, float] = {}
+        self._hist: Dict[str, Any] = {}
+
+    def span(self, stage: str):
+        return _Span(self, stage) if self.enabled else _NULL
+
+    def observe(self, stage: str, ms: float):
+        if not self.enabled:
+            return
+        d = self._recent.get(stage)
+        if d is None:
+            d = self._recent[stage] = RollingSketch(self.slot_s, max(1, int(round(self.window_s / self.slot_s))), self.alpha)
+            self._count[stage] = 0
+            self._sum[stage] = 0.0
+            self._hist[stage] = STAGE_LAT.labels(stage)
+        d.add(ms)
+        self._count[stage] += 1
+        self._sum[stage] += ms
+        self._hist[stage].observe(ms)
+
+    def reset(self):
+        """Clear the /stats windows (Prometheus histograms are cumulative and kept)."""
+        self._recent.clear()
+        self._count.clear()
+        self._sum.clear()
+        self._hist.clear()
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for stage, d in self._recent.items():
+            p50, p90, p99 = d.window(self.window_s, now).quantiles([0.5, 0.9, 0.99])
+            out[stage] = {
+                "count": self._count[stage],
+                "mean_ms": round(self._sum[stage] / self._count[stage], 3) if self._count[stage] else None,
+                "p50": None if p50 is None else round(p50, 3),
+                "p90": None if p90 is None else round(p90, 3),
+                "p99": None if p99 is None else round(p99, 3),
+            }
+        return out
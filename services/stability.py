@@ -0,0 +1,77 @@
+"""
+Commit tracking for unstable ASR partials (STABILITY_K > 0).
+
+Streaming recognizers rewrite the last word or two of a partial back and forth; each rewrite
+used to go out as a timeline.replace. The tracker remembers, per leading event, the partial
+and the time since which it (and everything before it) has been unchanged. An event is
+released to clients once it has been seen unchanged in K partials or held for hold_ms;
+the unreleased tail is not broadcast at all, and a final releases everything.
+
+hold_ms adapts to the session's flip rate (EWMA of "this partial changed already compiled
+events" rather than only appending): a calm stream releases after min_hold_ms, a flapping
+one waits up to max_hold_ms.
+
+Clients hold the published view, which may lag the compiled events. Only its t_ms column is
+kept (to know where a correction starts) plus the first index where the compiled events no
+longer match it, so publishing costs O(changed events).
+"""
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Optional, Tuple
+
+FLIP_ALPHA = 0.2
+
+
+class StabilityTracker:
+    __slots__ = ("_born_n", "_born_ms", "partials", "flip_rate", "header", "pub_t", "pub_clean")
+
+    def __init__(self, header: Optional[Dict[str, Any]] = None):
+        self._born_n = array("q")   # partial number since which event i is unchanged (non-decreasing)
+        self._born_ms = array("q")  # time since which event i is unchanged (non-decreasing)
+        self.partials = 0
+        self.flip_rate = 0.0
+        self.header = header or {}  # id/created_ms/lang/meta of the first timeline message
+        self.pub_t: Optional[array] = None  # t_ms of the events clients hold (None = nothing sent yet)
+        self.pub_clean = 0          # leading published events that still match the compiled events
+
+    def update(self, common: int, n_events: int, now_ms: int) -> None:
+        """A partial was compiled: its first `common` events are unchanged, n_events in total."""
+        flipped = common < len(self._born_n)
+        self.flip_rate += FLIP_ALPHA * ((1.0 if flipped else 0.0) - self.flip_rate)
+        del self._born_n[common:]
+        del self._born_ms[common:]
+        for _ in range(n_events - common):
+            self._born_n.append(self.partials)
+            self._born_ms.append(now_ms)
+        self.partials += 1
+        if self.pub_t is not None:
+            self.pub_clean = min(self.pub_clean, common)
+
+    def hold_ms(self, min_hold_ms: int, max_hold_ms: int) -> int:
+        return int(min_hold_ms + max(0, max_hold_ms - min_hold_ms) * self.flip_rate)
+
+    def stable(self, now_ms: int, k: int, hold_ms: int) -> int:
+        """Leading events unchanged in the last k partials or for hold_ms."""
+        by_count = bisect_right(self._born_n, self.partials - k) if k > 0 else 0
+        return max(by_count, bisect_right(self._born_ms, now_ms - hold_ms))
+
+    def due(self, n_release: int, n_events: int) -> Optional[Tuple[int, int]]:
+        """
+        (from index, to index) of the events to publish so clients hold events[:n_release],
+        or None if they already hold a correct prefix at least that long. Published events that
+        were corrected are replaced only once the correction itself is released.
+        """
+        pub_n = len(self.pub_t) if self.pub_t is not None else 0
+        if self.pub_t is not None and n_release <= self.pub_clean and not (n_release == n_events and pub_n > n_events):
+            return None
+        if self.pub_t is None and n_release == 0:
+            return None
+        return self.pub_clean, n_release
+
+    def published(self, t_ms: array, n: int) -> None:
+        self.pub_t = t_ms[:n]
+        self.pub_clean = n
+
+    def pending(self, n_events: int) -> bool:
+        """True while some compiled events are not on the clients yet (time release needed)."""
+        return self.pub_t is None or self.pub_clean < n_events or len(self.pub_t) > n_events
@@ -0,0 +1,44 @@
+"""
+Shared JSON encoding for websocket frames and logs.
+
+Messages are encoded once per broadcast and the same text is sent to every socket
+(and reused for the log). orjson is used when installed (JSON_BACKEND=auto|orjson),
+otherwise the stdlib encoder with the same compact, non-ASCII-escaping output.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional
+    orjson = None
+
+_use_orjson = orjson is not None
+
+
+def set_backend(name: str = "auto"):
+    global _use_orjson
+    if name == "orjson" and orjson is None:
+        raise ValueError("JSON_BACKEND=orjson but orjson is not installed")
+    if name not in ("auto", "orjson", "json"):
+        raise ValueError(f"unknown json backend: {name}")
+    _use_orjson = orjson is not None and name != "json"
+
+
+def backend() -> str:
+    return "orjson" if _use_orjson else "json"
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON text (same shape as Starlette's send_json)."""
+    if _use_orjson:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            # e.g. non-str dict keys; orjson is stricter than json
+            pass
+    return _stdlib_dumps(obj)
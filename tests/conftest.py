@@ -1,8 +1,32 @@
 import os
 import sys
 
+import pytest
+
 # Ensure project root is on sys.path for imports like `services.*` and `packages.*`
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
+
+@pytest.fixture(autouse=True)
+def _server_files_in_tmp(tmp_path, monkeypatch):
+    # timeline log, last_timeline.json, journal, lexicon audit and saved overlays go to tmp_path, not the repo
+    from services import pipeline_server as ps
+    from services.journal import TimelineJournal
+
+    logs = tmp_path / "logs"
+    versions = tmp_path / "lexicon_versions"
+    logs.mkdir()
+    versions.mkdir()
+    monkeypatch.setenv("JOURNAL_DIR", str(logs / "journal"))
+    journal = TimelineJournal(logs / "journal")
+    monkeypatch.setattr(ps, "journal", journal)
+    monkeypatch.setattr(ps, "TIMELINE_LOG", logs / "timeline.log")
+    monkeypatch.setattr(ps, "LAST_TIMELINE_PATH", logs / "last_timeline.json")
+    monkeypatch.setattr(ps, "LEX_AUDIT", logs / "lexicon_audit.log")
+    monkeypatch.setattr(ps, "VERS_DIR", versions)
+    monkeypatch.setattr(ps.timeline_writer, "journal", journal)
+    monkeypatch.setattr(ps.timeline_writer, "log_path", logs / "timeline.log")
+    monkeypatch.setattr(ps.timeline_writer, "last_path", logs / "last_timeline.json")
+    yield
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from services.asr import FakeASRModel, LocalAgreement, PcmRing, StreamingASR, synth_pcm
+
+TEXT = "속보 서울 태풍 호우 경보 부산 날씨 한국"
+
+
+def test_ring_keeps_the_newest_window():
+    r = PcmRing(8)
+    r.write(b"abcdef")
+    assert r.window() == b"abcdef"
+    r.write(b"ghij")
+    assert r.window() == b"cdefghij" and r.total == 10
+    r.write(b"0123456789ab")  # longer than the ring
+    assert r.window() == b"456789ab" and r.total == 22
+
+
+def test_local_agreement_commits_words_two_windows_agree_on():
+    la = LocalAgreement()
+    la.push("속보 태풍".split())
+    assert la.committed == [] and la.text() == "속보 태풍"
+    la.push("속보 서울 부산".split())
+    assert la.committed == ["속보"] and la.text() == "속보 서울 부산"
+    # the next window no longer starts at the utterance start: anchored after "속보"
+    la.push("서울 태풍 호우".split())
+    assert la.committed == ["속보", "서울"] and la.text() == "속보 서울 태풍 호우"
+    assert la.finish() == "속보 서울 태풍 호우" and la.text() == ""
+
+
+def test_overlapping_windows_converge_on_the_spoken_text():
+    pcm = synth_pcm(TEXT) + bytes(16000 * 2)  # one second of silence ends the utterance
+
+    async def main():
+        out = []
+        with ThreadPoolExecutor(1) as ex:
+            asr = StreamingASR(FakeASRModel(), ex, window_ms=1600, hop_ms=400)
+            for off in range(0, len(pcm), 3200):
+                if asr.feed(pcm[off:off + 3200]):
+                    r = await asr.step()
+                    if r:
+                        out.append(r)
+        return out
+
+    out = asyncio.run(main())
+    assert out[-1] == ("final", TEXT)
+    assert all(kind == "partial" for kind, _ in out[:-1])
+
+
+def test_ws_asr_streams_partials_and_flushes_a_final():
+    from services.pipeline_server import app, sessions
+
+    pcm = synth_pcm(TEXT)
+    c = TestClient(app)
+    with c.websocket_connect("/ws/asr?model=fake&chunk_ms=1600&hop_ms=400") as ws:
+        ws.send_text(json.dumps({"type": "partial", "session_id": "asr-t1", "text": ""}))
+        assert ws.receive_json()["ok"]
+        for off in range(0, len(pcm), 3200):
+            ws.send_bytes(pcm[off:off + 3200])
+        ws.send_text(json.dumps({"op": "flush"}))
+        results = []
+        while True:
+            msg = ws.receive_json()
+            if "asr" in msg:
+                results.append(msg)
+                if msg["asr"] == "final":
+                    break
+    assert results[-1]["text"] == TEXT and results[-1]["is_final"]
+    assert sessions["asr-t1"].meta["hop_ms"] == 400
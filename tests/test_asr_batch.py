@@ -0,0 +1,104 @@
+import asyncio
+
+from services.asr import FakeASRModel, StreamingASR, synth_pcm
+from services.asr_pool import PooledModel
+
+
+class RecordingModel(FakeASRModel):
+    def __init__(self):
+        super().__init__(delay_s=0.02)
+        self.calls = []
+
+    def transcribe(self, pcm, sample_rate=16000, **options):
+        self.calls.append(1)
+        return super().transcribe(pcm, sample_rate)
+
+    def transcribe_batch(self, pcms, sample_rate=16000, **options):
+        self.calls.append(len(pcms))
+        return super().transcribe_batch(pcms, sample_rate)
+
+
+def test_windows_from_different_sessions_share_one_call():
+    model = RecordingModel()
+    texts = ["속보", "서울 태풍", "부산 호우 경보", "지진"]
+
+    async def main():
+        pm = PooledModel(("stub", "cpu", "int8"), model, concurrency=1, queue_max=16, batch_max=3, batch_deadline_ms=50)
+        out = await asyncio.gather(*(pm.infer(synth_pcm(t), 16000) for t in texts))
+        pm.close()
+        return out, pm
+
+    out, pm = asyncio.run(main())
+    assert out == texts  # each caller gets its own window's transcript
+    assert model.calls == [3, 1] and pm.batches == 2 and pm.served == 4
+
+
+def test_different_decode_options_are_not_mixed():
+    model = RecordingModel()
+
+    async def main():
+        pm = PooledModel(("stub", "cpu", "int8"), model, concurrency=1, queue_max=16, batch_max=8, batch_deadline_ms=50)
+        out = await asyncio.gather(pm.infer(synth_pcm("속보"), 16000, beam_size=1),
+                                   pm.infer(synth_pcm("서울"), 16000, beam_size=5),
+                                   pm.infer(synth_pcm("태풍"), 16000, beam_size=1))
+        pm.close()
+        return out
+
+    assert asyncio.run(main()) == ["속보", "서울", "태풍"]
+    assert sorted(model.calls) == [1, 2]
+
+
+def test_batched_sessions_each_reach_their_own_final():
+    texts = ["속보 서울 태풍 호우", "부산 날씨 지진 주의보", "안녕하세요 오늘 한국 강풍"]
+    model = RecordingModel()
+
+    async def stream(pm, text):
+        asr = StreamingASR(pm, window_ms=1600, hop_ms=400)
+        pcm = synth_pcm(text) + bytes(16000 * 2)
+        out = []
+        for off in range(0, len(pcm), 6400):
+            if asr.feed(pcm[off:off + 6400]):
+                r = await asr.step()
+                if r:
+                    out.append(r)
+            await asyncio.sleep(0)
+        return out
+
+    async def main():
+        pm = PooledModel(("stub", "cpu", "int8"), model, concurrency=1, queue_max=16, batch_max=4, batch_deadline_ms=30)
+        outs = await asyncio.gather(*(stream(pm, t) for t in texts))
+        pm.close()
+        return outs
+
+    outs = asyncio.run(main())
+    assert [o[-1] for o in outs] == [("final", t) for t in texts]
+    assert max(model.calls) > 1
+
+
+def test_short_batch_answer_fails_every_window_instead_of_hanging():
+    class Short(FakeASRModel):
+        def transcribe_batch(self, pcms, sample_rate=16000, **options):
+            return super().transcribe_batch(pcms, sample_rate)[:-1]
+
+    async def main():
+        pm = PooledModel(("stub", "cpu", "int8"), Short(), concurrency=1, queue_max=8, batch_max=4, batch_deadline_ms=50)
+        out = await asyncio.wait_for(asyncio.gather(*(pm.infer(synth_pcm(t), 16000) for t in ("속보", "서울", "태풍")),
+                                                    return_exceptions=True), 2)
+        pm.close()
+        return out
+
+    out = asyncio.run(main())
+    assert len(out) == 3 and all(isinstance(r, RuntimeError) for r in out)
+
+
+def test_whisper_adapter_takes_part_in_batching():
+    from services.pipeline_server import _WhisperStreamer
+
+    w = _WhisperStreamer.__new__(_WhisperStreamer)  # no model download in tests
+    w.model, w.beam_size, w._tokenizer, w._batch_failed = None, 1, None, False
+    pm = PooledModel(("base", "cpu", "int8"), w, concurrency=1, queue_max=4, batch_max=8)
+    try:
+        assert pm.batch_max == 8
+        assert w.transcribe_batch([b"\0\0", b"\0\0"]) == ["", ""]
+    finally:
+        pm.close()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from services.asr import synth_pcm
+from services.asr_pool import ModelPool, parse_keys
+
+
+class SlowModel:
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def transcribe(self, pcm, sample_rate, **options):
+        self.gate.wait(5)
+        return f"{len(pcm)} {options.get('beam_size', 1)}"
+
+
+def test_models_load_once_and_idle_ones_are_evicted():
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        time.sleep(0.05)
+        m = SlowModel()
+        m.gate.set()
+        return m
+
+    async def main():
+        pool = ModelPool(loader, idle_s=10)
+        a, b = await asyncio.gather(pool.acquire(("base", "cpu", "int8")), pool.acquire(("base", "cpu", "int8")))
+        assert a is b and a.refs == 2 and len(loads) == 1
+        await pool.warm(parse_keys("small"))
+        pool.release(a)
+        assert pool.evict_idle(time.monotonic() + 60) == []  # still held
+        pool.release(b)
+        assert pool.evict_idle(time.monotonic() + 1) == []   # not idle long enough
+        assert pool.evict_idle(time.monotonic() + 60) == [("base", "cpu", "int8")]
+        assert [m["model"] for m in pool.snapshot()] == ["small"] and pool.snapshot()[0]["pinned"]
+        c = await pool.acquire(("base", "cpu", "int8"))
+        assert c is not a and len(loads) == 3
+        pool.close()
+
+    asyncio.run(main())
+
+
+def test_inference_queue_is_bounded():
+    model = SlowModel()
+
+    async def main():
+        pool = ModelPool(lambda key: model, concurrency=1, queue_max=2)
+        pm = await pool.acquire(("m", "cpu", "int8"))
+        calls = [asyncio.ensure_future(pm.infer(b"ab", 16000, beam_size=3)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        assert pm.snapshot()["queued"] == 2
+        model.gate.set()
+        out = await asyncio.gather(*calls)
+        pool.close()
+        return out, pm
+
+    out, pm = asyncio.run(main())
+    # one running + two queued; the fourth window is rejected
+    assert out == ["2 3", "2 3", "2 3", ""]
+    assert pm.served == 3 and pm.rejected == 1
+
+
+def test_ws_asr_connections_share_one_model():
+    from services.pipeline_server import app, asr_pool
+
+    pcm = synth_pcm("속보 서울")
+    c = TestClient(app)
+    with c.websocket_connect("/ws/asr?model=fake") as w1, c.websocket_connect("/ws/asr?model=fake") as w2:
+        for i, ws in enumerate((w1, w2)):
+            ws.send_text(json.dumps({"type": "partial", "session_id": f"pool-{i}", "text": ""}))
+            assert ws.receive_json()["ok"]
+        fake = [m for m in asr_pool.snapshot() if m["model"] == "fake"]
+        assert len(fake) == 1 and fake[0]["refs"] == 2
+        for ws in (w1, w2):
+            ws.send_bytes(pcm)
+            ws.send_text(json.dumps({"op": "flush"}))
+            while True:
+                msg = ws.receive_json()
+                if msg.get("asr") == "final":
+                    assert msg["text"] == "속보 서울"
+                    break
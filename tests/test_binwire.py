@@ -0,0 +1,77 @@
+import asyncio
+import json
+import pathlib
+
+import jsonschema
+from fastapi.testclient import TestClient
+
+from packages.sign_timeline import compile_glosses
+from services import binwire, wire
+from services.pipeline_server import app, ConnectionManager, Subscription
+
+SCHEMA = json.loads((pathlib.Path(__file__).resolve().parents[1] / "schemas" / "sign_timeline.schema.json").read_text(encoding="utf-8"))
+
+
+def _message():
+    tl = compile_glosses([("BREAKING", 0.9), ("SEOUL", 0.85), ("TYPHOON", 0.5), ("RAIN", 0.9)])
+    return {"type": "timeline", "session_id": "s1", "seq": 3, "data": tl}
+
+
+def test_roundtrip_matches_json_and_is_smaller():
+    msg = _message()
+    msg["data"]["events"][0]["tags"] = ["q", "neg"]
+    msg["data"]["events"][1]["note"] = {"k": 1}
+    replace = {"type": "timeline.replace", "session_id": "s1", "seq": 4, "base_seq": 3, "from_t_ms": 0,
+               "data": {"id": "x", "windows": [
+                   {"channels": ["default"], "from_t_ms": 0, "to_t_ms": 900, "events": msg["data"]["events"][:2]},
+                   {"channels": ["face"], "from_t_ms": 900, "events": []}]}}
+    for m in (msg, replace):
+        frame = binwire.encode(m)
+        assert frame[:3] == binwire.MAGIC
+        assert binwire.decode(frame) == json.loads(wire.dumps(m))
+    assert len(binwire.encode(msg)) < len(wire.dumps(msg).encode("utf-8")) / 2
+
+
+def test_decoded_timeline_validates_against_schema():
+    out = binwire.decode(binwire.encode(_message()))
+    jsonschema.validate(out["data"], SCHEMA)
+
+
+class BytesWS:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.sent.append(binwire.decode(data))
+
+
+def test_binary_subscribers_get_frames_only_for_timelines():
+    async def main():
+        m = ConnectionManager()
+        b, j = BytesWS(), BytesWS()
+        await m.connect(b, Subscription(format="binary"))
+        await m.connect(j)
+        await m.broadcast_json(_message())
+        await m.broadcast_json({"type": "stats", "data": {}})
+        await m.drain()
+        assert b.sent == j.sent and [x["type"] for x in b.sent] == ["timeline", "stats"]
+
+    asyncio.run(main())
+
+
+def test_ws_timeline_binary_format():
+    c = TestClient(app)
+    with c.websocket_connect("/ws/timeline?types=timeline&format=binary") as ws:
+        r = c.post("/ingest_text", json={"text": "안녕하세요 한국 날씨"})
+        assert r.status_code == 200
+        msg = binwire.decode(ws.receive_bytes())
+        assert msg["type"] == "timeline"
+        jsonschema.validate(msg["data"], SCHEMA)
+        ws.send_text(json.dumps({"op": "subscribe", "format": "json"}))
+        assert ws.receive_json()["type"] == "subscribed"
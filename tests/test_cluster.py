@@ -0,0 +1,172 @@
+import asyncio
+import json
+import socket
+
+from services.cluster import SocketBackend, LocalBackend, make_backend
+
+
+def _free_addr():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return f"127.0.0.1:{port}"
+
+
+async def _node(addr, inbox, handled, secret="s3cret"):
+    b = SocketBackend(addr, secret, reconnect_max_s=0.2)
+
+    async def on_message(msg, local, text=None):
+        inbox.append((msg, local))
+
+    async def on_forward(payload):
+        handled.append((b.node_id, payload))
+        return {"ok": True, "node": b.node_id}
+
+    b.bind(on_message, on_forward)
+    await b.start()
+    return b
+
+
+async def _settle():
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def test_socket_backend_fanout_affinity_forward():
+    async def main():
+        addr = _free_addr()
+        in_a, in_b, handled = [], [], []
+        a = await _node(addr, in_a, handled)
+        b = await _node(addr, in_b, handled)
+        assert a.hub is not None and b.hub is None
+        await _settle()
+
+        # publish reaches local subscribers and every other node
+        await a.publish({"type": "timeline", "session_id": "s1"})
+        await _settle()
+        assert in_a == [({"type": "timeline", "session_id": "s1"}, True)]
+        assert in_b == [({"type": "timeline", "session_id": "s1"}, False)]
+
+        # first claim wins; the other node sees the same owner and forwards to it
+        assert await a.owner_of("s1") == a.node_id
+        assert await b.owner_of("s1") == a.node_id
+        ack = await b.forward(a.node_id, {"session_id": "s1", "type": "partial"})
+        assert ack == {"ok": True, "node": a.node_id}
+        assert handled == [(a.node_id, {"session_id": "s1", "type": "partial"})]
+
+        # release makes the session claimable by another node
+        await a.release("s1")
+        await b.release("s1")
+        await _settle()
+        assert await b.owner_of("s1") == b.node_id
+
+        await b.stop()
+        await a.stop()
+
+    asyncio.run(main())
+
+
+def test_owner_gone_takes_session_over():
+    async def main():
+        addr = _free_addr()
+        handled = []
+        hub_node = await _node(addr, [], handled)
+        a = await _node(addr, [], handled)
+        b = await _node(addr, [], handled)
+        await _settle()
+        assert await a.owner_of("s2") == a.node_id
+        assert await b.owner_of("s2") == a.node_id
+        await a.stop()
+        await _settle()
+        # owner disconnected: b reclaims and processes locally
+        ack = await b.forward(a.node_id, {"session_id": "s2"})
+        assert ack["node"] == b.node_id
+        await b.stop()
+        await hub_node.stop()
+
+    asyncio.run(main())
+
+
+async def _until(cond, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if cond():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("condition not reached")
+
+
+def test_hub_requires_the_shared_secret():
+    async def main():
+        addr = _free_addr()
+        handled = []
+        a = await _node(addr, [], handled)
+        try:
+            await _node(addr, [], handled, secret="wrong")
+            raise AssertionError("node with the wrong secret joined")
+        except PermissionError:
+            pass
+        # a raw client cannot skip the handshake and forward ingest
+        host, port = addr.split(":")
+        reader, writer = await asyncio.open_connection(host, int(port))
+        assert json.loads(await reader.readline())["op"] == "challenge"
+        writer.write(json.dumps({"op": "fwd", "to": a.node_id, "rid": "x", "payload": {"session_id": "s"}}).encode() + b"\n")
+        await writer.drain()
+        assert json.loads(await reader.readline())["op"] == "denied"
+        assert await reader.readline() == b""
+        writer.close()
+        await _settle()
+        assert handled == [] and a.hub.rejected == 2
+        await a.stop()
+
+    asyncio.run(main())
+
+
+def test_release_evicts_other_nodes_owner_cache():
+    async def main():
+        addr = _free_addr()
+        a = await _node(addr, [], [])
+        b = await _node(addr, [], [])
+        await _settle()
+        assert await a.owner_of("s3") == a.node_id
+        assert await b.owner_of("s3") == a.node_id
+        await a.release("s3")
+        await _until(lambda: "s3" not in b._owner_cache)
+        assert await b.owner_of("s3") == b.node_id
+        await b.stop()
+        await a.stop()
+
+    asyncio.run(main())
+
+
+def test_hub_death_elects_a_new_hub_and_keeps_ownership():
+    async def main():
+        addr = _free_addr()
+        in_a, in_b = [], []
+        hub_node = await _node(addr, [], [])
+        a = await _node(addr, in_a, [])
+        b = await _node(addr, in_b, [])
+        await _settle()
+        assert await a.owner_of("s4") == a.node_id
+        assert await b.owner_of("s4") == a.node_id
+        await hub_node.stop()
+        # one survivor binds the address again, both reconnect to it
+        await _until(lambda: (a.hub is not None or b.hub is not None) and a.reconnects and b.reconnects)
+        assert (a.hub is None) != (b.hub is None)
+        hub = a.hub or b.hub
+        await _until(lambda: hub._owners.get("s4") == a.node_id)
+        # no split brain: a re-claimed its session, b forwards to it and sees its broadcasts
+        assert await b.owner_of("s4") == a.node_id
+        await a.publish({"type": "timeline", "session_id": "s4"})
+        await _until(lambda: in_b)
+        assert in_b == [({"type": "timeline", "session_id": "s4"}, False)]
+        await b.stop()
+        await a.stop()
+
+    asyncio.run(main())
+
+
+def test_make_backend_default_is_local():
+    b = make_backend("memory")
+    assert isinstance(b, LocalBackend) and not isinstance(b, SocketBackend)
+    assert asyncio.run(b.owner_of("x")) == b.node_id
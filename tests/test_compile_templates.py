@@ -0,0 +1,27 @@
+from packages.sign_timeline import compile_glosses, compile_glosses_arrays, set_clip
+from packages.sign_timeline import timeline as tl
+
+
+def test_arrays_match_dict_events():
+    gl = [("BREAKING", 0.9), ("KOREA", 0.85), ("UNKNOWN_X", 0.5), ("HEAVY_RAIN", 0.9)]
+    arr = compile_glosses_arrays(gl, start_ms=10, gap_ms=50)
+    ev = compile_glosses(gl, start_ms=10, gap_ms=50)["events"]
+    assert arr.to_dicts() == ev
+    assert len(arr) == len(ev)
+    assert arr.to_dicts(1, 3) == ev[1:3]
+    # list columns from the compiler, typed arrays once compacted for storage
+    assert type(arr.t_ms) is list and arr.compact().t_ms.typecode == "q" and arr.to_dicts() == ev
+    # aux durations are clamped to the manual clip
+    face = [e for e in ev if e["channel"] == "face" and e["t_ms"] == 10][0]
+    assert face["dur_ms"] == min(tl._FACE_CLIPS["BREAKING"]["dur_ms"], tl._CLIPS["BREAKING"]["dur_ms"])
+
+
+def test_set_clip_rebuilds_templates():
+    compile_glosses([("ZZ_TEST", 0.9)])
+    try:
+        set_clip("ZZ_TEST", "ZZ_CLIP", 123)
+        ev = compile_glosses([("ZZ_TEST", 0.9)])["events"]
+        assert ev[0]["clip"] == "ZZ_CLIP" and ev[0]["dur_ms"] == 123
+    finally:
+        tl._CLIPS.pop("ZZ_TEST", None)
+        tl.invalidate_templates()
@@ -0,0 +1,91 @@
+from fastapi.testclient import TestClient
+
+from services.delta_history import DeltaHistory, apply_message
+
+
+def _tl(seq, clips):
+    return {"type": "timeline", "session_id": "s", "seq": seq,
+            "data": {"id": "b", "events": [{"t_ms": i * 100, "clip": c} for i, c in enumerate(clips)]}}
+
+
+def _rep(seq, from_t, clips):
+    return {"type": "timeline.replace", "session_id": "s", "seq": seq, "base_seq": seq - 1, "from_t_ms": from_t,
+            "data": {"id": "b", "events": [{"t_ms": from_t + i * 100, "clip": c} for i, c in enumerate(clips)]}}
+
+
+def _clips(events):
+    return [e["clip"] for e in events]
+
+
+def test_missing_deltas_then_snapshot_once_history_is_folded():
+    h = DeltaHistory(depth=2)
+    msgs = [_tl(1, ["A"]), _rep(2, 100, ["B"]), _rep(3, 200, ["C"]), _rep(4, 100, ["X", "Y"])]
+    for m in msgs:
+        h.record(m)
+    assert h.head("s") == 4 and h.since("s", 4) == []
+    # within the last `depth` messages: only what is missing
+    assert [m["seq"] for m in h.since("s", 2)] == [3, 4]
+    # older than the history: one snapshot equal to applying everything
+    (snap,) = h.since("s", 1)
+    state = []
+    for m in msgs:
+        state = apply_message(state, m)
+    assert snap["type"] == "timeline" and snap["resync"] and snap["seq"] == 4
+    assert _clips(snap["data"]["events"]) == _clips(state) == ["A", "X", "Y"]
+    assert h.since("unknown", 0) is None
+
+
+def test_gap_in_relayed_messages_drops_the_base():
+    h = DeltaHistory(depth=8)
+    h.record(_tl(1, ["A"]))
+    h.record(_rep(3, 100, ["C"]))  # seq 2 never arrived here
+    assert h.snapshot("s") is None
+    assert h.since("s", 1) is None
+    h.record(_rep(4, 100, ["D"]))
+    assert [m["seq"] for m in h.since("s", 3)] == [4]
+    h.record(_tl(5, ["Z"]))
+    assert _clips(h.snapshot("s")["data"]["events"]) == ["Z"]
+
+
+def test_least_recent_sessions_are_evicted():
+    h = DeltaHistory(max_sessions=2)
+    for sid in ("a", "b", "a", "c"):
+        h.record({**_tl(1, ["A"]), "session_id": sid})
+    assert h.head("b") is None and h.head("a") == 1 and len(h) == 2
+
+
+def test_ws_resync_returns_missing_deltas_and_snapshot():
+    from services.pipeline_server import app, settings
+
+    client = TestClient(app)
+    saved = (settings.replace_min_events, settings.replace_min_ms, settings.replace_min_interval_ms)
+    settings.replace_min_events, settings.replace_min_ms, settings.replace_min_interval_ms = 0, 0, 0
+    try:
+        with client.websocket_connect("/ws/timeline?sessions=rs-1&types=timeline,timeline.replace") as tl:
+            with client.websocket_connect("/ws/ingest") as ws:
+                got = []
+                for text in ("속보 서울", "속보 서울 태풍", "속보 부산 태풍 비"):
+                    ws.send_json({"type": "partial", "session_id": "rs-1", "text": text})
+                    assert ws.receive_json()["ok"] is True
+                    got.append(tl.receive_json())
+            assert [m["seq"] for m in got] == [1, 2, 3]
+            assert [m.get("base_seq") for m in got] == [None, 1, 2]
+            # a client that applied seq 1 only gets 2 and 3 again
+            tl.send_json({"op": "resync", "session_id": "rs-1", "since": 1})
+            assert [tl.receive_json()["seq"] for _ in range(2)] == [2, 3]
+            # a client from before the history (or a wrong seq) gets one snapshot
+            tl.send_json({"op": "resync", "session_id": "rs-1", "since": 99})
+            snap = tl.receive_json()
+            assert snap["type"] == "timeline" and snap["resync"] is True and snap["seq"] == 3
+            current = client.get("/sessions/timeline", params={"session_id": "rs-1"}).json()["events"]
+            assert snap["data"]["events"] == current
+            tl.send_json({"op": "resync", "session_id": "nope", "since": 0})
+            assert tl.receive_json() == {"type": "resync.unavailable", "session_id": "nope"}
+            # malformed seqs are answered or ignored; the subscription stays open
+            tl.send_json({"op": "ack", "session_id": "rs-1", "seq": "x"})
+            tl.send_json({"op": "resync", "session_id": "rs-1", "since": [1]})
+            assert tl.receive_json()["error"] == "invalid since"
+            tl.send_json({"op": "resync", "session_id": "rs-1", "since": "2"})
+            assert tl.receive_json()["seq"] == 3
+    finally:
+        settings.replace_min_events, settings.replace_min_ms, settings.replace_min_interval_ms = saved
@@ -21,3 +21,121 @@ def test_diff_window_prefix_change():
     s,e = _diff_window(old,new)
     assert s == 0 and e == 1
 
+
+
+def _lcs(a, b):
+    L = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) - 1, -1, -1):
+        for j in range(len(b) - 1, -1, -1):
+            L[i][j] = L[i + 1][j + 1] + 1 if a[i] == b[j] else max(L[i + 1][j], L[i][j + 1])
+    return L[0][0]
+
+
+def _apply_hunks(a, b, hunks):
+    out, i = [], 0
+    for o0, o1, n0, n1 in hunks:
+        out += a[i:o0] + b[n0:n1]
+        i = o1
+    return out + a[i:]
+
+
+def test_myers_windows_are_minimal_and_capped():
+    import random
+    from packages.sign_timeline import myers_windows
+    rnd = random.Random(5)
+    for _ in range(300):
+        a = [rnd.choice("ABCD") for _ in range(rnd.randint(0, 14))]
+        b = [rnd.choice("ABCD") for _ in range(rnd.randint(0, 14))]
+        hunks = myers_windows(a, b)
+        assert _apply_hunks(a, b, hunks) == b
+        assert sum((o1 - o0) + (n1 - n0) for o0, o1, n0, n1 in hunks) == len(a) + len(b) - 2 * _lcs(a, b)
+        capped = myers_windows(a, b, max_d=1)
+        assert _apply_hunks(a, b, capped) == b and len(capped) <= max(1, len(hunks))
+    # mid-sentence correction + appended word: two small windows instead of one big one
+    assert myers_windows(list("ABCDEFG"), list("ABXDEFGH")) == [(2, 3, 2, 3), (7, 7, 7, 8)]
+
+
+def test_channel_windows_roundtrip_on_compiled_timelines():
+    from packages.sign_timeline import compile_glosses, channel_windows, apply_windows
+    words = [("BREAKING", 0.9), ("NEWS_X", 0.8), ("SEOUL", 0.8), ("TYPHOON", 0.9), ("RAIN", 0.9)]
+    old = compile_glosses(words)["events"]
+    # ASR corrects a mid-sentence word (same duration) and appends one
+    new = compile_glosses(words[:1] + [("NEWS_Y", 0.8)] + words[2:] + [("SNOW", 0.9)])["events"]
+    wins = channel_windows(old, new)
+    assert apply_windows(old, wins) == new
+    assert [(w["channels"], len(w["events"])) for w in wins] == [(["default"], 1), (["default", "gaze"], 2)]
+    assert "to_t_ms" in wins[0] and "to_t_ms" not in wins[1]
+    # several messages apply in order
+    newer = compile_glosses([("HELLO", 0.9)] + words[1:])["events"]
+    assert apply_windows(apply_windows(old, wins), channel_windows(new, newer)) == newer
+
+
+def test_duration_change_shifts_the_unchanged_suffix_instead_of_resending_it():
+    import random
+    from packages.sign_timeline import compile_glosses, channel_windows, apply_windows
+    from services import wire
+    words = [(w, 0.9) for w in "BREAKING NEWS_X SEOUL TYPHOON RAIN KOREA BUSAN SNOW HELLO RAIN TYPHOON SEOUL".split()]
+    old = compile_glosses(words)["events"]
+    # ASR corrects the third word to a longer sign: every later event moves
+    new = compile_glosses(words[:2] + [("EARTHQUAKE", 0.9)] + words[3:])["events"]
+    wins = channel_windows(old, new)
+    assert apply_windows(old, wins) == new
+    assert wins[0]["channels"] == ["default"] and [e["clip"] for e in wins[0]["events"]] == ["EARTHQUAKE"] and wins[0]["shift_ms"] > 0
+    first = next(i for i, (a, b) in enumerate(zip(old, new)) if a != b)
+    tail = [e for e in new if e["t_ms"] >= new[first]["t_ms"]]
+    assert sum(len(w["events"]) for w in wins) < len(tail) // 4
+    assert 2 * len(wire.dumps({"windows": wins})) < len(wire.dumps({"events": tail}))
+    # substitutions, insertions and deletions over several messages, applied one message at a time or concatenated
+    rnd = random.Random(3)
+    vocab = ["HELLO", "SEOUL", "TYPHOON", "RAIN", "BREAKING", "NEWS_X", "SNOW", "KOREA", "BUSAN", "EARTHQUAKE"]
+    for _ in range(300):
+        seq = [(rnd.choice(vocab), rnd.choice((0.5, 0.8, 0.9))) for _ in range(rnd.randint(0, 10))]
+        cur = base = compile_glosses(seq)["events"]
+        sent = []
+        for _ in range(3):
+            seq = list(seq)
+            for _ in range(rnd.randint(1, 3)):
+                i = rnd.randint(0, len(seq))
+                if rnd.random() < 0.5 and i < len(seq):
+                    seq[i] = (rnd.choice(vocab), 0.9)
+                elif rnd.random() < 0.5:
+                    seq.insert(i, (rnd.choice(vocab), 0.8))
+                else:
+                    del seq[i - 1:i]
+            nxt = compile_glosses(seq)["events"]
+            wins = channel_windows(cur, nxt)
+            sent += wins
+            cur = apply_windows(cur, wins)
+            assert cur == nxt
+        assert apply_windows(base, sent) == cur
+
+
+def test_ws_ingest_broadcasts_channel_windows():
+    from fastapi.testclient import TestClient
+    from packages.sign_timeline import apply_windows
+    from services.pipeline_server import app, settings
+
+    client = TestClient(app)
+    saved = (settings.replace_diff, settings.replace_min_events, settings.replace_min_ms, settings.replace_min_interval_ms)
+    settings.replace_diff, settings.replace_min_events, settings.replace_min_ms, settings.replace_min_interval_ms = "myers", 0, 0, 0
+    try:
+        with client.websocket_connect("/ws/timeline?sessions=dw-1&types=timeline,timeline.replace") as tl:
+            with client.websocket_connect("/ws/ingest") as ws:
+                events, kinds = None, []
+                # a same-length substitution early in a long sentence → windows; an append → plain tail
+                for text in ("속보 서울 태풍 비 경보", "속보 부산 태풍 비 경보", "속보 부산 태풍 비 경보 서울"):
+                    ws.send_json({"type": "partial", "session_id": "dw-1", "text": text})
+                    assert ws.receive_json()["ok"] is True
+                    msg = tl.receive_json()
+                    if msg["type"] == "timeline":
+                        events = msg["data"]["events"]
+                    elif "windows" in msg["data"]:
+                        assert "events" not in msg["data"]
+                        events = apply_windows(events, msg["data"]["windows"])
+                    else:
+                        events = [e for e in events if e["t_ms"] < msg["from_t_ms"]] + msg["data"]["events"]
+                    kinds.append("windows" if "windows" in msg["data"] else msg["type"])
+        assert kinds == ["timeline", "windows", "timeline.replace"]
+        assert events == client.get("/sessions/timeline", params={"session_id": "dw-1"}).json()["events"]
+    finally:
+        settings.replace_diff, settings.replace_min_events, settings.replace_min_ms, settings.replace_min_interval_ms = saved
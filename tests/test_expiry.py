@@ -0,0 +1,58 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from services import ingest_executor
+from services.expiry import ExpiryIndex
+from services import pipeline_server as ps
+
+
+def test_expiry_index_rearms_touched_keys_and_skips_discarded():
+    idx = ExpiryIndex()
+    idx.touch("a", 0)
+    idx.touch("b", 100)
+    idx.touch("c", 200)
+    idx.touch("a", 900)          # still alive: re-armed, not expired
+    idx.discard("c")
+    assert len(idx._heap) == 3   # one entry per key, touch doesn't push
+    assert idx.next_due(1000) == 1100
+    assert idx.pop_expired(1101, 1000) == ["b"]
+    assert idx.pop_expired(1500, 1000) == []
+    assert idx.next_due(1000) == 1900
+    # a shorter TTL applies without rebuilding the index
+    assert idx.pop_expired(1500, 500) == ["a"]
+    assert len(idx) == 0 and idx.next_due(1000) is None
+
+
+def test_discard_then_touch_keeps_one_heap_entry_per_key():
+    idx = ExpiryIndex()
+    for t in range(0, 10_000, 10):
+        idx.touch("k", t)
+        idx.discard("k")           # session reset / forgotten, then the same id comes back
+        idx.touch("k", t + 1)
+        idx.next_due(1000)
+        idx.pop_expired(t + 1, 1000)
+    assert len(idx._heap) == 1 and len(idx) == 1
+    assert idx.pop_expired(20_000, 1000) == ["k"]
+    assert idx._heap == [] and idx.next_due(1000) is None
+
+
+def test_expiry_hook_frees_session_state():
+    c = TestClient(ps.app)
+    with c.websocket_connect("/ws/ingest") as ws:
+        ws.send_json({"type": "partial", "session_id": "exp-1", "text": "안녕하세요 한국", "origin_ts": 1})
+        assert ws.receive_json()["ok"] is True
+    assert "exp-1" in ps.sessions and "exp-1" in ps.session_expiry
+    assert "exp-1" in ingest_executor._COMPILERS and "exp-1" in ps.manager.topic_stats
+    now = ps.session_expiry._last["exp-1"]
+    assert "exp-1" not in ps.session_expiry.pop_expired(now + 1000, 1000)
+
+    async def expire():
+        for sid in ps.session_expiry.pop_expired(now + 10_001, 10_000):
+            await ps._forget_session(sid)
+
+    asyncio.run(expire())
+    assert "exp-1" not in ps.sessions and "exp-1" not in ps.session_expiry
+    assert "exp-1" not in ingest_executor._COMPILERS
+    assert "exp-1" not in ps.manager.topic_stats
+    assert "exp-1" not in ps.stats.sessions_snapshot()
@@ -0,0 +1,62 @@
+import random
+
+from packages.incremental import IncrementalCompiler, common_prefix_len
+from packages.ksl_rules import tokenize_ko, ko_to_gloss, set_overlay_lexicon
+from packages.sign_timeline import compile_glosses
+
+
+def _full(text, **kw):
+    return compile_glosses(ko_to_gloss(tokenize_ko(text)), **kw)["events"]
+
+
+def test_common_prefix_len():
+    assert common_prefix_len("", "abc") == 0
+    assert common_prefix_len("안녕 한국", "안녕 한국 날씨") == 5
+    assert common_prefix_len("안녕 한국", "안녕 한파") == 4
+
+
+def test_incremental_matches_full_recompile():
+    rnd = random.Random(7)
+    words = "안녕하세요 오늘 한국 날씨 속보 태풍 12시 30분 1,234 이십오 (속보) 경보! 오후".split()
+    eng = IncrementalCompiler()
+    text = ""
+    for _ in range(400):
+        r = rnd.random()
+        if r < 0.6:
+            text = (text + " " + rnd.choice(words)).strip()
+        elif r < 0.8:
+            text = text[: max(0, len(text) - rnd.randint(1, 6))]
+        else:
+            text = text + rnd.choice(["", ",", ".", "\n"]) + rnd.choice(words)
+        assert eng.update(text, start_ms=100, gap_ms=40)["events"] == _full(text, start_ms=100, gap_ms=40)
+
+
+def test_incremental_reuses_prefix_and_tracks_lexicon():
+    eng = IncrementalCompiler()
+    eng.update("속보 태풍 오늘")
+    eng.update("속보 태풍 오늘 한국")
+    assert eng.stable_events > 0
+    try:
+        set_overlay_lexicon({"한국": "KOREA_X"})
+        ev = eng.update("속보 태풍 오늘 한국 날씨")["events"]
+        assert eng.stable_events == 0
+        assert ev == _full("속보 태풍 오늘 한국 날씨")
+    finally:
+        set_overlay_lexicon({})
+
+
+def test_incremental_with_multiword_lexicon():
+    rnd = random.Random(11)
+    words = "서울 지역에 호우 경보 경보가 강풍 주의보 발령 해제 , 12시".split()
+    try:
+        set_overlay_lexicon({"서울 지역": "SEOUL_AREA", "호우 경보": "HEAVY_RAIN_ALERT", "강풍 주의보 발령": "WIND_ADVISORY"})
+        eng = IncrementalCompiler()
+        text = ""
+        for _ in range(400):
+            if rnd.random() < 0.7:
+                text = (text + " " + rnd.choice(words)).strip()
+            else:
+                text = text[: max(0, len(text) - rnd.randint(1, 8))]
+            assert eng.update(text)["events"] == _full(text)
+    finally:
+        set_overlay_lexicon({})
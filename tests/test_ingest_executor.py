@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from packages.ksl_rules import tokenize_ko, ko_to_gloss, set_overlay_lexicon
+from packages.sign_timeline import compile_glosses
+from services.ingest_executor import make_executor, compile_session, apply_delta, shard_of, InlineExecutor
+
+
+def _full(text):
+    return compile_glosses(ko_to_gloss(tokenize_ko(text)))["events"]
+
+
+def _partials(words):
+    acc = []
+    for w in words:
+        acc.append(w)
+        yield " ".join(acc)
+
+
+async def _drive(pool, sessions, words):
+    events = {sid: [] for sid in sessions}
+
+    async def run(sid):
+        for text in _partials(words):
+            res = await pool.submit(sid, compile_session, sid, text, 0, 60, True, not events[sid])
+            events[sid] = apply_delta(events[sid], res)
+
+    await asyncio.gather(*[run(sid) for sid in sessions])
+    return events
+
+
+def test_shard_of_is_stable():
+    assert shard_of("ch1", 4) == shard_of("ch1", 4)
+    assert {shard_of(f"s{i}", 4) for i in range(50)} == {0, 1, 2, 3}
+    assert isinstance(make_executor(0), InlineExecutor)
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_sharded_executor_matches_full_compile(mode):
+    words = "안녕하세요 오늘 서울에서 호우 경보 발표 태풍 속보 12시 30분".split()
+    pool = make_executor(3, mode)
+    try:
+        events = asyncio.run(_drive(pool, [f"s{i}" for i in range(6)], words))
+        expected = _full(" ".join(words))
+        assert all(ev == expected for ev in events.values())
+    finally:
+        pool.shutdown()
+
+
+def test_process_shards_follow_lexicon_updates():
+    pool = make_executor(2, "process")
+    try:
+        set_overlay_lexicon({"호우 경보": "HEAVY_RAIN_ALERT"})
+        res = asyncio.run(pool.submit("x", compile_session, "x", "호우 경보", 0, 60, False, True))
+        assert [e["clip"] for e in res["events"]] == ["HEAVY_RAIN_ALERT"]
+    finally:
+        set_overlay_lexicon({})
+        pool.shutdown()
@@ -0,0 +1,107 @@
+import gzip
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from services import journal as journal_mod
+from services.journal import TimelineJournal
+
+
+def _fill(j, n=300, sessions=("a", "b", "c"), t0=1_000_000):
+    for i in range(n):
+        sid = sessions[i % len(sessions)]
+        msg = {"type": "timeline.replace", "session_id": sid, "data": {"events": [{"t_ms": i, "clip": "X" * 50}]}}
+        j.append(t0 + i, msg["type"], sid, json.dumps(msg))
+    j.flush()
+
+
+def test_range_by_session_and_time_across_segments(tmp_path):
+    j = TimelineJournal(tmp_path, segment_max_bytes=2048, block_bytes=1024, retention_s=0)
+    _fill(j)
+    snap = j.snapshot()
+    assert snap["segments"] > 1 and snap["records"] == 300
+    items = j.range("b", 1_000_100, 1_000_199)
+    assert [x["ts"] for x in items] == [t for t in range(1_000_100, 1_000_200) if (t - 1_000_000) % 3 == 1]
+    assert all(x["msg"]["session_id"] == "b" for x in items)
+    assert len(j.range(None, 1_000_000, None, limit=50)) == 50
+    # reopening rebuilds the index from disk
+    j2 = TimelineJournal(tmp_path, retention_s=0)
+    assert j2.range("b", 1_000_100, 1_000_199) == items
+    assert all(p.read_bytes()[:2] == b"\x1f\x8b" for p in tmp_path.glob("*.jsonl.gz"))
+
+
+def test_range_reads_only_matching_blocks(tmp_path, monkeypatch):
+    j = TimelineJournal(tmp_path, block_bytes=2048, retention_s=0)
+    _fill(j, n=200, sessions=("a",))
+    _fill(j, n=200, sessions=("z",), t0=2_000_000)
+    calls = []
+    real = gzip.decompress
+    monkeypatch.setattr(journal_mod.gzip, "decompress", lambda b: calls.append(1) or real(b))
+    assert len(j.range("z", 0, None)) == 200
+    z_blocks = len(calls)
+    calls.clear()
+    assert len(j.range("z", 2_000_190, 2_000_199)) == 10
+    assert 0 < len(calls) < z_blocks
+
+
+def test_pending_records_are_queryable_and_retention(tmp_path):
+    j = TimelineJournal(tmp_path, retention_s=0)
+    j.append(5, "timeline", "s", json.dumps({"type": "timeline"}))
+    assert [x["ts"] for x in j.range("s")] == [5]
+    old = TimelineJournal(tmp_path / "r", segment_max_s=0, retention_s=1)
+    _fill(old, n=10, t0=1000)  # ts far in the past
+    _fill(old, n=10, t0=int(time.time() * 1000))
+    assert old.snapshot()["segments"] == 1
+
+
+def test_records_stay_visible_while_their_block_is_written(tmp_path, monkeypatch):
+    j = TimelineJournal(tmp_path, retention_s=0)
+    for ts in (1, 2, 3):
+        j.append(ts, "timeline", "s", json.dumps({"type": "timeline"}))
+    seen = []
+    real = gzip.compress
+    # a query running between compression and indexing must still see every record
+    monkeypatch.setattr(journal_mod.gzip, "compress", lambda b, **kw: seen.append(j.range("s")) or real(b, **kw))
+    j.flush()
+    assert [x["ts"] for x in seen[0]] == [1, 2, 3]
+    assert [x["ts"] for x in j.range("s")] == [1, 2, 3]
+    assert j.snapshot()["records"] == 3
+
+
+def test_journal_gets_records_the_log_backlog_drops(tmp_path):
+    import threading
+    from services.log_writer import TimelineLogWriter
+
+    gate = threading.Event()
+
+    class Stalled(TimelineLogWriter):
+        def _write_batch(self, batch):
+            gate.wait()
+            super()._write_batch(batch)
+
+    j = TimelineJournal(tmp_path / "j", retention_s=0)
+    w = Stalled(tmp_path / "timeline.log", tmp_path / "last.json", max_backlog=2, batch_size=1, flush_interval_s=0.01, journal=j)
+    w.start()
+    for i in range(20):
+        w.submit({"ts": i, "type": "timeline", "session_id": "s"}, json.dumps({"i": i}))
+    assert w.dropped > 0
+    gate.set()
+    w.close()
+    assert [x["msg"]["i"] for x in j.range("s")] == list(range(20))
+
+
+def test_events_range_endpoint():
+    from services.pipeline_server import app, timeline_writer
+    c = TestClient(app)
+    timeline_writer.start()  # normally started by the app's startup hook
+    t0 = int(time.time() * 1000)
+    r = c.post("/ingest_text", json={"text": "안녕하세요 한국", "id": "journal-check"})
+    assert r.status_code == 200
+    items = []
+    for _ in range(50):
+        items = c.get("/events/range", params={"from": t0}).json()["items"]
+        if any(x["msg"]["data"].get("id") == "journal-check" for x in items):
+            break
+        time.sleep(0.05)
+    assert any(x["msg"]["data"].get("id") == "journal-check" for x in items)
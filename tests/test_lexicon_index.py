@@ -0,0 +1,62 @@
+import random
+
+from packages.ksl_rules import tokenize_ko, ko_to_gloss, set_overlay_lexicon, LexiconIndex, strip_particle
+
+
+def test_particle_stripping():
+    assert "서울" in strip_particle("서울에서")
+    glosses = ko_to_gloss(tokenize_ko("서울에서 비가"))
+    assert [g for g, _ in glosses] == ["SEOUL", "RAIN"]
+    # stems must be lexicon entries: unknown words keep the fallback
+    assert ko_to_gloss(["어린이"]) == [("어린이", 0.5)]
+
+
+def test_multiword_longest_match_and_overlay_rebuild():
+    try:
+        set_overlay_lexicon({"호우 경보": "HEAVY_RAIN_ALERT", "호우 경보 해제": "HEAVY_RAIN_ALERT_LIFTED"})
+        assert ko_to_gloss(tokenize_ko("호우 경보가 발령")) == [("HEAVY_RAIN_ALERT", 0.85), ("발령", 0.5)]
+        assert [g for g, _ in ko_to_gloss(tokenize_ko("호우 경보 해제"))] == ["HEAVY_RAIN_ALERT_LIFTED"]
+        set_overlay_lexicon({})
+        assert [g for g, _ in ko_to_gloss(tokenize_ko("호우 경보"))] == ["HEAVY_RAIN", "ALERT"]
+    finally:
+        set_overlay_lexicon({})
+
+
+def test_large_lexicon_lookup_cost_is_flat():
+    rnd = random.Random(5)
+    syl = "가나다라마바사아자차카타파하거너더러머버서어저처커터퍼허"
+    big = {}
+    while len(big) < 100_000:
+        phrase = " ".join("".join(rnd.choice(syl) for _ in range(rnd.randint(2, 4))) for _ in range(rnd.randint(1, 3)))
+        big[phrase] = "G" + str(len(big))
+    idx = LexiconIndex(big, tokenize_ko)
+    assert idx.size == 100_000 and idx.max_len == 3
+    text = " ".join(rnd.choice(list(big)) for _ in range(700))
+    toks = tokenize_ko(text)
+
+    class Reads(list):
+        # counts the token reads match() makes: one per trie step
+        n = 0
+
+        def __getitem__(self, i):
+            Reads.n += 1
+            return list.__getitem__(self, i)
+
+    def reads(index):
+        Reads.n = 0
+        probe = Reads(toks)
+        for i in range(len(toks)):
+            index.match(probe, i)
+        return Reads.n
+
+    small_idx = LexiconIndex(dict(list(big.items())[:100]), tokenize_ko)
+    assert small_idx.max_len == idx.max_len
+    # steps per position are bounded by the longest phrase, not by the number of entries
+    assert reads(idx) <= len(toks) * idx.max_len
+    assert reads(small_idx) <= len(toks) * small_idx.max_len
+    try:
+        set_overlay_lexicon(big)
+        glosses = ko_to_gloss(toks)
+        assert all(g.startswith("G") for g, _ in glosses)
+    finally:
+        set_overlay_lexicon({})
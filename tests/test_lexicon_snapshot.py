@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from packages.ksl_rules import current_lexicon, set_overlay_lexicon, ko_to_gloss
+from services.pipeline_server import app, _publish_overlay
+
+
+def test_snapshot_versioning_and_immutability():
+    old = current_lexicon()
+    try:
+        new = set_overlay_lexicon({"한국": "KOREA_NEW"})
+        assert new.version == old.version + 1 and current_lexicon() is new
+        with pytest.raises(TypeError):
+            new.overlay["x"] = "Y"  # type: ignore[index]
+        # readers holding the old snapshot keep a consistent view
+        assert ko_to_gloss(["한국"], old) == [("KOREA", 0.9)]
+        assert ko_to_gloss(["한국"]) == [("KOREA_NEW", 0.9)]
+    finally:
+        set_overlay_lexicon({})
+
+
+def test_timeline_meta_records_lexicon_version():
+    c = TestClient(app)
+    r = c.post("/ingest_text", json={"text": "안녕하세요 한국"})
+    if r.status_code == 401:
+        return
+    assert r.json()["timeline"]["meta"]["lexicon_version"] == current_lexicon().version
+
+
+def test_hot_reload_does_not_stall_event_loop():
+    big = {f"단어{i}": f"G{i}" for i in range(100_000)}
+    before = current_lexicon().version
+
+    async def run():
+        seen = []
+        done = False
+
+        async def ticker():
+            while not done:
+                seen.append(current_lexicon().version)
+                await asyncio.sleep(0)
+
+        t = asyncio.create_task(ticker())
+        snap = await _publish_overlay(big)
+        done = True
+        await t
+        return snap, seen
+
+    try:
+        snap, seen = asyncio.run(run())
+        assert snap.index.size >= 100_000 and snap.version == before + 1
+        # the loop kept running while the index was built in a worker thread: it observed the
+        # old version first and the new one only once published
+        assert seen[0] == before and seen.count(before) > 1
+        assert set(seen) <= {before, snap.version}
+    finally:
+        set_overlay_lexicon({})
+
+
+def test_stale_concurrent_update_does_not_overwrite_newer(monkeypatch):
+    from packages.ksl_rules import rules
+
+    gate, building = threading.Event(), threading.Event()
+    real = rules._build_index
+
+    def slow_for_old(overlay):
+        if overlay.get("한국") == "OLD":
+            building.set()
+            gate.wait(5)
+        return real(overlay)
+
+    monkeypatch.setattr(rules, "_build_index", slow_for_old)
+    base = current_lexicon().version
+    try:
+        out = {}
+        old = threading.Thread(target=lambda: out.setdefault("old", set_overlay_lexicon({"한국": "OLD"})))
+        old.start()
+        building.wait(5)  # the older update reserved its version and is still building
+        new = set_overlay_lexicon({"한국": "NEW"})
+        gate.set()
+        old.join(5)
+        assert new.version == base + 2
+        # the older build finished last but is refused; both callers see the newer snapshot
+        assert out["old"] is new and current_lexicon() is new
+        assert ko_to_gloss(["한국"]) == [("NEW", 0.9)]
+    finally:
+        gate.set()
+        set_overlay_lexicon({})
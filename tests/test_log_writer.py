@@ -0,0 +1,79 @@
+import json
+import threading
+
+from services.log_writer import TimelineLogWriter
+
+
+def test_batches_records_and_coalesces_last_snapshot(tmp_path):
+    w = TimelineLogWriter(tmp_path / "timeline.log", tmp_path / "last.json", flush_interval_s=0.01, last_debounce_s=10)
+    w.start()
+    for i in range(100):
+        assert w.submit({"ts": i, "type": "timeline"}, json.dumps({"i": i}))
+    assert json.loads(w.last_text) == {"i": 99}
+    w.close()
+    lines = (tmp_path / "timeline.log").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(x)["ts"] for x in lines] == list(range(100))
+    assert w.batches < 100 and w.written == 100
+    # only the newest snapshot is written (debounced, flushed on close)
+    assert json.loads((tmp_path / "last.json").read_text(encoding="utf-8")) == {"i": 99}
+
+
+def test_stalled_disk_drops_instead_of_blocking(tmp_path):
+    gate = threading.Event()
+
+    class Stalled(TimelineLogWriter):
+        def _write_batch(self, batch):
+            gate.wait()
+            super()._write_batch(batch)
+
+    w = Stalled(tmp_path / "timeline.log", tmp_path / "last.json", max_backlog=5, batch_size=1, flush_interval_s=0.01)
+    w.start()
+    results = [w.submit({"ts": i}) for i in range(20)]
+    assert results.count(False) == w.dropped > 0
+    assert w.backlog <= 5
+    gate.set()
+    w.close()
+    assert w.written + w.dropped == 20
+
+
+def test_write_failures_count_separately_and_reach_the_drop_hook(tmp_path):
+    lost = []
+
+    class Broken(TimelineLogWriter):
+        def _write_batch(self, batch):
+            raise OSError("disk gone")
+
+    w = Broken(tmp_path / "timeline.log", tmp_path / "last.json", flush_interval_s=0.01, on_drop=lost.append)
+    assert w.submit({"ts": 1}) and w.submit({"ts": 2})
+    assert w._thread is None  # nothing runs until start()
+    w.start()
+    w.close()
+    assert w.dropped_io == 2 and w.dropped_full == 0 and w.dropped == 2
+    assert sum(lost) == 2
+
+
+def test_journal_backlog_is_bounded_during_a_stall(tmp_path):
+    class Journal:
+        def __init__(self):
+            self.records = []
+
+        def append(self, *rec):
+            self.records.append(rec)
+
+        def maybe_flush(self):
+            pass
+
+        def flush(self):
+            pass
+
+    lost = []
+    j = Journal()
+    w = TimelineLogWriter(tmp_path / "timeline.log", tmp_path / "last.json", journal=j, journal_max_backlog=3,
+                          on_journal_drop=lost.append)
+    for i in range(5):  # writer thread not started: nothing drains
+        w.submit({"ts": i, "type": "timeline"}, json.dumps({"i": i}))
+    snap = w.snapshot()
+    assert snap["journal_backlog"] == 3 and snap["journal_dropped"] == 2 and sum(lost) == 2
+    w.start()
+    w.close()
+    assert [r[0] for r in j.records] == [0, 1, 2]
@@ -34,20 +34,26 @@ def test_ingest_text_and_ws_broadcast():
         assert "data" in msg and len(msg["data"]["events"]) > 0
 
 
-def test_ws_ingest_incremental():
-    with client.websocket_connect("/ws/timeline") as ws_tl:
+def test_ws_ingest_incremental(monkeypatch):
+    from services.pipeline_server import settings
+
+    # a one-word append is below the default REPLACE_MIN_* thresholds and would not be broadcast
+    monkeypatch.setattr(settings, "replace_min_events", 0)
+    monkeypatch.setattr(settings, "replace_min_ms", 0)
+    monkeypatch.setattr(settings, "replace_min_interval_ms", 0)
+    with client.websocket_connect("/ws/timeline?sessions=incr-1&types=timeline,timeline.replace") as ws_tl:
         with client.websocket_connect("/ws/ingest") as ws_in:
-            ws_in.send_json({"type": "partial", "session_id": "test", "text": "안녕하세요"})
+            ws_in.send_json({"type": "partial", "session_id": "incr-1", "text": "안녕하세요"})
             # ack
             ack = ws_in.receive_json()
             assert ack["ok"] is True
             # timeline
             msg1 = ws_tl.receive_json()
-            assert msg1["type"] in ("timeline", "timeline.replace")
+            assert msg1["type"] == "timeline"
             # send another partial
-            ws_in.send_json({"type": "partial", "session_id": "test", "text": "안녕하세요 한국"})
+            ws_in.send_json({"type": "partial", "session_id": "incr-1", "text": "안녕하세요 한국"})
             ack2 = ws_in.receive_json()
             assert ack2["ok"] is True
             msg2 = ws_tl.receive_json()
-            assert msg2["type"] in ("timeline", "timeline.replace")
-
+            assert msg2["type"] == "timeline.replace"
+            assert any(e["clip"] == "KOREA" for e in msg2["data"]["events"])
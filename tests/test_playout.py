@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from packages.sign_timeline import EventArrays
+from services.delta_history import apply_message
+from services.playout import Playout
+
+
+def _events(n, step=100):
+    return EventArrays.from_dicts([{"t_ms": i * step, "clip": f"C{i}", "dur_ms": step, "channel": "default"} for i in range(n)])
+
+
+def test_window_moves_with_the_playhead_and_corrections_stay_in_the_future():
+    ev = _events(20)
+    po = Playout(500, 0, now_ms=0)
+    assert po.due(ev, 0) == (0, 0, 5, False)
+    assert po.due(ev, 0) is None  # the window did not move
+    assert po.due(ev, 300) == (500, 5, 8, False)
+    # a change behind the playhead is re-sent from the playhead only
+    po.changed(200)
+    assert po.late == 1
+    assert po.due(ev, 300) == (300, 3, 8, True)
+    po.changed(900)  # not sent yet: nothing to correct
+    assert po.due(ev, 300) is None
+    # the playhead waits at the end of the known events
+    assert po.due(ev, 10000) == (800, 8, 20, False)
+    assert po.playhead == 2000 and not po.pending(ev)
+    ev.splice(20, 20, [{"t_ms": 2000, "clip": "N", "dur_ms": 100, "channel": "default"}])
+    assert po.pending(ev)
+    assert po.due(ev, 10000) == (1901, 20, 21, False)
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def test_session_publishes_look_ahead_slices(monkeypatch):
+    from services import pipeline_server as ps
+    from services.pipeline_server import Subscription
+
+    monkeypatch.setattr(ps.settings, "playout_window_ms", 400)
+    monkeypatch.setattr(ps.settings, "replace_min_interval_ms", 0)
+
+    async def main():
+        ws = FakeWS()
+        await ps.manager.connect(ws, Subscription(sessions=["po-1"]))
+
+        async def play(ms):
+            st.playout.wall_ms -= ms
+            await ps._playout_tick("po-1", st)
+            await ps.manager.drain()  # one frame per slice (no coalescing in the client queue)
+
+        await ps._ingest_local(ps.StreamIn(type="partial", session_id="po-1", text="속보 서울 태풍 비 경보 부산 날씨"))
+        await ps.manager.drain()
+        st = ps.sessions["po-1"]
+        for _ in range(2):
+            await play(300)
+        # the second word is sent but not played yet
+        await ps._ingest_local(ps.StreamIn(type="partial", session_id="po-1", text="속보 부산 태풍 비 경보 부산 날씨"))
+        await ps.manager.drain()
+        while st.playout.pending(st.events):
+            await play(300)
+        await ps.manager.disconnect(ws)
+        await ps._forget_session("po-1")
+        return ws.sent, st
+
+    sent, st = asyncio.run(main())
+    first, rest = sent[0], sent[1:]
+    assert first["type"] == "timeline" and first["data"]["events"]
+    assert all(e["t_ms"] < first["playhead_ms"] + 400 for e in first["data"]["events"])
+    assert len(first["data"]["events"]) < len(st.events)
+    assert rest and all(m["type"] == "timeline.replace" for m in rest)
+    # the correction went out right away, for the unplayed part only
+    assert any(m["data"]["events"][:1] and m["data"]["events"][0]["clip"] == "BUSAN" for m in rest)
+    # nothing already played is ever replaced
+    assert all(m["from_t_ms"] >= m["playhead_ms"] for m in rest)
+    state = []
+    for m in sent:
+        state = apply_message(state, m)
+    assert state == st.events.to_dicts()
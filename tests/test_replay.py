@@ -0,0 +1,45 @@
+import asyncio
+import gzip
+
+from packages.ksl_rules import tokenize_ko, ko_to_gloss
+from packages.sign_timeline import compile_glosses
+from services.replay import write_recording, read_recording, run_inproc, diff_golden, normalize_state
+
+
+def _stream(sid, words, step=100):
+    acc, items = [], []
+    for i, w in enumerate(words):
+        acc.append(w)
+        items.append((i * step, {"type": "partial", "session_id": sid, "text": " ".join(acc)}))
+    items.append((len(words) * step, {"type": "final", "session_id": sid, "text": " ".join(acc)}))
+    return items
+
+
+def test_recording_roundtrip_is_delta_encoded(tmp_path):
+    words = "안녕하세요 오늘 한국 날씨 속보 태풍".split() * 20
+    items = sorted(_stream("a", words) + _stream("b", words[::-1], step=70), key=lambda x: x[0])
+    path = tmp_path / "rec.gz"
+    write_recording(path, items)
+    assert read_recording(path) == items
+    raw = gzip.decompress(path.read_bytes())
+    full = sum(len(m["text"].encode("utf-8")) for _, m in items)
+    assert len(raw) < full / 10
+
+
+def test_inproc_replay_matches_full_compile_and_golden(tmp_path):
+    words = "안녕하세요 오늘 한국 날씨 속보 태풍 서울".split()
+    items = sorted(_stream("rp1", words) + _stream("rp2", words[2:]), key=lambda x: x[0])
+    path = tmp_path / "rec.gz"
+    write_recording(path, items)
+    out = asyncio.run(run_inproc(read_recording(path), speed=0, max_ingest_rps=10**9))
+    rep = out["report"]
+    assert rep["messages"] == len(items) and rep["rate_limited"] == 0 and rep["outputs"] >= 2
+    expected = normalize_state({
+        "rp1": {"text": " ".join(words), "events": compile_glosses(ko_to_gloss(tokenize_ko(" ".join(words))))["events"]},
+        "rp2": {"text": " ".join(words[2:]), "events": compile_glosses(ko_to_gloss(tokenize_ko(" ".join(words[2:]))))["events"]},
+    })
+    golden = {"sessions": expected}
+    assert diff_golden(golden, {"sessions": out["sessions"]}) == []
+    broken = {"sessions": dict(expected, rp2={"text": "x", "events": expected["rp2"]["events"][:-1]})}
+    diffs = diff_golden(broken, {"sessions": out["sessions"]})
+    assert any("rp2: events differ" in d for d in diffs) and any("final text" in d for d in diffs)
@@ -0,0 +1,54 @@
+import random
+
+from packages.sign_timeline import EventArrays, compile_glosses_arrays
+from services.ingest_executor import apply_delta, apply_delta_arrays
+from services.session_state import SessionState, SlidingWindowLimiter
+
+
+def _reference(limit_at, times):
+    recent, out = [], []
+    for k, now in enumerate(times):
+        recent = [t for t in recent if now - t <= 1000]
+        ok = len(recent) < max(1, limit_at(k))
+        if ok:
+            recent.append(now)
+        out.append(ok)
+    return out
+
+
+def test_limiter_matches_list_filter_semantics():
+    rnd = random.Random(3)
+    for _ in range(50):
+        now, times = 0, []
+        for _ in range(400):
+            now += rnd.randint(0, 150)
+            times.append(now)
+        a, b = rnd.choice((1, 3, 20)), rnd.choice((1, 2, 7, 30))
+        limit_at = lambda k: a if k < 200 else b  # noqa: E731 (runtime POST /config change)
+        lim = SlidingWindowLimiter()
+        got = [lim.allow(t, limit_at(k)) for k, t in enumerate(times)]
+        assert got == _reference(limit_at, times)
+        assert len(lim) <= max(a, b)
+
+
+def test_event_arrays_splice_matches_list_delta():
+    gl = [("BREAKING", 0.9), ("KOREA", 0.85), ("WEATHER", 0.5), ("RAIN", 0.9)]
+    old = compile_glosses_arrays(gl).to_dicts()
+    # same duration, different clip: a window in the middle changes, the suffix is kept
+    new = compile_glosses_arrays(gl[:2] + [("WEATHER", 0.7)] + gl[3:]).to_dicts()
+    start = next(i for i, (x, y) in enumerate(zip(old, new)) if x != y)
+    end = max(i for i, (x, y) in enumerate(zip(old, new)) if x != y) + 1
+    assert end < len(new)
+    res = {"start": start, "end": end, "events": new[start:end], "n_events": len(new)}
+    assert apply_delta(old, res) == new
+    ev = EventArrays.from_dicts(old)
+    apply_delta_arrays(ev, res)
+    assert ev.to_dicts() == new
+
+
+def test_session_state_is_slotted_and_lazy():
+    st = SessionState()
+    assert not hasattr(st, "__dict__")
+    assert st._lock is None and st._meta is None
+    st.meta["model"] = "base"
+    assert st.meta == {"model": "base"} and st.lock is st.lock
@@ -11,3 +11,16 @@ def test_sessions_list_and_reset():
     r2 = client.post('/sessions/reset', json={})
     assert r2.status_code in (200, 401)
 
+
+
+def test_mid_sentence_substitution_matches_fresh_compile():
+    from packages.ksl_rules import tokenize_ko, ko_to_gloss
+    from packages.sign_timeline import compile_glosses
+    client = TestClient(app)
+    with client.websocket_connect('/ws/ingest') as ws:
+        # HELLO is shorter than KOREA: every later event shifts
+        for text in ("속보 한국 태풍", "속보 안녕하세요 태풍"):
+            ws.send_json({"type": "partial", "session_id": "sub-1", "text": text})
+            assert ws.receive_json()["ok"] is True
+    got = client.get('/sessions/timeline', params={"session_id": "sub-1"}).json()["events"]
+    assert got == compile_glosses(ko_to_gloss(tokenize_ko("속보 안녕하세요 태풍")))["events"]
@@ -0,0 +1,69 @@
+import math
+import random
+
+from fastapi.testclient import TestClient
+
+from services.sketch import DDSketch, RollingCounter, RollingSketch
+from services.pipeline_server import app, Stats
+
+
+def _true_q(sorted_vals, q):
+    return sorted_vals[max(0, math.ceil(q * len(sorted_vals)) - 1)]
+
+
+def test_ddsketch_relative_accuracy_and_merge():
+    rnd = random.Random(7)
+    xs = [rnd.lognormvariate(5, 1.2) for _ in range(20000)]
+    a, b = DDSketch(), DDSketch()
+    for i, x in enumerate(xs):
+        (a if i % 2 else b).add(x)
+    a.merge(b)
+    assert a.count == len(xs)
+    s = sorted(xs)
+    for q, est in zip((0.5, 0.9, 0.99), a.quantiles([0.5, 0.9, 0.99])):
+        t = _true_q(s, q)
+        assert abs(est - t) / t <= 0.011
+    assert len(a.bins) < 1000
+    assert DDSketch().quantiles([0.5]) == [None]
+
+
+def test_rolling_windows():
+    c = RollingCounter(slot_s=10, slots=90)
+    sk = RollingSketch(slot_s=10, slots=90)
+    t0 = 1_000_000.0
+    for i in range(900):  # one per second for 15 minutes, value = minute index
+        c.add(now=t0 + i)
+        sk.add(float(i // 60 + 1), now=t0 + i)
+    now = t0 + 899
+    assert c.total(60, now) == 60 and c.total(900, now) == 900
+    assert abs(c.rate(300, now) - 1.0) < 1e-9
+    assert sk.window(60, now).quantiles([0.5])[0] == sk.window(60, now).quantiles([0.01])[0]
+    assert sk.window(900, now).count == 900
+    # old slots are recycled, memory stays at `slots`
+    c.add(now=now + 3600)
+    assert c.total(900, now + 3600) == 1
+
+
+def test_stats_per_session_breakdown_is_capped():
+    st = Stats()
+    st._sessions_max = 3
+    for i in range(5):
+        sid = f"s{i}"
+        st.on_ingest("partial", sid)
+        st.on_timeline(sid)
+        st.on_latency(100 + i, sid)
+    snap = st.sessions_snapshot()
+    assert sorted(snap) == ["s2", "s3", "s4"]
+    assert snap["s4"]["latency_ms_5m"]["p50"] is not None
+    full = st.snapshot()
+    assert full["latency_ms"]["p50"] is not None and full["latency_windows_ms"]["15m"]["count"] == 5
+    assert full["rates_per_sec"]["ingest"]["1m"] > 0
+
+
+def test_stats_sessions_endpoint():
+    c = TestClient(app)
+    with c.websocket_connect("/ws/ingest") as ws:
+        ws.send_json({"type": "partial", "session_id": "sk-1", "text": "안녕하세요", "origin_ts": 1})
+        assert ws.receive_json()["ok"] is True
+    r = c.get("/stats/sessions", params={"session_id": "sk-1"}).json()
+    assert r["count"] == 1 and r["items"]["sk-1"]["ingest_rate_per_sec_5m"] > 0
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from array import array
+
+from services.delta_history import apply_message
+from services.stability import StabilityTracker
+
+
+def test_prefix_is_released_after_k_partials_or_the_hold_time():
+    tr = StabilityTracker()
+    tr.update(0, 2, now_ms=0)      # A B
+    assert tr.stable(0, k=2, hold_ms=500) == 0
+    tr.update(2, 3, now_ms=100)    # A B C: A B seen twice
+    assert tr.stable(100, k=2, hold_ms=500) == 2
+    tr.update(2, 3, now_ms=200)    # A B X: the tail flipped
+    assert tr.stable(200, k=2, hold_ms=500) == 2
+    assert tr.stable(700, k=2, hold_ms=500) == 3  # X held long enough
+    assert tr.flip_rate > 0 and tr.hold_ms(100, 1100) > 100
+
+
+def test_corrected_published_events_wait_for_the_correction():
+    tr = StabilityTracker()
+    tr.update(0, 3, now_ms=0)
+    assert tr.due(0, 3) is None
+    assert tr.due(2, 3) == (0, 2)
+    tr.published(array("q", [0, 100, 200]), 2)
+    tr.update(1, 3, now_ms=10)     # event 1 changed after it was sent
+    assert tr.pub_clean == 1 and tr.pending(3)
+    assert tr.due(1, 3) is None    # the stale event stays until its replacement is released
+    assert tr.due(2, 3) == (1, 2)
+    # everything released and shorter than what clients hold: the extra events are dropped
+    tr.published(array("q", [0, 100, 200]), 3)
+    tr.update(2, 2, now_ms=20)
+    assert tr.due(2, 2) == (2, 2)
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def test_flapping_tail_is_not_broadcast(monkeypatch):
+    from services import pipeline_server as ps
+    from services.pipeline_server import Subscription
+
+    monkeypatch.setattr(ps.settings, "stability_k", 2)
+
+    async def main():
+        ws = FakeWS()
+        await ps.manager.connect(ws, Subscription(sessions=["st-1"]))
+        texts = ["속보 서울", "속보 서울 태풍", "속보 서울 부산", "속보 서울 태풍", "속보 서울 부산", "속보 서울 태풍 비"]
+        for text in texts:
+            await ps._ingest_local(ps.StreamIn(type="partial", session_id="st-1", text=text))
+            await ps.manager.drain()
+        await ps._ingest_local(ps.StreamIn(type="final", session_id="st-1", text=texts[-1]))
+        await ps.manager.drain()
+        await ps.manager.disconnect(ws)
+        events = ps.sessions["st-1"].events.to_dicts()
+        await ps._forget_session("st-1")
+        return ws.sent, events
+
+    sent, events = asyncio.run(main())
+    assert 2 <= len(sent) < 7 and sent[0]["type"] == "timeline"
+    assert all(e["clip"] != "BUSAN" for m in sent for e in m["data"]["events"])
+    state = []
+    for m in sent:
+        state = apply_message(state, m)
+    assert state == events
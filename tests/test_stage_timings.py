@@ -0,0 +1,49 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from services.ingest_executor import compile_session
+from services.spans import StageTimings, _NULL
+from services.pipeline_server import app, stage_timings
+
+
+def test_disabled_spans_are_noop():
+    t = StageTimings(enabled=False)
+    assert t.span("x") is _NULL
+    with t.span("x"):
+        pass
+    t.observe("y", 1.0)
+    assert t.snapshot() == {}
+
+
+def test_span_and_snapshot():
+    t = StageTimings(window_s=60, slot_s=10)
+    for i in range(1, 101):
+        t.observe("compile", float(i))
+    with t.span("broadcast"):
+        pass
+    snap = t.snapshot()
+    # quantiles from the sketch: within its 1% relative accuracy
+    assert snap["compile"]["count"] == 100
+    assert abs(snap["compile"]["p50"] - 50) <= 0.5 and abs(snap["compile"]["p99"] - 99) <= 1.0
+    assert snap["broadcast"]["count"] == 1
+    # samples older than the window leave the percentiles (count and mean are cumulative)
+    later = t.snapshot(now=time.time() + 120)
+    assert later["compile"]["p50"] is None and later["compile"]["count"] == 100
+
+
+def test_compile_session_reports_worker_timings():
+    res = compile_session("timing-test", "안녕하세요 한국 날씨", 0, 60, True, True, True)
+    assert set(res["timings"]) == {"tokenize", "gloss", "compile", "diff", "worker"}
+    assert compile_session("timing-test", "안녕하세요", 0, 60, True)["timings"] is None
+
+
+def test_stats_has_stage_breakdown():
+    c = TestClient(app)
+    with c.websocket_connect("/ws/ingest") as ws:
+        ws.send_json({"type": "partial", "session_id": "stage-test", "text": "안녕하세요 한국"})
+        assert ws.receive_json()["ok"] is True
+    stages = c.get("/stats").json()["stages_ms"]
+    assert stage_timings.enabled
+    for stage in ("tokenize", "gloss", "compile", "diff", "queue", "apply", "broadcast", "log", "total"):
+        assert stages[stage]["count"] >= 1
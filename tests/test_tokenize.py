@@ -0,0 +1,39 @@
+import random
+
+from packages.ksl_rules import tokenize_ko, tokenize_ko_spans
+
+
+def _ref(text):
+    seps = ".!?;:()[]{}\"'\n\t"
+    for s in seps:
+        text = text.replace(s, " ")
+    text = " ".join([w.replace(",", "") for w in text.split()])
+    return [t for t in text.strip().split() if t]
+
+
+def test_tokenize_matches_reference():
+    rnd = random.Random(3)
+    alphabet = list("안녕한국날씨12,") + list(".!?;:()[]{}\"'\n\t ") + ["　", "\r"]
+    for _ in range(2000):
+        s = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+        assert tokenize_ko(s) == _ref(s), repr(s)
+
+
+def test_tokenize_spans_offsets():
+    text = "속보: 피해 1,234건 (서울)"
+    spans = tokenize_ko_spans(text)
+    assert [t for t, _, _ in spans] == tokenize_ko(text) == ["속보", "피해", "1234건", "서울"]
+    for tok, s, e in spans:
+        assert text[s:e].replace(",", "") == tok
+    assert len(spans) == 4 and spans[2] == ("1234건", spans.starts[2], spans.ends[2])
+
+
+def test_tokenize_spans_match_tokens_on_random_text():
+    rnd = random.Random(5)
+    alphabet = list("안녕한국날씨12,") + list(".!?;:()[]{}\"'\n\t  ") + ["　", "\r"]
+    for _ in range(2000):
+        s = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+        spans = tokenize_ko_spans(s)
+        assert [t for t, _, _ in spans] == tokenize_ko(s), repr(s)
+        for tok, a, b in spans:
+            assert s[a:b].replace(",", "") == tok and _ref(s[a:b]) == [tok]
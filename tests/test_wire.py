@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+from services import wire
+from services.pipeline_server import ConnectionManager
+
+
+class RawWS:
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.frames.append(text)
+
+
+def test_dumps_backends_agree():
+    msg = {"type": "timeline", "data": {"events": [{"t_ms": 0, "clip": "안녕", "confidence": 0.85}]}}
+    try:
+        outs = set()
+        for b in ("json", "auto"):
+            wire.set_backend(b)
+            outs.add(wire.dumps(msg))
+        assert len(outs) == 1 and json.loads(outs.pop()) == msg
+        assert wire.dumps({1: "x"}) == '{"1":"x"}'
+    finally:
+        wire.set_backend("auto")
+
+
+def test_broadcast_sends_preencoded_text_to_all():
+    async def main():
+        m = ConnectionManager()
+        clients = [RawWS() for _ in range(5)]
+        for ws in clients:
+            await m.connect(ws)
+        msg = {"type": "timeline", "session_id": "s", "data": {"events": []}}
+        text = wire.dumps(msg)
+        await m.broadcast_json(msg, text)
+        await m.drain()
+        assert all(ws.frames == [text] and ws.frames[0] is text for ws in clients)
+
+    asyncio.run(main())
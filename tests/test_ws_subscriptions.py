@@ -0,0 +1,189 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from services.pipeline_server import app, ConnectionManager, Subscription
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def _timeline(sid):
+    return {"type": "timeline", "session_id": sid, "data": {"events": [
+        {"t_ms": 0, "clip": "A", "channel": "default"},
+        {"t_ms": 0, "clip": "F", "channel": "face"},
+    ]}}
+
+
+def test_topic_index_routes_only_to_subscribers():
+    async def main():
+        m = ConnectionManager()
+        a, b, every, face = FakeWS(), FakeWS(), FakeWS(), FakeWS()
+        await m.connect(a, Subscription(sessions=["s1"]))
+        await m.connect(b, Subscription(sessions=["s2"], types=["timeline.replace"]))
+        await m.connect(every)
+        await m.connect(face, Subscription(sessions=["s1"], channels=["face"]))
+        await m.broadcast_json(_timeline("s1"))
+        await m.broadcast_json(_timeline("s2"))
+        await m.broadcast_json({"type": "stats", "data": {}})
+        await m.drain()
+        assert [x["session_id"] for x in a.sent if x["type"] == "timeline"] == ["s1"]
+        assert b.sent == []
+        assert len(every.sent) == 3
+        assert face.sent[0]["data"]["events"] == [{"t_ms": 0, "clip": "F", "channel": "face"}]
+        topics = m.topic_snapshot()
+        assert topics["s1"]["fanout_total"] == 3 and topics["s1"]["bytes_sent"] > 0
+        assert topics["s2"]["fanout_total"] == 1
+        # resubscribe moves the socket between topics; disconnect clears the index
+        await m.subscribe(b, Subscription(sessions=["s1"]))
+        await m.broadcast_json(_timeline("s1"))
+        await m.drain()
+        assert len(b.sent) == 1
+        for ws in (a, b, every, face):
+            await m.disconnect(ws)
+        assert not m._by_session and not m._all and not m.subs
+
+    asyncio.run(main())
+
+
+def test_ws_timeline_query_filter():
+    c = TestClient(app)
+    with c.websocket_connect("/ws/timeline?types=timeline&channels=default") as ws:
+        r = c.post("/ingest_text", json={"text": "안녕하세요 한국 날씨"})
+        assert r.status_code == 200
+        msg = ws.receive_json()
+        assert msg["type"] == "timeline"
+        assert msg["data"]["events"] and all(e["channel"] == "default" for e in msg["data"]["events"])
+        ws.send_text(json.dumps({"op": "subscribe", "sessions": ["x"]}))
+        ack = ws.receive_json()
+        assert ack == {"type": "subscribed", "data": {"sessions": ["x"], "types": None, "channels": None}}
+
+
+class StalledWS(FakeWS):
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def send_text(self, text):
+        await self.release.wait()
+        await super().send_text(text)
+
+
+def _replace(sid, from_t, clips):
+    return {"type": "timeline.replace", "session_id": sid, "from_t_ms": from_t,
+            "data": {"id": "b", "events": [{"t_ms": t, "clip": c, "channel": "default"} for t, c in clips]}}
+
+
+def test_stalled_client_does_not_block_broadcast():
+    async def main():
+        m = ConnectionManager(max_queue=4, slow_policy="drop_oldest")
+        slow, fast = StalledWS(), FakeWS()
+        await m.connect(slow)
+        await m.connect(fast)
+        for i in range(10):
+            await asyncio.wait_for(m.broadcast_json({"type": "stats", "data": {"i": i}}), 0.5)
+        await asyncio.sleep(0)
+        assert [x["data"]["i"] for x in fast.sent] == list(range(10))
+        qs = {q["id"]: q for q in m.queue_snapshot()}
+        assert qs[1]["dropped"] == 5 and qs[1]["depth"] == 4
+        slow.release.set()
+        await m.drain()
+        # the first message was already in flight; the newest 4 survive
+        assert [x["data"]["i"] for x in slow.sent] == [0, 6, 7, 8, 9]
+
+    asyncio.run(main())
+
+
+def test_coalesce_replaces_into_latest_state():
+    async def main():
+        m = ConnectionManager(max_queue=8, slow_policy="coalesce")
+        slow = StalledWS()
+        await m.connect(slow)
+        await m.broadcast_json({"type": "stats", "data": {}})  # in flight, stalls the writer
+        await asyncio.sleep(0)
+        await m.broadcast_json(_timeline("s1"))
+        await m.broadcast_json(_replace("s1", 500, [(500, "X"), (900, "Y")]))
+        await m.broadcast_json(_replace("s1", 900, [(900, "Z")]))
+        assert m.queue_snapshot()[0]["coalesced"] == 2 and m.queue_snapshot()[0]["depth"] == 1
+        slow.release.set()
+        await m.drain()
+        last = slow.sent[-1]
+        assert last["type"] == "timeline"
+        assert [e["clip"] for e in last["data"]["events"]] == ["A", "F", "X", "Z"]
+
+    asyncio.run(main())
+
+
+def test_disconnect_policy_drops_slow_client():
+    async def main():
+        m = ConnectionManager(max_queue=2, slow_policy="disconnect")
+        slow = StalledWS()
+        slow.close = lambda: asyncio.sleep(0)
+        await m.connect(slow)
+        for i in range(4):
+            await m.broadcast_json({"type": "stats", "data": {"i": i}})
+            await asyncio.sleep(0)
+        assert slow not in m.active and not m.queues
+
+    asyncio.run(main())
+
+
+def test_coalesced_mid_text_replace_keeps_the_suffix():
+    from services import pipeline_server as ps
+
+    async def main():
+        slow = StalledWS()
+        await ps.manager.connect(slow, Subscription(sessions=["co-1"]))
+        await ps.manager.broadcast_json({"type": "stats", "data": {}})  # in flight, stalls the writer
+        await asyncio.sleep(0)
+        saved = ps.settings.replace_min_interval_ms
+        ps.settings.replace_min_interval_ms = 0
+        try:
+            # substitution in the middle: the replace window ends before the last word
+            for text in ("속보 한국 태풍", "속보 안녕하세요 태풍"):
+                await ps._ingest_local(ps.StreamIn(type="partial", session_id="co-1", text=text))
+        finally:
+            ps.settings.replace_min_interval_ms = saved
+        slow.release.set()
+        await ps.manager.drain()
+        await ps.manager.disconnect(slow)
+        last = slow.sent[-1]
+        assert last["type"] == "timeline"
+        assert last["data"]["events"] == ps.sessions["co-1"].events.to_dicts()
+        assert [e["clip"] for e in last["data"]["events"] if e["channel"] == "default"] == ["BREAKING", "HELLO", "TYPHOON"]
+
+    asyncio.run(main())
+
+
+def test_coalesce_merges_window_replaces():
+    from services.pipeline_server import _coalesce
+    tl = _timeline("s1")
+    w1 = {"type": "timeline.replace", "session_id": "s1", "from_t_ms": 0, "data": {"id": "b", "windows": [
+        {"channels": ["default"], "from_t_ms": 0, "events": [{"t_ms": 0, "clip": "B", "channel": "default"}]}]}}
+    w2 = {"type": "timeline.replace", "session_id": "s1", "from_t_ms": 0, "data": {"id": "b", "windows": [
+        {"channels": ["face"], "from_t_ms": 0, "events": []}]}}
+    merged = _coalesce(w1, w2)
+    assert len(merged["data"]["windows"]) == 2
+    full = _coalesce(tl, merged)
+    assert full["type"] == "timeline" and [e["clip"] for e in full["data"]["events"]] == ["B"]
+    # legacy and windowed replaces are not merged with each other
+    assert _coalesce(_replace("s1", 0, [(0, "X")]), w1) is None
+
+
+def test_coalesced_replaces_keep_the_seq_chain():
+    from services.pipeline_server import _coalesce
+    r2 = {**_replace("s1", 100, [(100, "B")]), "seq": 2, "base_seq": 1}
+    r3 = {**_replace("s1", 200, [(200, "C")]), "seq": 3, "base_seq": 2}
+    merged = _coalesce(r2, r3)
+    assert (merged["base_seq"], merged["seq"]) == (1, 3)
+    full = _coalesce({**_timeline("s1"), "seq": 1}, r2)
+    assert full["type"] == "timeline" and full["seq"] == 2 and "base_seq" not in full
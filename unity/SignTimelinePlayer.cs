@@ -23,9 +23,15 @@ public class SignTimelinePlayer : MonoBehaviour
 
     [Header("Bindings")] public List<ClipBinding> bindings = new List<ClipBinding>();
 
+    [Header("Delta protocol")] public bool sendAcks = false;
+
     private readonly Dictionary<string, string> _map = new Dictionary<string, string>();
     private readonly List<TimelineEvent> _scheduled = new List<TimelineEvent>();
+    private float _playStart;
     private CancellationTokenSource _cts;
+    // per session: last applied seq, and sessions waiting for a resync answer
+    private readonly Dictionary<string, long> _lastSeq = new Dictionary<string, long>();
+    private readonly HashSet<string> _resyncPending = new HashSet<string>();
 
     [Serializable]
     public class TimelineEvent
@@ -42,6 +48,17 @@ public class SignTimelinePlayer : MonoBehaviour
         public string id;
         public long created_ms;
         public List<TimelineEvent> events;
+        public List<ReplaceWindow> windows; // timeline.replace with per-channel windows (REPLACE_DIFF=myers)
+    }
+
+    // drop events of `channels` with from_t_ms <= t_ms < to_t_ms (to_t_ms absent/0 = to the end), insert events
+    [Serializable]
+    public class ReplaceWindow
+    {
+        public List<string> channels;
+        public int from_t_ms;
+        public int to_t_ms;
+        public List<TimelineEvent> events;
     }
 
     private void Awake()
@@ -63,14 +80,14 @@ public class SignTimelinePlayer : MonoBehaviour
         _cts?.Cancel();
     }
 
-    private IEnumerator PlayTimeline(Timeline tl)
+    private IEnumerator PlayTimeline(float fromSec)
     {
-        var start = Time.realtimeSinceStartup;
-        foreach (var ev in tl.events)
+        foreach (var ev in _scheduled.ToArray())
         {
             var tSec = ev.t_ms / 1000f;
             // skip past events
-            var now = Time.realtimeSinceStartup - start;
+            if (tSec < fromSec) continue;
+            var now = Time.realtimeSinceStartup - _playStart;
             var wait = tSec - now;
             if (wait > 0) yield return new WaitForSecondsRealtime(wait);
 
@@ -86,12 +103,48 @@ public class SignTimelinePlayer : MonoBehaviour
         }
     }
 
-    private void ReplaceFrom(int fromMs, List<TimelineEvent> events)
+    private void Play(Timeline tl, int playheadMs)
+    {
+        StopAllCoroutines();
+        _scheduled.Clear();
+        if (tl.events != null) _scheduled.AddRange(tl.events);
+        // look-ahead sessions (PLAYOUT_WINDOW_MS): start where the server's playhead is
+        _playStart = Time.realtimeSinceStartup - playheadMs / 1000f;
+        StartCoroutine(PlayTimeline(playheadMs / 1000f));
+    }
+
+    private void ApplySnapshot(Timeline tl)
     {
-        // 단순 구현: 현재 코루틴은 새 전체 재생으로 교체
+        // resync snapshot: same content as the missed deltas, so keep the playhead
+        StopAllCoroutines();
+        _scheduled.Clear();
+        if (tl.events != null) _scheduled.AddRange(tl.events);
+        StartCoroutine(PlayTimeline(Time.realtimeSinceStartup - _playStart));
+    }
+
+    private static int ChannelRank(string ch) => ch == "face" ? 1 : ch == "gaze" ? 2 : string.IsNullOrEmpty(ch) || ch == "default" ? 0 : 3;
+
+    private void ApplyReplace(int fromMs, Timeline data)
+    {
+        if (data.windows != null && data.windows.Count > 0)
+        {
+            foreach (var w in data.windows)
+            {
+                _scheduled.RemoveAll(e => w.channels.Contains(string.IsNullOrEmpty(e.channel) ? "default" : e.channel)
+                                          && e.t_ms >= w.from_t_ms && (w.to_t_ms <= 0 || e.t_ms < w.to_t_ms));
+                if (w.events != null) _scheduled.AddRange(w.events);
+            }
+            _scheduled.Sort((a, b) => a.t_ms != b.t_ms ? a.t_ms.CompareTo(b.t_ms) : ChannelRank(a.channel).CompareTo(ChannelRank(b.channel)));
+        }
+        else
+        {
+            // legacy: everything from from_t_ms on is replaced by data.events
+            _scheduled.RemoveAll(e => e.t_ms >= fromMs);
+            if (data.events != null) _scheduled.AddRange(data.events);
+        }
+        // keep the playhead: continue from the earliest changed event
         StopAllCoroutines();
-        var tl = new Timeline {id = Guid.NewGuid().ToString(), created_ms = NowMs(), events = events};
-        StartCoroutine(PlayTimeline(tl));
+        StartCoroutine(PlayTimeline(Math.Max(fromMs / 1000f, Time.realtimeSinceStartup - _playStart)));
     }
 
     private static long NowMs() => DateTimeOffset.UtcNow.ToUnixTimeMilliseconds();
@@ -118,14 +171,36 @@ public class SignTimelinePlayer : MonoBehaviour
             try
             {
                 var root = JsonUtility.FromJson<Root>(json);
+                var sid = root.session_id ?? "";
                 if (root.type == "timeline" && root.data != null)
                 {
-                    StopAllCoroutines();
-                    StartCoroutine(PlayTimeline(root.data));
+                    if (root.resync && _lastSeq.ContainsKey(sid)) ApplySnapshot(root.data);
+                    else Play(root.data, root.playhead_ms);
+                    await Accepted(client, root, ct);
                 }
-                else if (root.type == "timeline.replace" && root.dataReplace != null)
+                else if (root.type == "timeline.replace" && root.data != null)
                 {
-                    ReplaceFrom(root.from_t_ms, root.dataReplace.events);
+                    // seq == 0: server without the delta protocol, apply as before
+                    if (root.seq > 0)
+                    {
+                        var known = _lastSeq.TryGetValue(sid, out var last);
+                        if (known && root.seq <= last) continue; // already applied (resync answer overlap)
+                        if (!known || root.base_seq != last)
+                        {
+                            // missed a message or joined mid-session: ask for what is missing
+                            if (_resyncPending.Add(sid))
+                                await SendJson(client, $"{{\"op\":\"resync\",\"session_id\":\"{sid}\",\"since\":{(known ? last : 0)}}}", ct);
+                            continue;
+                        }
+                    }
+                    // look-ahead slices carry the server playhead: follow it (it waits when text runs late)
+                    if (root.playhead_ms > 0) _playStart = Time.realtimeSinceStartup - root.playhead_ms / 1000f;
+                    ApplyReplace(root.from_t_ms, root.data);
+                    await Accepted(client, root, ct);
+                }
+                else if (root.type == "resync.unavailable")
+                {
+                    _resyncPending.Remove(sid); // wait for the next full timeline
                 }
             }
             catch (Exception e)
@@ -135,20 +210,33 @@ public class SignTimelinePlayer : MonoBehaviour
         }
     }
 
-    [Serializable]
-    private class Root
+    private async Task Accepted(ClientWebSocket client, Root root, CancellationToken ct)
     {
-        public string type;
-        public int from_t_ms;
-        public Timeline data; // for type==timeline
-        public DataReplace dataReplace; // for type==timeline.replace
+        if (root.seq <= 0) return;
+        var sid = root.session_id ?? "";
+        _lastSeq[sid] = root.seq;
+        _resyncPending.Remove(sid);
+        if (sendAcks)
+            await SendJson(client, $"{{\"op\":\"ack\",\"session_id\":\"{sid}\",\"seq\":{root.seq}}}", ct);
+    }
+
+    private static Task SendJson(ClientWebSocket client, string json, CancellationToken ct)
+    {
+        var bytes = Encoding.UTF8.GetBytes(json);
+        return client.SendAsync(new ArraySegment<byte>(bytes), WebSocketMessageType.Text, true, ct);
     }
 
     [Serializable]
-    private class DataReplace
+    private class Root
     {
-        public string id;
-        public List<TimelineEvent> events;
+        public string type;
+        public string session_id;
+        public long seq;       // per-session sequence (0 = server without the delta protocol)
+        public long base_seq;  // timeline.replace applies on top of this seq
+        public bool resync;    // timeline sent as a resync snapshot
+        public int from_t_ms;
+        public int playhead_ms; // look-ahead slices: server playhead when sent (0 = absent)
+        public Timeline data; // timeline: full events; timeline.replace: events (legacy) or windows
     }
 }
 